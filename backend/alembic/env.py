@@ -24,6 +24,18 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Full-text search objects are created with DDL rather than mapped (see
+# TASK_SEARCH_DDL in app/models/task.py), so autogenerate must not drop them
+SEARCH_OBJECTS = {"search_vector", "ix_tasks_user_id_search_vector"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Skip database objects that are deliberately not part of the models"""
+    if reflected and compare_to is None:
+        if name in SEARCH_OBJECTS or (type_ == "table" and name.startswith("tasks_fts")):
+            return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -57,6 +69,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -88,6 +101,7 @@ def run_migrations_online() -> None:
         context.configure(
             connection=connection, 
             target_metadata=target_metadata,
+            include_object=include_object,
             # Additional options for better autogenerate
             compare_type=True,
             compare_server_default=True,
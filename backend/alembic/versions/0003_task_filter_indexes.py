@@ -0,0 +1,32 @@
+"""index tasks for filtered and sorted listings
+
+Revision ID: 0003_task_filter_indexes
+Revises: 0002_task_keyset_index
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_task_filter_indexes'
+down_revision: Union[str, None] = '0002_task_keyset_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tasks_user_id_updated_at_id', 'tasks', ['user_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_due_date_id', 'tasks', ['user_id', 'due_date', 'id'], unique=False)
+    op.create_index('ix_tasks_user_id_status_due_date', 'tasks', ['user_id', 'status', 'due_date'], unique=False)
+    op.create_index('ix_tasks_user_id_priority_due_date', 'tasks', ['user_id', 'priority', 'due_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_user_id_priority_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_status_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_due_date_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_updated_at_id', table_name='tasks')
@@ -0,0 +1,77 @@
+"""full-text search over task title and description
+
+Revision ID: 0004_task_search
+Revises: 0003_task_filter_indexes
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_task_search'
+down_revision: Union[str, None] = '0003_task_filter_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # These objects are not mapped columns; they mirror TASK_SEARCH_DDL in
+    # app/models/task.py and are excluded from autogenerate in env.py
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Adding a STORED generated column rewrites the whole table, and the
+        # index is built in the same transaction: tasks is locked ACCESS
+        # EXCLUSIVE (no reads or writes) until both finish, so run this in a
+        # maintenance window on large tables. 0009 replaces the index
+        # concurrently
+        op.execute("""
+            ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING gin (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+                title, description, content='tasks', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+                INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+                INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+                INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+            END
+        """)
+        # Index the rows that already exist
+        op.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_tasks_search_vector")
+        op.execute("ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS tasks_fts_insert")
+        op.execute("DROP TABLE IF EXISTS tasks_fts")
@@ -0,0 +1,42 @@
+"""per-user task counters for task stats
+
+Revision ID: 0005_task_counters
+Revises: 0004_task_search
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_task_counters'
+down_revision: Union[str, None] = '0004_task_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The enum types already exist for the tasks table
+    op.create_table(
+        'task_counters',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('status', postgresql.ENUM('TODO', 'IN_PROGRESS', 'DONE', name='taskstatus', create_type=False),
+                  nullable=False),
+        sa.Column('priority', postgresql.ENUM('LOW', 'MEDIUM', 'HIGH', name='taskpriority', create_type=False),
+                  nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'status', 'priority'),
+    )
+    # Start from the current tasks
+    op.execute("""
+        INSERT INTO task_counters (user_id, status, priority, count)
+        SELECT user_id, status, priority, count(*) FROM tasks GROUP BY user_id, status, priority
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('task_counters')
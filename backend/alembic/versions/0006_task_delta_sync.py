@@ -0,0 +1,57 @@
+"""change sequence and tombstones for task delta sync
+
+Revision ID: 0006_task_delta_sync
+Revises: 0005_task_counters
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_task_delta_sync'
+down_revision: Union[str, None] = '0005_task_counters'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_tasks_user_id_change_seq', 'tasks', ['user_id', 'change_seq'], unique=False)
+    op.create_table(
+        'task_sync_state',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('last_seq', sa.BigInteger(), nullable=False),
+        sa.Column('pruned_seq', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_table(
+        'task_tombstones',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'task_id'),
+    )
+    op.create_index('ix_task_tombstones_user_id_change_seq', 'task_tombstones', ['user_id', 'change_seq'],
+                    unique=False)
+    op.create_index('ix_task_tombstones_deleted_at', 'task_tombstones', ['deleted_at'], unique=False)
+
+    # Existing tasks get their id as sequence number: unique and increasing per user
+    op.execute("UPDATE tasks SET change_seq = id")
+    op.execute("""
+        INSERT INTO task_sync_state (user_id, last_seq, pruned_seq)
+        SELECT user_id, max(id), 0 FROM tasks GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_tombstones_deleted_at', table_name='task_tombstones')
+    op.drop_index('ix_task_tombstones_user_id_change_seq', table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_table('task_sync_state')
+    op.drop_index('ix_tasks_user_id_change_seq', table_name='tasks')
+    op.drop_column('tasks', 'change_seq')
@@ -0,0 +1,99 @@
+"""maintain task counters with triggers
+
+Revision ID: 0007_task_counter_triggers
+Revises: 0006_task_delta_sync
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_task_counter_triggers'
+down_revision: Union[str, None] = '0006_task_delta_sync'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = ('tasks_counters_insert', 'tasks_counters_update', 'tasks_counters_delete')
+
+
+def upgrade() -> None:
+    # These mirror TASK_COUNTER_DDL in app/models/task.py. Writers no longer
+    # adjust the counters themselves, so deploy this together with that code
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("""
+            CREATE OR REPLACE FUNCTION task_counters_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    INSERT INTO task_counters (user_id, status, priority, count)
+                    SELECT user_id, status, priority, count(*) FROM new_rows
+                    GROUP BY user_id, status, priority ORDER BY user_id, status, priority
+                    ON CONFLICT (user_id, status, priority) DO UPDATE SET count = task_counters.count + excluded.count;
+                ELSIF TG_OP = 'DELETE' THEN
+                    INSERT INTO task_counters (user_id, status, priority, count)
+                    SELECT user_id, status, priority, -count(*) FROM old_rows
+                    GROUP BY user_id, status, priority ORDER BY user_id, status, priority
+                    ON CONFLICT (user_id, status, priority) DO UPDATE SET count = task_counters.count + excluded.count;
+                ELSE
+                    INSERT INTO task_counters (user_id, status, priority, count)
+                    SELECT user_id, status, priority, sum(delta) FROM (
+                        SELECT user_id, status, priority, -1 AS delta FROM old_rows
+                        UNION ALL
+                        SELECT user_id, status, priority, 1 FROM new_rows
+                    ) AS moved
+                    GROUP BY user_id, status, priority HAVING sum(delta) <> 0 ORDER BY user_id, status, priority
+                    ON CONFLICT (user_id, status, priority) DO UPDATE SET count = task_counters.count + excluded.count;
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        op.execute("""
+            CREATE TRIGGER tasks_counters_insert AFTER INSERT ON tasks
+            REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_counters_apply()
+        """)
+        op.execute("""
+            CREATE TRIGGER tasks_counters_update AFTER UPDATE ON tasks
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_counters_apply()
+        """)
+        op.execute("""
+            CREATE TRIGGER tasks_counters_delete AFTER DELETE ON tasks
+            REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION task_counters_apply()
+        """)
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_counters_insert AFTER INSERT ON tasks BEGIN
+                INSERT INTO task_counters (user_id, status, priority, count) VALUES (new.user_id, new.status, new.priority, 1)
+                ON CONFLICT (user_id, status, priority) DO UPDATE SET count = count + 1;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_counters_delete AFTER DELETE ON tasks BEGIN
+                UPDATE task_counters SET count = count - 1
+                WHERE user_id = old.user_id AND status = old.status AND priority = old.priority;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_counters_update AFTER UPDATE OF status, priority ON tasks
+            WHEN new.status IS NOT old.status OR new.priority IS NOT old.priority BEGIN
+                UPDATE task_counters SET count = count - 1
+                WHERE user_id = old.user_id AND status = old.status AND priority = old.priority;
+                INSERT INTO task_counters (user_id, status, priority, count) VALUES (new.user_id, new.status, new.priority, 1)
+                ON CONFLICT (user_id, status, priority) DO UPDATE SET count = count + 1;
+            END
+        """)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for trigger in TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger} ON tasks")
+        op.execute("DROP FUNCTION IF EXISTS task_counters_apply()")
+    elif dialect == 'sqlite':
+        for trigger in TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
@@ -0,0 +1,127 @@
+"""number task changes and record tombstones with triggers
+
+Revision ID: 0008_task_change_triggers
+Revises: 0007_task_counter_triggers
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008_task_change_triggers'
+down_revision: Union[str, None] = '0007_task_counter_triggers'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = ('tasks_change_stamp', 'tasks_change_insert', 'tasks_change_update', 'tasks_change_delete')
+
+
+def upgrade() -> None:
+    # These mirror TASK_CHANGE_DDL in app/models/task.py. Writers no longer
+    # number their changes or write tombstones themselves, so deploy this
+    # together with that code
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE SEQUENCE IF NOT EXISTS task_change_seq")
+        op.execute("""
+            CREATE OR REPLACE FUNCTION task_change_stamp() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                PERFORM pg_advisory_xact_lock(hashtextextended('task_changes ' || NEW.user_id, 0));
+                NEW.change_seq := nextval('task_change_seq');
+                RETURN NEW;
+            END
+            $$
+        """)
+        op.execute("""
+            CREATE OR REPLACE FUNCTION task_change_record() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    PERFORM pg_advisory_xact_lock(hashtextextended('task_changes ' || user_id, 0))
+                    FROM (SELECT DISTINCT user_id FROM old_rows ORDER BY user_id) AS users;
+                    WITH stamped AS (
+                        INSERT INTO task_tombstones (user_id, task_id, change_seq, deleted_at)
+                        SELECT user_id, id, nextval('task_change_seq'), now() AT TIME ZONE 'utc'
+                        FROM (SELECT user_id, id FROM old_rows ORDER BY id) AS deleted
+                        ON CONFLICT (user_id, task_id)
+                        DO UPDATE SET change_seq = excluded.change_seq, deleted_at = excluded.deleted_at
+                        RETURNING user_id, change_seq
+                    )
+                    INSERT INTO task_sync_state (user_id, last_seq, pruned_seq)
+                    SELECT user_id, max(change_seq), 0 FROM stamped GROUP BY user_id ORDER BY user_id
+                    ON CONFLICT (user_id) DO UPDATE SET last_seq = GREATEST(task_sync_state.last_seq, excluded.last_seq);
+                ELSE
+                    INSERT INTO task_sync_state (user_id, last_seq, pruned_seq)
+                    SELECT user_id, max(change_seq), 0 FROM new_rows GROUP BY user_id ORDER BY user_id
+                    ON CONFLICT (user_id) DO UPDATE SET last_seq = GREATEST(task_sync_state.last_seq, excluded.last_seq);
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        op.execute("""
+            CREATE TRIGGER tasks_change_stamp BEFORE INSERT OR UPDATE ON tasks
+            FOR EACH ROW EXECUTE FUNCTION task_change_stamp()
+        """)
+        op.execute("""
+            CREATE TRIGGER tasks_change_insert AFTER INSERT ON tasks
+            REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_change_record()
+        """)
+        op.execute("""
+            CREATE TRIGGER tasks_change_update AFTER UPDATE ON tasks
+            REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_change_record()
+        """)
+        op.execute("""
+            CREATE TRIGGER tasks_change_delete AFTER DELETE ON tasks
+            REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION task_change_record()
+        """)
+        # Numbers so far came from each user's last_seq; continue above all of them
+        op.execute("""
+            SELECT setval('task_change_seq', GREATEST((SELECT COALESCE(max(last_seq), 0) FROM task_sync_state), 1))
+        """)
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_change_insert AFTER INSERT ON tasks BEGIN
+                INSERT INTO task_sync_state (user_id, last_seq, pruned_seq) VALUES (new.user_id, 1, 0)
+                ON CONFLICT (user_id) DO UPDATE SET last_seq = last_seq + 1;
+                UPDATE tasks SET change_seq = (SELECT last_seq FROM task_sync_state WHERE user_id = new.user_id)
+                WHERE id = new.id;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_change_update AFTER UPDATE ON tasks
+            WHEN new.change_seq IS old.change_seq BEGIN
+                INSERT INTO task_sync_state (user_id, last_seq, pruned_seq) VALUES (new.user_id, 1, 0)
+                ON CONFLICT (user_id) DO UPDATE SET last_seq = last_seq + 1;
+                UPDATE tasks SET change_seq = (SELECT last_seq FROM task_sync_state WHERE user_id = new.user_id)
+                WHERE id = new.id;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS tasks_change_delete AFTER DELETE ON tasks BEGIN
+                INSERT INTO task_sync_state (user_id, last_seq, pruned_seq) VALUES (old.user_id, 1, 0)
+                ON CONFLICT (user_id) DO UPDATE SET last_seq = last_seq + 1;
+                INSERT INTO task_tombstones (user_id, task_id, change_seq, deleted_at)
+                VALUES (old.user_id, old.id, (SELECT last_seq FROM task_sync_state WHERE user_id = old.user_id),
+                        datetime('now'))
+                ON CONFLICT (user_id, task_id) DO UPDATE SET change_seq = excluded.change_seq, deleted_at = excluded.deleted_at;
+            END
+        """)
+
+
+def downgrade() -> None:
+    # last_seq stays at or above every number handed out, so the old writers
+    # can continue from it
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for trigger in TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger} ON tasks")
+        op.execute("DROP FUNCTION IF EXISTS task_change_record()")
+        op.execute("DROP FUNCTION IF EXISTS task_change_stamp()")
+        op.execute("DROP SEQUENCE IF EXISTS task_change_seq")
+    elif dialect == 'sqlite':
+        for trigger in TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
@@ -0,0 +1,40 @@
+"""index task search by user and search vector together
+
+Revision ID: 0009_task_search_user_index
+Revises: 0008_task_change_triggers
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009_task_search_user_index'
+down_revision: Union[str, None] = '0008_task_change_triggers'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The search_vector-only index matched every user's tasks and left the
+    # user_id filter to heap rechecks; this mirrors TASK_SEARCH_DDL in
+    # app/models/task.py. The indexes are swapped concurrently, outside a
+    # transaction, so tasks stays readable and writable meanwhile
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_user_id_search_vector "
+                "ON tasks USING gin (user_id, search_vector)"
+            )
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_search_vector")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_search_vector ON tasks USING gin (search_vector)")
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_user_id_search_vector")
@@ -4,6 +4,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.router import api_router
+from app.api import metrics
+from app.core.keycloak_client import init_keycloak_client, close_keycloak_client
+from app.core.security import jwks_store
+from app.core.api_tokens import last_used_buffer
+from app.core.notify import notifier
+from app.db.async_session import dispose_async_engine
+from app.db.replicas import replica_router
+from app.db.shards import shard_router
 # Import models to ensure they're registered with Base
 from app.core.api_tokens import APIToken
 from app.models.task import Task
@@ -14,8 +22,27 @@ async def lifespan(app: FastAPI):
     # Startup: Database tables are now managed by Alembic migrations
     # which run in start.sh before the app starts
 
+    # One pooled Keycloak client for key fetches, logins and refreshes
+    init_keycloak_client()
+
+    # Load Keycloak signing keys and keep them fresh in the background
+    jwks_store.start()
+
+    # Write API token last-used timestamps in periodic batches
+    last_used_buffer.start()
+
+    # Hear other workers' task changes and API token revocations
+    await notifier.start()
+
     yield
     # Shutdown: Clean up resources if needed
+    await notifier.stop()
+    await last_used_buffer.stop()
+    await jwks_store.stop()
+    await close_keycloak_client()
+    await replica_router.dispose()
+    await shard_router.dispose()
+    await dispose_async_engine()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -34,11 +61,16 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Pagination cursors are returned in headers
+        expose_headers=["X-Next-Cursor", "Link"],
     )
 
 # Include the API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Prometheus metrics, beside /health
+app.include_router(metrics.router)
+
 # Root endpoint
 @app.get("/")
 async def root():
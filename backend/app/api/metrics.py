@@ -0,0 +1,78 @@
+# app/api/metrics.py
+"""Prometheus scrape endpoint for this worker's pools, caches and streams.
+
+The endpoint sits next to /health but is not public: scrapers must send
+METRICS_TOKEN as a bearer token, and without one configured it does not exist.
+"""
+
+from typing import Optional
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.core.api_tokens import api_token_cache, invalid_token_cache
+from app.core.config import settings
+from app.core.metrics import MetricsWriter
+from app.core.security import keycloak_token_calls, token_cache
+from app.core.task_events import task_event_bus
+from app.db.pool_metrics import collect_pool_metrics
+from app.db.replicas import replica_router
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+scrape_token_scheme = HTTPBearer(auto_error=False)
+
+
+def require_scrape_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(scrape_token_scheme),
+) -> None:
+    """Let only scrapers holding METRICS_TOKEN through."""
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not secrets.compare_digest(credentials.credentials, settings.METRICS_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def collect_metrics() -> str:
+    writer = MetricsWriter()
+    collect_pool_metrics(writer)
+
+    caches = {
+        "jwt": token_cache.stats(),
+        "api_token": api_token_cache.stats(),
+        "invalid_api_token": invalid_token_cache.stats(),
+        "keycloak_token": keycloak_token_calls.stats(),
+    }
+    for name, stats in caches.items():
+        labels = {"cache": name}
+        writer.counter("cache_hits_total", "Cache lookups answered from the cache", stats["hits"], labels)
+        writer.counter("cache_misses_total", "Cache lookups that missed", stats["misses"], labels)
+        writer.gauge("cache_entries", "Entries currently cached", stats["size"], labels)
+    writer.gauge("keycloak_token_requests_inflight", "Keycloak token requests in flight",
+                 caches["keycloak_token"]["inflight"])
+
+    events = task_event_bus.stats()
+    writer.gauge("task_event_stream_users", "Users with an open task event stream", events["users"])
+    writer.gauge("task_event_stream_connections", "Open task event streams", events["connections"])
+
+    replicas = replica_router.stats()
+    writer.gauge("db_read_replicas", "Configured read replicas", replicas["replicas"])
+    writer.gauge("db_read_replicas_down", "Read replicas skipped after a failed connect", replicas["down"])
+    writer.gauge("db_read_replica_sticky_users", "Users reading from the primary after a write",
+                 replicas["sticky_users"])
+    return writer.render()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+            dependencies=[Depends(require_scrape_token)])
+async def metrics():
+    """Current metrics in the Prometheus text format."""
+    return PlainTextResponse(collect_metrics(), media_type=CONTENT_TYPE)
@@ -2,18 +2,50 @@
 Task management API endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, field_validator
-from typing import List, Optional, Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, field_validator, model_validator
+from typing import Dict, List, Optional, Literal
 from datetime import datetime
+from functools import lru_cache
 
-from app.core.security import get_current_user
-from app.db.session import get_db
+from app.core.config import settings
+from app.core import task_mutations
+from app.core.etags import etag_matches, make_etag
+from app.core.fast_json import compile_serializer, fast_response
+from app.core.task_io import TaskFileFormat, import_tasks as import_task_rows, stream_task_export
+from app.core.task_events import publish_task_event, stream_task_events
+from app.core.task_stats import read_stats
+from app.core.task_sync import SyncTokenExpired, read_changes
+from app.core.task_search import apply_search_cursor, next_search_cursor, search_query
+from app.core.task_queries import (
+    TASK_FIELDS, TASK_LIST_FIELDS, TaskSort, apply_cursor, apply_filters, apply_sort, next_cursor,
+    parse_fields, read_query, version_query
+)
+from app.core.security import authenticate_token, get_current_user, get_stream_token, token_expiry
+from app.db.shards import task_db, task_read_db
 from app.models.task import Task as TaskModel, TaskStatus, TaskPriority
 
 router = APIRouter()
 
+# Sessions routed for the Keycloak user every task handler authenticates as
+get_async_task_db = task_db(get_current_user)
+get_async_task_read_db = task_read_db(get_current_user)
+
+# Clients may keep task reads but must revalidate them with If-None-Match
+TASK_CACHE_CONTROL = "private, no-cache"
+
+
+def task_etag(task_id: int, updated_at: datetime, fields: tuple) -> str:
+    # Each field set is a different representation of the task
+    return make_etag("task", task_id, updated_at.isoformat(), ",".join(fields))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": TASK_CACHE_CONTROL})
+
 
 class TaskBase(BaseModel):
     """Base task schema"""
@@ -38,6 +70,62 @@ class TaskUpdate(BaseModel):
     due_date: Optional[datetime] = None
 
 
+class TaskBulkUpdate(TaskUpdate):
+    """Partial update of one task in a bulk request"""
+    id: int
+
+
+class TaskBulkRequest(BaseModel):
+    """Creates, partial updates and deletes applied in one transaction"""
+    create: List[TaskCreate] = []
+    update: List[TaskBulkUpdate] = []
+    delete: List[int] = []
+
+    @model_validator(mode="after")
+    def check_unique_ids(self):
+        for name, ids in (("update", [item.id for item in self.update]), ("delete", self.delete)):
+            if len(ids) != len(set(ids)):
+                raise ValueError(f"Duplicate task ids in {name}")
+        return self
+
+
+class TaskBulkItemResult(BaseModel):
+    """Outcome of one item in a bulk request, by position"""
+    index: int
+    id: Optional[int] = None
+    status: Literal["created", "updated", "deleted", "not_found"]
+
+
+class TaskBulkResponse(BaseModel):
+    """Per-item results of a bulk request"""
+    create: List[TaskBulkItemResult] = []
+    update: List[TaskBulkItemResult] = []
+    delete: List[TaskBulkItemResult] = []
+
+
+class TaskImportError(BaseModel):
+    """A row of an import that was skipped"""
+    row: int
+    error: str
+
+
+class TaskImportResponse(BaseModel):
+    """Summary of a task import"""
+    import_id: str
+    processed: int
+    imported: int
+    failed: int
+    errors: List[TaskImportError]
+
+
+class TaskStats(BaseModel):
+    """Task totals for the current user"""
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+    overdue: int
+
+
 class Task(TaskBase):
     """Task response schema"""
     id: int
@@ -49,121 +137,381 @@ class Task(TaskBase):
         from_attributes = True
 
 
-@router.get("", response_model=List[Task])
-@router.get("/", response_model=List[Task])
+class TaskFields(BaseModel):
+    """Task response schema limited to the fields requested with ``fields=``"""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
+    due_date: Optional[datetime] = None
+    id: int
+    user_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+# Fast path for task lists when FAST_JSON_RESPONSES is on
+serialize_task = compile_serializer(Task)
+
+
+@lru_cache(maxsize=128)
+def task_fields_serializer(fields: tuple):
+    """Serializer producing only ``fields`` of a task, compiled once per field set."""
+    return compile_serializer(Task, fields)
+
+
+def requested_fields(fields: Optional[str], default: tuple) -> tuple:
+    try:
+        return parse_fields(fields, default)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Description of the ``fields`` query parameter of task reads
+FIELDS_DESCRIPTION = f"Comma-separated fields to return ({', '.join(TASK_FIELDS)}); id is always included"
+
+
+class TaskChanges(BaseModel):
+    """Tasks written and deleted after a sync point, oldest change first"""
+    changes: List[Task]
+    deleted: List[int]
+    next_since: int
+    has_more: bool
+
+
+@router.get("", response_model=List[TaskFields], response_model_exclude_unset=True)
+@router.get("/", response_model=List[TaskFields], response_model_exclude_unset=True)
 async def list_tasks(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    status: Optional[List[TaskStatus]] = Query(None),
+    priority: Optional[List[TaskPriority]] = Query(None),
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    sort: TaskSort = TaskSort.CREATED_AT,
+    limit: int = Query(settings.TASK_PAGE_SIZE, ge=1, le=settings.TASK_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_task_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    List all tasks for the current user.
+    List tasks for the current user, one page at a time.
+    Tasks carry every field except description unless ``fields`` names
+    the ones to return.
+    Filter by status/priority (repeatable) and a due-date range
+    (due_after inclusive, due_before exclusive); sort by created_at,
+    updated_at or due_date, prefixed with "-" for descending.
+    When more tasks exist, the X-Next-Cursor header (and a Link rel="next")
+    carries the cursor for the following page.
+    Responses carry an ETag; a matching If-None-Match returns 304.
     Requires authentication.
     """
-    tasks = db.query(TaskModel).filter(TaskModel.user_id == current_user.sub).all()
-    return tasks
+    fields = requested_fields(fields, TASK_LIST_FIELDS)
+    # The ETag covers every task of the user, so it is known before the page query runs
+    version = await db.scalar(version_query(current_user.sub)) or 0
+    etag = make_etag("tasks", current_user.sub, version, request.url.query)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = TASK_CACHE_CONTROL
+    
+    # Read-only rows of just the needed columns; the response is built straight from them
+    query = apply_filters(
+        read_query(fields, (sort.field,)), current_user.sub,
+        status=status, priority=priority, due_after=due_after, due_before=due_before
+    )
+    query = apply_sort(query, sort)
+    if cursor:
+        try:
+            query = apply_cursor(query, sort, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # Fetch one extra row to learn whether another page exists
+    result = await db.execute(query.limit(limit + 1))
+    tasks = result.all()
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        cursor = next_cursor(sort, tasks[-1])
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=cursor)}>; rel="next"'
+    serialize = task_fields_serializer(fields)
+    if settings.FAST_JSON_RESPONSES:
+        return fast_response([serialize(task) for task in tasks], response)
+    return [serialize(task) for task in tasks]
 
 
 @router.post("", response_model=Task)
 @router.post("/", response_model=Task)
 async def create_task(
     task: TaskCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_task_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Create a new task.
     Requires authentication.
     """
-    db_task = TaskModel(
-        user_id=current_user.sub,
-        title=task.title,
-        description=task.description,
-        status=task.status,
-        priority=task.priority,
-        due_date=task.due_date
-    )
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    db_task = await task_mutations.create_task(db, current_user.sub, task.model_dump())
+    await publish_task_event(db, current_user.sub, "created", [db_task.id])
+    await db.commit()
     return db_task
 
 
-@router.get("/{task_id}", response_model=Task)
+@router.post("/bulk", response_model=TaskBulkResponse)
+async def bulk_tasks(
+    request: TaskBulkRequest,
+    db: AsyncSession = Depends(get_async_task_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Create, update and delete many tasks at once.
+    Each group runs as a multi-row statement and everything commits in a
+    single transaction; results are reported per item, in request order.
+    Requires authentication.
+    """
+    item_count = len(request.create) + len(request.update) + len(request.delete)
+    if item_count > settings.TASK_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Bulk requests are limited to {settings.TASK_BULK_MAX_ITEMS} items"
+        )
+    
+    # Lock every row this request updates or deletes before any write takes the user's change lock
+    if sum(map(bool, (request.create, request.update, request.delete))) > 1:
+        await task_mutations.lock_tasks(db, current_user.sub, [item.id for item in request.update] + request.delete)
+    created_ids = await task_mutations.insert_tasks(
+        db, current_user.sub, [task.model_dump() for task in request.create]
+    )
+    updated_ids = await task_mutations.update_tasks(db, current_user.sub, {
+        item.id: item.model_dump(exclude={"id"}, exclude_none=True) for item in request.update
+    })
+    deleted_ids = await task_mutations.delete_tasks(db, current_user.sub, request.delete)
+    await publish_task_event(db, current_user.sub, "created", created_ids)
+    await publish_task_event(db, current_user.sub, "updated", sorted(updated_ids))
+    await publish_task_event(db, current_user.sub, "deleted", sorted(deleted_ids))
+    await db.commit()
+    
+    return TaskBulkResponse(
+        create=[
+            TaskBulkItemResult(index=i, id=task_id, status="created")
+            for i, task_id in enumerate(created_ids)
+        ],
+        update=[
+            TaskBulkItemResult(index=i, id=item.id, status="updated" if item.id in updated_ids else "not_found")
+            for i, item in enumerate(request.update)
+        ],
+        delete=[
+            TaskBulkItemResult(index=i, id=task_id, status="deleted" if task_id in deleted_ids else "not_found")
+            for i, task_id in enumerate(request.delete)
+        ],
+    )
+
+
+@router.get("/export")
+async def export_tasks(
+    format: TaskFileFormat = TaskFileFormat.NDJSON,
+    db: AsyncSession = Depends(get_async_task_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream all of the current user's tasks as NDJSON or CSV"""
+    return StreamingResponse(
+        stream_task_export(db, current_user.sub, format),
+        media_type=format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format.value}"'},
+    )
+
+
+@router.post("/import", response_model=TaskImportResponse)
+async def import_tasks(
+    request: Request,
+    format: TaskFileFormat = TaskFileFormat.NDJSON,
+    db: AsyncSession = Depends(get_async_task_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Import tasks from an NDJSON or CSV request body.
+    The body is parsed as it arrives and valid rows are written in batches;
+    invalid rows are skipped and listed in the response. Each batch sends an
+    "import" event with the counts so far to the user's task stream.
+    Requires authentication.
+    """
+    return await import_task_rows(db, current_user.sub, request.stream(), format, TaskCreate)
+
+
+@router.get("/stream")
+async def stream_tasks(
+    token: str = Depends(get_stream_token)
+):
+    """
+    Server-sent events for changes to the current user's tasks.
+    Events are "created", "updated" and "deleted" with the affected ids,
+    "resync" when the client should reload its tasks, and "import" with the
+    progress of a running import. The stream ends
+    with an "expired" event when the access token expires.
+    Requires authentication: a bearer token, or the access_token query
+    parameter for EventSource clients.
+    """
+    current_user = await authenticate_token(token)
+    return StreamingResponse(
+        stream_task_events(current_user.sub, token_expiry(token)),
+        media_type="text/event-stream",
+        # Keep proxies from caching or buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/changes", response_model=TaskChanges)
+async def task_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(settings.TASK_PAGE_SIZE, ge=1, le=settings.TASK_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_task_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Delta sync: tasks created or updated, and ids of tasks deleted, after
+    the sync point ``since`` (0 for a full sync). Pass ``next_since`` back on
+    the next call; keep calling while ``has_more`` is true.
+    Returns 410 when the deletions since that point are no longer kept and
+    the client has to sync again from 0.
+    Requires authentication.
+    """
+    try:
+        return await read_changes(db, current_user.sub, since, limit)
+    except SyncTokenExpired:
+        raise HTTPException(status_code=410, detail="Sync point too old; sync again from since=0")
+
+
+@router.get("/stats", response_model=TaskStats)
+async def task_stats(
+    db: AsyncSession = Depends(get_async_task_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Count the current user's tasks by status and priority, and the open
+    tasks that are past their due date.
+    Requires authentication.
+    """
+    return await read_stats(db, current_user.sub)
+
+
+@router.get("/search", response_model=List[Task])
+async def search_tasks(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(settings.TASK_PAGE_SIZE, ge=1, le=settings.TASK_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_task_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Full-text search over the current user's task titles and descriptions.
+    Results are ranked, best match first; title matches rank higher.
+    Paginated like GET /tasks with X-Next-Cursor and Link headers.
+    Requires authentication.
+    """
+    query, rank = search_query(db.get_bind().dialect.name, current_user.sub, q)
+    if cursor:
+        try:
+            query = apply_search_cursor(query, rank, q, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_task, last_rank = rows[-1]
+        cursor = next_search_cursor(q, last_rank, last_task.id)
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=cursor)}>; rel="next"'
+    if settings.FAST_JSON_RESPONSES:
+        return fast_response([serialize_task(task) for task, _ in rows], response)
+    return [task for task, _ in rows]
+
+
+@router.get("/{task_id}", response_model=TaskFields, response_model_exclude_unset=True)
 async def get_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_task_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get a specific task by ID.
+    Get a specific task by ID, limited to ``fields`` if given.
+    Responses carry an ETag; a matching If-None-Match returns 304.
     Requires authentication.
     """
-    task = db.query(TaskModel).filter(
+    fields = requested_fields(fields, TASK_FIELDS)
+    if if_none_match:
+        # Check the client's copy against updated_at alone before loading the row
+        result = await db.execute(select(TaskModel.updated_at).where(
+            TaskModel.id == task_id,
+            TaskModel.user_id == current_user.sub
+        ))
+        updated_at = result.scalar_one_or_none()
+        if updated_at is not None and etag_matches(if_none_match, task_etag(task_id, updated_at, fields)):
+            return not_modified(task_etag(task_id, updated_at, fields))
+    
+    result = await db.execute(read_query(fields, ("updated_at",)).where(
         TaskModel.id == task_id,
         TaskModel.user_id == current_user.sub
-    ).first()
+    ))
+    task = result.one_or_none()
     
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    return task
+    response.headers["ETag"] = task_etag(task.id, task.updated_at, fields)
+    response.headers["Cache-Control"] = TASK_CACHE_CONTROL
+    return task_fields_serializer(fields)(task)
 
 
 @router.put("/{task_id}", response_model=Task)
 async def update_task(
     task_id: int,
     task_update: TaskUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_task_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Update a task.
     Requires authentication.
     """
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.user_id == current_user.sub
-    ).first()
+    # Fields left out of the request (None) keep their values
+    task = await task_mutations.update_task(
+        db, current_user.sub, task_id, task_update.model_dump(exclude_none=True)
+    )
     
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    # Update fields if provided
-    if task_update.title is not None:
-        task.title = task_update.title
-    if task_update.description is not None:
-        task.description = task_update.description
-    if task_update.status is not None:
-        task.status = task_update.status
-    if task_update.priority is not None:
-        task.priority = task_update.priority
-    if task_update.due_date is not None:
-        task.due_date = task_update.due_date
-    
-    db.commit()
-    db.refresh(task)
+    await publish_task_event(db, current_user.sub, "updated", [task.id])
+    await db.commit()
     return task
 
 
 @router.delete("/{task_id}")
 async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_task_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Delete a task.
     Requires authentication.
     """
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.user_id == current_user.sub
-    ).first()
+    deleted = await task_mutations.delete_task(db, current_user.sub, task_id)
     
-    if not task:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    db.delete(task)
-    db.commit()
+    await publish_task_event(db, current_user.sub, "deleted", [task_id])
+    await db.commit()
     
     return {"message": "Task deleted successfully"}
\ No newline at end of file
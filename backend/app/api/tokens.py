@@ -3,7 +3,7 @@
 
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import get_current_user, User
 from app.core.api_tokens import (
@@ -15,7 +15,9 @@ from app.core.api_tokens import (
     revoke_api_token,
     get_current_user_dual_auth
 )
-from app.db.session import get_db
+from app.core.config import settings
+from app.core.fast_json import fast_response
+from app.db.replicas import read_db, write_db
 
 router = APIRouter()
 
@@ -23,7 +25,7 @@ router = APIRouter()
 async def create_token(
     token_data: APITokenCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(write_db(get_current_user))
 ):
     """Create a new API token for the current user."""
     
@@ -41,18 +43,20 @@ async def create_token(
 @router.get("/", response_model=List[APITokenInfo])
 async def list_tokens(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(read_db(get_current_user))
 ):
     """List all API tokens for the current user."""
     
     tokens = await list_api_tokens(db, current_user.sub)
+    if settings.FAST_JSON_RESPONSES:
+        return fast_response(tokens)
     return tokens
 
 @router.delete("/{token_id}")
 async def delete_token(
     token_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(write_db(get_current_user))
 ):
     """Revoke an API token."""
     
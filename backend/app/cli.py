@@ -0,0 +1,116 @@
+# app/cli.py
+"""Maintenance commands.
+
+Usage::
+
+    python -m app.cli rebuild-task-stats [--user-id USER_ID]
+    python -m app.cli prune-task-tombstones [--days DAYS]
+    python -m app.cli move-user-shard USER_ID --source-url URL
+    python -m app.cli rebalance-shards [--source-url URL ...]
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.core.task_stats import rebuild_counters
+from app.core.task_shards import move_user_to_shard, rebalance
+from app.core.task_sync import prune_tombstones
+from app.db.async_session import dispose_async_engine
+from app.db.shards import shard_router
+
+
+async def rebuild_task_stats(user_id=None) -> int:
+    """Recompute the task counters behind GET /tasks/stats from the tasks table."""
+    try:
+        rows = 0
+        for session_factory in shard_router.session_factories():
+            async with session_factory() as db:
+                rows += await rebuild_counters(db, user_id)
+                await db.commit()
+        return rows
+    finally:
+        await shard_router.dispose()
+        await dispose_async_engine()
+
+
+async def prune_task_tombstones(days: int) -> int:
+    """Delete tombstones of tasks deleted more than ``days`` days ago."""
+    try:
+        rows = 0
+        for session_factory in shard_router.session_factories():
+            async with session_factory() as db:
+                rows += await prune_tombstones(db, datetime.utcnow() - timedelta(days=days))
+                await db.commit()
+        return rows
+    finally:
+        await shard_router.dispose()
+        await dispose_async_engine()
+
+
+async def move_user_shard(user_id: str, source_url: str) -> dict:
+    """Move one user's task data from ``source_url`` to their shard."""
+    try:
+        return await move_user_to_shard(shard_router, user_id, source_url)
+    finally:
+        await shard_router.dispose()
+
+
+async def rebalance_shards(source_urls) -> list:
+    """Move every user whose task data is not on the shard the ring assigns them."""
+    try:
+        return await rebalance(shard_router, source_urls)
+    finally:
+        await shard_router.dispose()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-task-stats", help="recompute task counters to fix drift")
+    rebuild.add_argument("--user-id", help="only rebuild this user's counters")
+
+    prune = commands.add_parser("prune-task-tombstones", help="forget old task deletions kept for delta sync")
+    prune.add_argument("--days", type=int, default=settings.TASK_TOMBSTONE_RETENTION_DAYS,
+                       help="keep tombstones this many days (default: %(default)s)")
+
+    move = commands.add_parser("move-user-shard", help="move one user's tasks to their shard")
+    move.add_argument("user_id")
+    move.add_argument("--source-url", required=True, help="database currently holding the user's tasks")
+
+    rebalance_parser = commands.add_parser("rebalance-shards", help="move users after DATABASE_SHARD_URLS changed")
+    rebalance_parser.add_argument("--source-url", action="append", default=[],
+                                  help="former shard or unsharded database to empty (repeatable)")
+
+    args = parser.parse_args(argv)
+    if args.command in ("move-user-shard", "rebalance-shards") and not shard_router.enabled:
+        parser.error("DATABASE_SHARD_URLS is not set")
+    if args.command == "rebuild-task-stats":
+        rows = asyncio.run(rebuild_task_stats(args.user_id))
+        scope = f"user {args.user_id}" if args.user_id else "all users"
+        print(f"Rebuilt task counters for {scope} ({rows} rows)")
+    elif args.command == "prune-task-tombstones":
+        rows = asyncio.run(prune_task_tombstones(args.days))
+        print(f"Pruned {rows} task tombstones older than {args.days} days")
+    elif args.command == "move-user-shard":
+        try:
+            move = asyncio.run(move_user_shard(args.user_id, args.source_url))
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Moved {move['tasks']} tasks of {move['user_id']} from {move['source']} to {move['target']} "
+              f"({move['renumbered']} renumbered)")
+    elif args.command == "rebalance-shards":
+        try:
+            moves = asyncio.run(rebalance_shards(args.source_url))
+        except ValueError as e:
+            parser.error(str(e))
+        for move in moves:
+            print(f"Moved {move['tasks']} tasks of {move['user_id']} from {move['source']} to {move['target']} "
+                  f"({move['renumbered']} renumbered)")
+        print(f"Moved {len(moves)} users")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,26 @@
 # app/core/api_tokens.py
 """API Token authentication for programmatic access."""
 
-from typing import Optional, Dict, List
-from datetime import datetime, timedelta
+from typing import Any, Optional, Dict, List
+from datetime import datetime, timedelta, timezone
+import asyncio
+import math
+import re
 import secrets
 import hashlib
-from sqlalchemy import Column, String, DateTime, Boolean, JSON
-from fastapi import Depends, HTTPException, status
+import time
+from sqlalchemy import Column, String, DateTime, Boolean, JSON, bindparam, func, select, update
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 import logging
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.db.session import get_db, Base
+from app.db.session import Base
+from app.db.async_session import get_async_db, get_async_session_local
 from app.core.security import oauth2_scheme
+from app.core.notify import notifier
 
 logger = logging.getLogger(__name__)
 
@@ -56,9 +63,141 @@ class APITokenInfo(BaseModel):
     is_active: bool
     scopes: List[str]
 
+# Columns of APITokenInfo, read without loading APIToken entities
+TOKEN_INFO_COLUMNS = tuple(getattr(APIToken, name) for name in APITokenInfo.model_fields)
+
 # Security scheme for API tokens
 api_token_scheme = HTTPBearer(auto_error=False)
 
+# Verified tokens by hash so steady-state API calls skip the lookup query.
+# Revocation evicts the token in every worker through app.core.notify; only
+# if a worker's listening connection is down can it serve the token for up
+# to the TTL (the whole cache is dropped when that connection comes back).
+api_token_cache = TTLCache(maxsize=settings.API_TOKEN_CACHE_MAX_ENTRIES, ttl=settings.API_TOKEN_CACHE_TTL)
+
+# Notification channel carrying the hashes of revoked tokens
+REVOCATION_CHANNEL = "api_token_revocations"
+notifier.listen(REVOCATION_CHANNEL, api_token_cache.pop, api_token_cache.clear)
+
+# Hashes of tokens that failed verification, so repeats skip the database
+invalid_token_cache = TTLCache(
+    maxsize=settings.API_TOKEN_NEGATIVE_CACHE_MAX_ENTRIES,
+    ttl=settings.API_TOKEN_NEGATIVE_CACHE_TTL
+)
+
+# Shape of tokens from generate_api_token(): tk_ + 32 random bytes, base64url
+API_TOKEN_PATTERN = re.compile(r"^tk_[A-Za-z0-9_-]{43}$")
+
+class FailureTracker:
+    """Counts bad API token presentations per client in a fixed window.
+
+    Clients are identified by ``request.client.host``; start.sh trusts proxy
+    headers only from FORWARDED_ALLOW_IPS, which must be set to the ingress
+    address for this to be the real peer behind it. Tokens this worker has already verified are never
+    throttled (see ``is_verified_api_token``).
+    """
+
+    def __init__(self, max_failures: int, window: float, maxsize: int = 100000):
+        self.max_failures = max_failures
+        self.window = window
+        self._counts = TTLCache(maxsize=maxsize)
+
+    def record(self, client: Optional[str]) -> None:
+        """Count one failed presentation from ``client``."""
+        if client is None:
+            return
+        count, window_end = self._counts.get(client, (0, time.time() + self.window))
+        self._counts.set(client, (count + 1, window_end), expires_at=window_end)
+
+    def retry_after(self, client: Optional[str]) -> Optional[int]:
+        """Seconds until ``client`` may try again, or None if it is not blocked."""
+        if client is None:
+            return None
+        count, window_end = self._counts.get(client, (0, 0.0))
+        if count < self.max_failures:
+            return None
+        return max(1, math.ceil(window_end - time.time()))
+
+api_token_failures = FailureTracker(
+    max_failures=settings.API_TOKEN_MAX_FAILURES,
+    window=settings.API_TOKEN_FAILURE_WINDOW
+)
+
+class LastUsedBuffer:
+    """Write-behind buffer for API token ``last_used`` timestamps.
+
+    The request path only records the timestamp in memory; a background task
+    writes all pending timestamps in one bulk UPDATE every ``flush_interval``
+    seconds, and the lifespan hook flushes whatever is left on shutdown.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, token_id: str, used_at: datetime) -> None:
+        """Remember that a token was used."""
+        self._pending[token_id] = used_at
+
+    def pending(self, token_id: str) -> Optional[datetime]:
+        """Return a timestamp that has not been written yet."""
+        return self._pending.get(token_id)
+
+    async def flush(self) -> int:
+        """Write pending timestamps and return how many tokens were updated."""
+        if not self._pending:
+            return 0
+        # Swap on the event loop so record() never writes into a batch being flushed
+        batch, self._pending = self._pending, {}
+        try:
+            await self._write(batch)
+        except Exception as e:
+            logger.error(f"Failed to write API token last_used timestamps: {e}")
+            # Keep the batch for the next attempt unless newer timestamps arrived
+            for token_id, used_at in batch.items():
+                self._pending.setdefault(token_id, used_at)
+            return 0
+        return len(batch)
+
+    @staticmethod
+    async def _write(batch: Dict[str, datetime]) -> None:
+        async with get_async_session_local()() as db:
+            # Other workers flush the same tokens; never move last_used backwards
+            greatest = func.greatest if db.get_bind().dialect.name == "postgresql" else func.max
+            used_at = bindparam("used_at", type_=DateTime)
+            table = APIToken.__table__
+            await db.execute(
+                update(table)
+                .where(table.c.id == bindparam("token_id"))
+                .values(last_used=greatest(func.coalesce(table.c.last_used, used_at), used_at)),
+                [{"token_id": token_id, "used_at": used_at} for token_id, used_at in batch.items()],
+            )
+            await db.commit()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        """Start flushing in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the background task and write out anything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+last_used_buffer = LastUsedBuffer(flush_interval=settings.API_TOKEN_LAST_USED_FLUSH_INTERVAL)
+
 def hash_token(token: str) -> str:
     """Hash a token for storage."""
     return hashlib.sha256(token.encode()).hexdigest()
@@ -98,8 +237,9 @@ async def create_api_token(
     )
     
     db.add(db_token)
-    db.commit()
-    db.refresh(db_token)
+    await db.commit()
+    await db.refresh(db_token)
+    invalid_token_cache.pop(token_hash)
     
     # Return response with raw token (only time it's visible)
     return APITokenResponse(
@@ -121,98 +261,131 @@ async def verify_api_token(credentials: HTTPAuthorizationCredentials, db) -> Opt
     if not token.startswith("tk_"):
         return None
     
-    token_hash = hash_token(token)
-    
-    # Look up token
-    db_token = db.query(APIToken).filter(
-        APIToken.token_hash == token_hash,
-        APIToken.is_active == True
-    ).first()
-    
-    if not db_token:
+    # Cheap probe filter: tokens we could never have issued are not looked up
+    if not API_TOKEN_PATTERN.match(token):
         return None
     
-    # Check expiration
-    if db_token.expires_at and datetime.utcnow() > db_token.expires_at:
-        return None
+    token_hash = hash_token(token)
+    
+    user_info = api_token_cache.get(token_hash)
+    if user_info is None:
+        if token_hash in invalid_token_cache:
+            return None
+        
+        # Look up token
+        result = await db.execute(select(APIToken).where(
+            APIToken.token_hash == token_hash,
+            APIToken.is_active == True
+        ))
+        db_token = result.scalar_one_or_none()
+        
+        if not db_token:
+            invalid_token_cache.set(token_hash, True)
+            return None
+        
+        # Check expiration
+        if db_token.expires_at and datetime.utcnow() > db_token.expires_at:
+            invalid_token_cache.set(token_hash, True)
+            return None
+        
+        user_info = {
+            "sub": db_token.user_id,
+            "preferred_username": db_token.username,
+            "token_id": db_token.id,
+            "token_name": db_token.name,
+            "scopes": db_token.scopes,
+            "auth_method": "api_token"
+        }
+        # Never serve a cached token past its own expiry (stored as naive UTC)
+        expires_at = None
+        if db_token.expires_at:
+            expires_at = db_token.expires_at.replace(tzinfo=timezone.utc).timestamp()
+        api_token_cache.set(token_hash, user_info, expires_at=expires_at)
     
-    # Update last used
-    db_token.last_used = datetime.utcnow()
-    db.commit()
+    # Update last used (written back in bulk by last_used_buffer)
+    last_used_buffer.record(user_info["token_id"], datetime.utcnow())
     
     # Return user info
-    return {
-        "sub": db_token.user_id,
-        "preferred_username": db_token.username,
-        "token_id": db_token.id,
-        "token_name": db_token.name,
-        "scopes": db_token.scopes,
-        "auth_method": "api_token"
-    }
-
-async def list_api_tokens(db, user_id: str) -> List[APITokenInfo]:
-    """List all API tokens for a user."""
-    tokens = db.query(APIToken).filter(
+    return dict(user_info)
+
+def is_verified_api_token(token: str) -> bool:
+    """Whether ``token`` is a live token this worker has verified recently (no database access)."""
+    return bool(API_TOKEN_PATTERN.match(token)) and hash_token(token) in api_token_cache
+
+async def list_api_tokens(db, user_id: str) -> List[Dict[str, Any]]:
+    """List all API tokens for a user as plain APITokenInfo dicts.
+
+    Only the listed columns are selected, as rows rather than entities, and
+    each becomes its response dict directly, with any buffered last use
+    merged in.
+    """
+    result = await db.execute(select(*TOKEN_INFO_COLUMNS).where(
         APIToken.user_id == user_id
-    ).order_by(APIToken.created_at.desc()).all()
-    
-    return [
-        APITokenInfo(
-            id=token.id,
-            name=token.name,
-            created_at=token.created_at,
-            expires_at=token.expires_at,
-            last_used=token.last_used,
-            is_active=token.is_active,
-            scopes=token.scopes
-        )
-        for token in tokens
-    ]
+    ).order_by(APIToken.created_at.desc()))
+    
+    tokens = [dict(row._mapping) for row in result]
+    for token in tokens:
+        token["last_used"] = last_used_buffer.pending(token["id"]) or token["last_used"]
+    return tokens
 
 async def revoke_api_token(db, user_id: str, token_id: str) -> bool:
     """Revoke an API token."""
-    token = db.query(APIToken).filter(
+    result = await db.execute(select(APIToken).where(
         APIToken.id == token_id,
         APIToken.user_id == user_id
-    ).first()
+    ))
+    token = result.scalar_one_or_none()
     
     if not token:
         return False
     
     token.is_active = False
-    db.commit()
+    await notifier.notify(db, REVOCATION_CHANNEL, [token.token_hash])
+    await db.commit()
+    api_token_cache.pop(token.token_hash)
     return True
 
 # Dependency for dual authentication (Keycloak OR API token)
 async def get_current_user_dual_auth(
+    request: Request,
     keycloak_token: Optional[str] = Depends(oauth2_scheme),
     api_credentials: Optional[HTTPAuthorizationCredentials] = Depends(api_token_scheme),
-    db = Depends(get_db)
+    db = Depends(get_async_db)
 ):
     """Get current user from either Keycloak token or API token."""
     
     # First try API token
-    if api_credentials:
+    if api_credentials and api_credentials.credentials.startswith("tk_"):
+        client = request.client.host if request.client else None
+        # Only unknown and invalid tokens are throttled, so a client flooding
+        # bad tokens cannot lock out valid tokens sent from the same address
+        retry_after = None
+        if not is_verified_api_token(api_credentials.credentials):
+            retry_after = api_token_failures.retry_after(client)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many invalid API tokens",
+                headers={"Retry-After": str(retry_after)},
+            )
+        
         user_info = await verify_api_token(api_credentials, db)
         if user_info:
             logger.debug(f"Authenticated via API token: {user_info['token_name']}")
             return user_info
+        
+        # An API token is never a valid Keycloak JWT, so don't try to decode it
+        api_token_failures.record(client)
+        keycloak_token = None
     
     # Then try Keycloak token
     if keycloak_token:
         # Import here to avoid circular dependency
-        from app.core.security import verify_token, User
+        from app.core.security import authenticate_token
         
         try:
-            payload = await verify_token(keycloak_token)
-            user_info = {
-                "sub": payload.get("sub", ""),
-                "preferred_username": payload.get("preferred_username", ""),
-                "email": payload.get("email"),
-                "name": payload.get("name", payload.get("preferred_username", "")),
-                "realm_access": payload.get("realm_access", {"roles": []}),
-                "auth_method": "keycloak"
-            }
+            user = await authenticate_token(keycloak_token)
+            user_info = {**user.model_dump(), "auth_method": "keycloak"}
             logger.debug(f"Authenticated via Keycloak: {user_info['preferred_username']}")
             return user_info
         except Exception as e:
@@ -20,6 +20,63 @@ class Settings(BaseSettings):
     KEYCLOAK_CLIENT_SECRET: str
     KEYCLOAK_VERIFY_SSL: bool = True
 
+    # Pooled HTTP client for Keycloak (timeouts and keep-alive in seconds)
+    KEYCLOAK_HTTP_MAX_CONNECTIONS: int = 20
+    KEYCLOAK_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    KEYCLOAK_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    KEYCLOAK_HTTP_TIMEOUT: float = 10.0
+    KEYCLOAK_HTTP_CONNECT_TIMEOUT: float = 5.0
+    KEYCLOAK_HTTP2: bool = False
+
+    # Identical concurrent code exchanges and refreshes share one Keycloak call,
+    # and its result is reused for this many seconds afterwards
+    KEYCLOAK_TOKEN_GRACE_PERIOD: float = 10.0
+
+    # Keycloak signing key cache (seconds)
+    KEYCLOAK_JWKS_CACHE_TTL: int = 3600
+    KEYCLOAK_JWKS_REFRESH_INTERVAL: int = 300
+    KEYCLOAK_JWKS_MIN_REFETCH_INTERVAL: int = 30
+
+    # Verified access tokens kept in memory (0 disables the cache)
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+
+    # Verified API tokens kept in memory per worker (TTL in seconds; revocations
+    # are broadcast, so this only bounds a worker cut off from the broker)
+    API_TOKEN_CACHE_TTL: int = 30
+    API_TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    # How often buffered last-used timestamps are written back (seconds)
+    API_TOKEN_LAST_USED_FLUSH_INTERVAL: int = 15
+    # Unknown token hashes are remembered so repeats never reach the database
+    API_TOKEN_NEGATIVE_CACHE_TTL: int = 300
+    API_TOKEN_NEGATIVE_CACHE_MAX_ENTRIES: int = 100000
+    # Clients presenting this many bad API tokens within the window get 429s
+    API_TOKEN_MAX_FAILURES: int = 20
+    API_TOKEN_FAILURE_WINDOW: int = 60
+
+    # Task list page sizes
+    TASK_PAGE_SIZE: int = 100
+    TASK_MAX_PAGE_SIZE: int = 1000
+    # Maximum creates + updates + deletes in one POST /tasks/bulk
+    TASK_BULK_MAX_ITEMS: int = 5000
+    # Rows fetched per server-side cursor batch by GET /tasks/export
+    TASK_EXPORT_BATCH_SIZE: int = 1000
+    # Rows written per batch by POST /tasks/import, and row errors it reports
+    TASK_IMPORT_BATCH_SIZE: int = 5000
+    TASK_IMPORT_MAX_ERRORS: int = 100
+    # Cross-worker notifications (task change feed, API token revocation):
+    # "auto" uses LISTEN/NOTIFY on PostgreSQL, "memory" is only for a single worker
+    NOTIFY_BACKEND: str = "auto"
+    # Events buffered per stream before a slow client is told to resync
+    TASK_EVENTS_QUEUE_SIZE: int = 100
+    # Seconds between keep-alive comments on idle streams
+    TASK_EVENTS_HEARTBEAT: float = 15.0
+    # Days deleted-task tombstones are kept for GET /tasks/changes (see app.cli)
+    TASK_TOMBSTONE_RETENTION_DAYS: int = 30
+
+    # Encode task and API token lists without re-validating them against the
+    # response schema (uses orjson when installed)
+    FAST_JSON_RESPONSES: bool = False
+
     # Frontend URL for redirects
     FRONTEND_URL: str
 
@@ -33,6 +90,29 @@ class Settings(BaseSettings):
     # Allow DATABASE_URL to be overridden by environment
     DATABASE_URL: Optional[str] = None
 
+    # Connection pool of each database engine, per worker (timeout and recycle in
+    # seconds; recycle -1 keeps connections until they fail)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = True
+    # Bearer token Prometheus must send to scrape GET /metrics (unset: endpoint disabled)
+    METRICS_TOKEN: Optional[str] = None
+
+    # Read replicas for read-only endpoints (JSON list of URLs; empty reads from DATABASE_URL)
+    DATABASE_REPLICA_URLS: List[str] = []
+    # Seconds a user's reads stay on the primary after they write (above replica lag)
+    READ_REPLICA_STICKY_SECONDS: float = 5.0
+    # Seconds an unreachable replica is skipped before it is tried again
+    READ_REPLICA_RETRY_SECONDS: float = 30.0
+
+    # Databases holding task data, sharded by user id (JSON list of URLs;
+    # empty keeps tasks in DATABASE_URL). Run app.cli rebalance-shards after changing it
+    DATABASE_SHARD_URLS: List[str] = []
+    # Points per shard on the consistent-hash ring
+    DATABASE_SHARD_VNODES: int = 100
+
     @validator("DATABASE_URL", pre=True)
     def construct_database_url(cls, v, values):
         """Use DATABASE_URL from environment or construct from parts."""
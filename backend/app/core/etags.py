@@ -0,0 +1,28 @@
+# app/core/etags.py
+"""Strong ETags and If-None-Match handling for conditional GETs."""
+
+from typing import Any, Optional
+import hashlib
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a quoted strong ETag from the values that identify a representation."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag``.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    ``W/`` prefix on the client's copy is ignored.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.removeprefix("W/") == etag:
+            return True
+    return False
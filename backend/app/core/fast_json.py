@@ -0,0 +1,85 @@
+# app/core/fast_json.py
+"""Opt-in fast JSON responses for hot list endpoints.
+
+FastAPI validates every returned object against the response model before
+encoding it, which for a page of ORM rows costs as much CPU as the query.
+When FAST_JSON_RESPONSES is enabled, the list endpoints instead read the
+response model's fields straight off the rows with a serializer compiled
+once per schema, and encode the result with orjson when it is installed.
+The JSON is the same; only the redundant validation is skipped.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Type
+from datetime import date, datetime
+import enum
+import json
+import logging
+import operator
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the image
+    orjson = None
+    logger.info("orjson is not installed; fast JSON responses use the standard json module")
+
+
+def _default(value: Any) -> Any:
+    """Encode the non-JSON types found in our schemas the way pydantic does."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode ``content`` as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson when available"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def compile_serializer(
+    model: Type[BaseModel], fields: Optional[Iterable[str]] = None
+) -> Callable[[Any], Dict[str, Any]]:
+    """Build a function turning any object with ``model``'s attributes into its JSON dict.
+
+    ``fields`` limits the dict to some of the model's fields. Field names are
+    resolved once here; each call is a single attrgetter plus a dict build,
+    with no validation.
+    """
+    names = tuple(model.model_fields if fields is None else fields)
+    unknown = set(names).difference(model.model_fields)
+    if unknown:
+        raise ValueError(f"{model.__name__} has no fields {', '.join(sorted(unknown))}")
+    getter = operator.attrgetter(*names)
+    if len(names) == 1:
+        return lambda obj: {names[0]: getter(obj)}
+    return lambda obj: dict(zip(names, getter(obj)))
+
+
+def fast_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """Wrap ``content`` in a FastJSONResponse carrying the headers set on ``response``.
+
+    Returning a Response bypasses the ``response`` parameter FastAPI injects,
+    so headers the handler already set (cursors, ETags) are copied over.
+    """
+    fast = FastJSONResponse(content)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name != "content-length":
+                fast.headers.append(name, value)
+    return fast
@@ -0,0 +1,59 @@
+# app/core/keycloak_client.py
+"""Shared HTTP client for talking to Keycloak."""
+
+from typing import Optional
+import logging
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Long-lived client so logins and refreshes reuse pooled keep-alive connections
+_keycloak_client: Optional[httpx.AsyncClient] = None
+
+def _http2_enabled() -> bool:
+    """HTTP/2 needs the optional ``h2`` package."""
+    if not settings.KEYCLOAK_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("KEYCLOAK_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+def create_keycloak_client() -> httpx.AsyncClient:
+    """Build a pooled client for the configured Keycloak realm."""
+    return httpx.AsyncClient(
+        base_url=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}",
+        verify=settings.KEYCLOAK_VERIFY_SSL,
+        http2=_http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=settings.KEYCLOAK_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.KEYCLOAK_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.KEYCLOAK_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            settings.KEYCLOAK_HTTP_TIMEOUT,
+            connect=settings.KEYCLOAK_HTTP_CONNECT_TIMEOUT,
+        ),
+    )
+
+def init_keycloak_client() -> httpx.AsyncClient:
+    """Create the shared client (called from the app lifespan)."""
+    global _keycloak_client
+    if _keycloak_client is None or _keycloak_client.is_closed:
+        _keycloak_client = create_keycloak_client()
+    return _keycloak_client
+
+def get_keycloak_client() -> httpx.AsyncClient:
+    """Get the shared client, creating it if the lifespan has not run."""
+    return init_keycloak_client()
+
+async def close_keycloak_client() -> None:
+    """Close the shared client and its pooled connections."""
+    global _keycloak_client
+    if _keycloak_client is not None:
+        await _keycloak_client.aclose()
+        _keycloak_client = None
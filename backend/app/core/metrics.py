@@ -0,0 +1,95 @@
+# app/core/metrics.py
+"""Prometheus text exposition for GET /metrics, without a client library.
+
+Components keep their own counters (cache hits, pool waits); the metrics
+endpoint collects them into a ``MetricsWriter`` on each scrape.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import threading
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values.
+
+    Thread-safe, since sync engines record into it from worker threads.
+    """
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.bucket_counts[i] += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Consistent (bucket counts, sum, count)."""
+        with self._lock:
+            return list(self.bucket_counts), self.sum, self.count
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Optional[Dict[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsWriter:
+    """Collects samples by metric family and renders the text format.
+
+    Samples of a family may be added in any order (one per pool, cache...);
+    they are rendered together under a single HELP and TYPE line.
+    """
+
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        if name not in self._families:
+            self._families[name] = (kind, help_text, [])
+        return self._families[name][2]
+
+    def gauge(self, name: str, help_text: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        self._family(name, "gauge", help_text).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def counter(self, name: str, help_text: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        self._family(name, "counter", help_text).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def histogram(self, name: str, help_text: str, histogram: Histogram,
+                  labels: Optional[Dict[str, str]] = None) -> None:
+        samples = self._family(name, "histogram", help_text)
+        labels = labels or {}
+        bucket_counts, total, count = histogram.snapshot()
+        for bound, bucket_count in zip(histogram.buckets, bucket_counts):
+            bucket_labels = _format_labels({**labels, "le": _format_value(float(bound))})
+            samples.append(f"{name}_bucket{bucket_labels} {bucket_count}")
+        samples.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+        samples.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        samples.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text, samples) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,171 @@
+# app/core/notify.py
+"""Cross-worker notifications over PostgreSQL LISTEN/NOTIFY.
+
+Per-worker state that has to follow writes made by other workers (task
+change feeds, the API token verification cache) subscribes to a channel
+with ``listen``. Writers call ``notify`` on their own session before they
+commit: PostgreSQL only delivers a notification when, and if, the
+transaction that sent it commits, so a write and its notification can never
+disagree and no extra round trip to a shared connection is needed.
+
+NOTIFY_BACKEND picks the transport. "postgres" keeps one LISTEN-only
+connection per worker to the primary database and to every task shard, so
+notifications sent on any of them arrive. "memory" delivers to this process
+after the session commits and is only correct with a single worker.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import Text
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+OnMessage = Callable[[str], None]
+OnLost = Optional[Callable[[], None]]
+
+NOTIFY_MANY = text(
+    "SELECT pg_notify(:channel, payload) FROM unnest(:payloads) AS payload"
+).bindparams(bindparam("payloads", type_=ARRAY(Text)))
+
+
+class BaseNotifier:
+    """Channel registry shared by both backends."""
+
+    def __init__(self):
+        self._listeners: Dict[str, List[Tuple[OnMessage, OnLost]]] = {}
+
+    def listen(self, channel: str, on_message: OnMessage, on_lost: OnLost = None) -> None:
+        """Call ``on_message`` with every payload sent on ``channel``; call before ``start``.
+
+        ``on_lost`` is called when notifications may have been missed, i.e.
+        after a listening connection is reopened.
+        """
+        self._listeners.setdefault(channel, []).append((on_message, on_lost))
+
+    def _dispatch(self, channel: str, payload: str) -> None:
+        for on_message, _ in self._listeners.get(channel, ()):
+            try:
+                on_message(payload)
+            except Exception:
+                logger.exception(f"Failed to handle notification on {channel}")
+
+    def _lost(self) -> None:
+        for listeners in self._listeners.values():
+            for _, on_lost in listeners:
+                if on_lost is not None:
+                    on_lost()
+
+    async def notify(self, db: AsyncSession, channel: str, payloads: Sequence[str]) -> None:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class MemoryNotifier(BaseNotifier):
+    """Delivers to this process once the sending session commits (single worker, SQLite, tests)."""
+
+    async def notify(self, db: AsyncSession, channel: str, payloads: Sequence[str]) -> None:
+        # Join the transaction like pg_notify would, so its rollback drops them
+        await db.connection()
+        pending = db.info.get("pending_notifications")
+        if pending is None:
+            pending = db.info["pending_notifications"] = []
+
+            def on_commit(session) -> None:
+                sent = list(pending)
+                pending.clear()
+                for sent_channel, payload in sent:
+                    self._dispatch(sent_channel, payload)
+
+            event.listen(db.sync_session, "after_commit", on_commit)
+            event.listen(db.sync_session, "after_soft_rollback", lambda session, previous: pending.clear())
+        pending.extend((channel, payload) for payload in payloads)
+
+
+class PostgresNotifier(BaseNotifier):
+    """LISTENs on dedicated connections; sends with pg_notify inside the writer's transaction."""
+
+    def __init__(self, database_urls: Sequence[str]):
+        super().__init__()
+        self.dsns = list(dict.fromkeys(
+            make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+            for url in database_urls
+        ))
+        self._tasks: List[asyncio.Task] = []
+
+    async def notify(self, db: AsyncSession, channel: str, payloads: Sequence[str]) -> None:
+        if payloads:
+            await db.execute(NOTIFY_MANY, {"channel": channel, "payloads": list(payloads)})
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        self._dispatch(channel, payload)
+
+    async def _listen_loop(self, dsn: str) -> None:
+        import asyncpg
+
+        delay = 1.0
+        reconnecting = False
+        while True:
+            closed = asyncio.Event()
+            try:
+                connection = await asyncpg.connect(dsn)
+                connection.add_termination_listener(lambda _: closed.set())
+                for channel in self._listeners:
+                    await connection.add_listener(channel, self._on_notification)
+            except Exception as e:
+                logger.error(f"Failed to listen for notifications: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+
+            delay = 1.0
+            if reconnecting:
+                self._lost()
+            try:
+                await closed.wait()
+                logger.warning("Notification connection closed; reconnecting")
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+            reconnecting = True
+
+    async def start(self) -> None:
+        """Start listening in the background."""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._listen_loop(dsn)) for dsn in self.dsns]
+
+    async def stop(self) -> None:
+        """Stop listening and close the connections."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+def create_notifier() -> BaseNotifier:
+    """Pick the backend for NOTIFY_BACKEND ("auto" uses LISTEN/NOTIFY on PostgreSQL)."""
+    backend = settings.NOTIFY_BACKEND
+    if backend == "auto":
+        backend = "postgres" if settings.DATABASE_URL.startswith("postgresql") else "memory"
+    if backend == "postgres":
+        return PostgresNotifier([settings.DATABASE_URL, *settings.DATABASE_SHARD_URLS])
+    return MemoryNotifier()
+
+
+notifier = create_notifier()
@@ -0,0 +1,27 @@
+# app/core/pagination.py
+"""Opaque cursors for keyset pagination."""
+
+from typing import Any, List
+import base64
+import json
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort-key values of the last row on a page."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor produced by :func:`encode_cursor`.
+
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
@@ -1,29 +1,39 @@
 # app/core/security.py
 from typing import Dict, Optional, List
+import asyncio
+import hashlib
 import logging
-from datetime import datetime, timedelta
-import httpx
-from jose import jwt, JWTError
-from fastapi import Depends, HTTPException, status, Security
+import time
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+from fastapi import Depends, HTTPException, Query, status, Security
 from fastapi.security import OAuth2AuthorizationCodeBearer
 from pydantic import BaseModel
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.keycloak_client import get_keycloak_client
+from app.core.singleflight import SingleFlight
 
 # Setup logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 # Define OAuth2 scheme for Keycloak
-oauth2_scheme = OAuth2AuthorizationCodeBearer(
-    authorizationUrl=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/auth",
-    tokenUrl=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token",
-    refreshUrl=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token",
-    scopes={
-        "openid": "OpenID Connect scope",
-        "profile": "Access user profile",
-        "email": "Access user email"
-    }
-)
+def keycloak_bearer(auto_error: bool = True) -> OAuth2AuthorizationCodeBearer:
+    return OAuth2AuthorizationCodeBearer(
+        authorizationUrl=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/auth",
+        tokenUrl=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token",
+        refreshUrl=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token",
+        scopes={
+            "openid": "OpenID Connect scope",
+            "profile": "Access user profile",
+            "email": "Access user email"
+        },
+        auto_error=auto_error,
+    )
+
+oauth2_scheme = keycloak_bearer()
+optional_oauth2_scheme = keycloak_bearer(auto_error=False)
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -37,57 +47,170 @@ class User(BaseModel):
     name: Optional[str] = None
     realm_access: Dict[str, List[str]] = {"roles": []}
 
-# Cache for Keycloak public key
-_keycloak_public_key = None
-_key_cache_time = None
-KEY_CACHE_DURATION = timedelta(hours=1)
+class JWKSKeyStore:
+    """Keycloak signing keys from the realm JWKS endpoint, indexed by ``kid``.
 
-async def get_keycloak_public_key() -> str:
-    """Fetch and cache Keycloak public key for token verification."""
-    global _keycloak_public_key, _key_cache_time
-    
-    # Return cached key if still valid
-    if _keycloak_public_key and _key_cache_time:
-        if datetime.utcnow() - _key_cache_time < KEY_CACHE_DURATION:
-            return _keycloak_public_key
-    
-    # Fetch new key
-    try:
-        async with httpx.AsyncClient(verify=settings.KEYCLOAK_VERIFY_SSL) as client:
-            response = await client.get(
-                f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}"
+    Keys are refreshed by a background task well before they go stale, so the
+    request path only hits Keycloak when it has no keys at all or when a token
+    carries a ``kid`` it has never seen (a rotation). Concurrent callers share
+    one in-flight fetch, and every request-path refetch is rate limited so a
+    burst of forged or rotated tokens, or an outage, cannot stampede Keycloak.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        cache_ttl: float,
+        refresh_interval: float,
+        min_refetch_interval: float,
+    ):
+        self.jwks_url = jwks_url
+        self.cache_ttl = cache_ttl
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self._keys: Dict[str, Key] = {}
+        self._fetched_at: Optional[float] = None
+        self._last_attempt: Optional[float] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    def _is_stale(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at >= self.cache_ttl
+
+    def _refetch_allowed(self) -> bool:
+        return self._last_attempt is None or time.monotonic() - self._last_attempt >= self.min_refetch_interval
+
+    async def get_key(self, kid: Optional[str]) -> Key:
+        """Return the verification key for ``kid``, fetching the JWKS only when needed."""
+        if not self._keys:
+            if self._inflight is None and not self._refetch_allowed():
+                # The last fetch failed or found no keys moments ago; fail fast
+                # instead of making every request wait on Keycloak again
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Failed to fetch authentication configuration"
+                )
+            await self.refresh()
+        elif self._is_stale() and (self._inflight is not None or self._refetch_allowed()):
+            try:
+                await self.refresh()
+            except HTTPException:
+                # Keep serving the last known keys while Keycloak is unreachable
+                logger.warning("Using stale Keycloak signing keys")
+
+        key = self._lookup(kid)
+        if key is None and (self._inflight is not None or self._refetch_allowed()):
+            # Unknown kid: Keycloak may have rotated its keys
+            await self.refresh()
+            key = self._lookup(kid)
+
+        if key is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
             )
+        return key
+
+    def _lookup(self, kid: Optional[str]) -> Optional[Key]:
+        if kid is None:
+            # Tokens without a kid are only acceptable while the realm has a single key
+            return next(iter(self._keys.values())) if len(self._keys) == 1 else None
+        return self._keys.get(kid)
+
+    async def refresh(self) -> None:
+        """Fetch the JWKS, joining an already running fetch instead of starting another."""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch())
+            self._inflight.add_done_callback(self._clear_inflight)
+        # Shield so a cancelled request does not abort the fetch other callers wait on
+        await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, task: asyncio.Task) -> None:
+        if self._inflight is task:
+            self._inflight = None
+        if not task.cancelled():
+            # Mark the exception as retrieved when nobody is left awaiting it
+            task.exception()
+
+    async def _fetch(self) -> None:
+        self._last_attempt = time.monotonic()
+        try:
+            response = await get_keycloak_client().get(self.jwks_url)
             response.raise_for_status()
-            realm_info = response.json()
-            
-            # Format the public key
-            public_key = realm_info.get("public_key", "")
-            formatted_key = f"-----BEGIN PUBLIC KEY-----\n{public_key}\n-----END PUBLIC KEY-----"
-            
-            # Cache the key
-            _keycloak_public_key = formatted_key
-            _key_cache_time = datetime.utcnow()
-            
-            return formatted_key
-            
-    except Exception as e:
-        logger.error(f"Failed to fetch Keycloak public key: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Failed to fetch authentication configuration"
-        )
+            jwks = response.json()
+            key_list = jwks.get("keys", []) if isinstance(jwks, dict) else None
+            if not isinstance(key_list, list):
+                raise ValueError("JWKS response has no list of keys")
+        except Exception as e:
+            logger.error(f"Failed to fetch Keycloak signing keys: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Failed to fetch authentication configuration"
+            )
+
+        keys = {}
+        for key_data in key_list:
+            if not isinstance(key_data, dict) or key_data.get("use", "sig") != "sig" or "kid" not in key_data:
+                continue
+            try:
+                keys[key_data["kid"]] = jwk.construct(key_data, algorithm=key_data.get("alg", "RS256"))
+            except Exception as e:
+                # JWKError, or KeyError/TypeError for keys missing fields
+                logger.warning(f"Skipping unusable Keycloak key {key_data['kid']}: {e}")
+
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        logger.debug(f"Loaded {len(keys)} Keycloak signing keys")
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+                delay = self.refresh_interval
+            except HTTPException:
+                delay = self.min_refetch_interval
+            except Exception:
+                # Never let an unexpected error end background refreshing
+                logger.exception("Refreshing Keycloak signing keys failed")
+                delay = self.min_refetch_interval
+            await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        """Start refreshing keys in the background."""
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop the background refresh task."""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+
+jwks_store = JWKSKeyStore(
+    jwks_url=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/certs",
+    cache_ttl=settings.KEYCLOAK_JWKS_CACHE_TTL,
+    refresh_interval=settings.KEYCLOAK_JWKS_REFRESH_INTERVAL,
+    min_refetch_interval=settings.KEYCLOAK_JWKS_MIN_REFETCH_INTERVAL,
+)
 
 async def verify_token(token: str) -> Dict:
     """Verify and decode a Keycloak JWT token."""
     try:
-        # Get the public key
-        public_key = await get_keycloak_public_key()
+        # Pick the signing key named in the token header
+        header = jwt.get_unverified_header(token)
+        signing_key = await jwks_store.get_key(header.get("kid"))
         
         # Decode and verify the token
         # For public clients, the audience might be "account" or the client_id
         payload = jwt.decode(
             token,
-            public_key,
+            signing_key,
             algorithms=["RS256"],
             options={"verify_aud": False},  # Skip audience verification for now
             issuer=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}"
@@ -98,6 +221,8 @@ async def verify_token(token: str) -> Dict:
         
         return payload
         
+    except HTTPException:
+        raise
     except JWTError as e:
         logger.error(f"JWT verification failed: {e}")
         raise HTTPException(
@@ -113,8 +238,19 @@ async def verify_token(token: str) -> Dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
-    """Extract and validate user from JWT token."""
+# Verified tokens, keyed by digest, so repeat requests skip signature checks
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAX_ENTRIES)
+
+def token_cache_key(token: str) -> str:
+    """Digest used to index a bearer token without keeping it in memory."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def authenticate_token(token: str) -> User:
+    """Return the user for a Keycloak token, verifying it only on a cache miss."""
+    cache_key = token_cache_key(token)
+    user = token_cache.get(cache_key)
+    if user is not None:
+        return user
     
     # Verify the token
     payload = await verify_token(token)
@@ -128,9 +264,39 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         realm_access=payload.get("realm_access", {"roles": []})
     )
     
+    # Only tokens with an expiry are cached, and never past that expiry
+    if payload.get("exp"):
+        token_cache.set(cache_key, user, expires_at=float(payload["exp"]))
+    return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    """Extract and validate user from JWT token."""
+    user = await authenticate_token(token)
+    
     logger.debug(f"Authenticated user: {user.preferred_username}")
     return user
 
+def token_expiry(token: str) -> Optional[float]:
+    """Expiry (Unix time) of a token that has already been authenticated."""
+    exp = jwt.get_unverified_claims(token).get("exp")
+    return float(exp) if exp else None
+
+async def get_stream_token(
+    access_token: Optional[str] = Query(
+        None, description="Access token for clients such as EventSource that cannot send headers"
+    ),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+) -> str:
+    """Bearer token for a long-lived stream, from the Authorization header or ``access_token``."""
+    token = token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Return the current active user."""
     return current_user
@@ -147,25 +313,33 @@ def require_role(required_role: str):
         return current_user
     return role_checker
 
+# Concurrent identical token requests (e.g. several tabs refreshing at once)
+# share one upstream call; Keycloak rotates refresh tokens, so duplicates would fail
+keycloak_token_calls = SingleFlight(grace_period=settings.KEYCLOAK_TOKEN_GRACE_PERIOD)
+
+async def _request_token(token_data: Dict[str, str]) -> Dict:
+    """POST to the realm token endpoint."""
+    response = await get_keycloak_client().post(
+        "/protocol/openid-connect/token",
+        data=token_data
+    )
+    response.raise_for_status()
+    return response.json()
+
 # Optional: Function to exchange authorization code for token (for frontend integration)
 async def exchange_code_for_token(code: str, redirect_uri: str) -> Dict:
     """Exchange authorization code for access token."""
     try:
-        async with httpx.AsyncClient(verify=settings.KEYCLOAK_VERIFY_SSL) as client:
-            # For public clients, don't send client_secret
-            token_data = {
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": redirect_uri,
-                "client_id": settings.KEYCLOAK_CLIENT_ID
-            }
-            
-            response = await client.post(
-                f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token",
-                data=token_data
-            )
-            response.raise_for_status()
-            return response.json()
+        # For public clients, don't send client_secret
+        token_data = {
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": redirect_uri,
+            "client_id": settings.KEYCLOAK_CLIENT_ID
+        }
+        
+        key = ("authorization_code", token_cache_key(f"{code} {redirect_uri}"))
+        return await keycloak_token_calls.do(key, lambda: _request_token(token_data))
     except Exception as e:
         logger.error(f"Token exchange failed: {e}")
         raise HTTPException(
@@ -177,23 +351,18 @@ async def exchange_code_for_token(code: str, redirect_uri: str) -> Dict:
 async def refresh_token_with_keycloak(refresh_token: str) -> Dict:
     """Refresh access token using refresh token."""
     try:
-        async with httpx.AsyncClient(verify=settings.KEYCLOAK_VERIFY_SSL) as client:
-            # For public clients, don't send client_secret
-            token_data = {
-                "grant_type": "refresh_token",
-                "refresh_token": refresh_token,
-                "client_id": settings.KEYCLOAK_CLIENT_ID
-            }
-            
-            response = await client.post(
-                f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token",
-                data=token_data
-            )
-            response.raise_for_status()
-            return response.json()
+        # For public clients, don't send client_secret
+        token_data = {
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "client_id": settings.KEYCLOAK_CLIENT_ID
+        }
+        
+        key = ("refresh_token", token_cache_key(refresh_token))
+        return await keycloak_token_calls.do(key, lambda: _request_token(token_data))
     except Exception as e:
         logger.error(f"Token refresh failed: {e}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Failed to refresh token"
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,59 @@
+# app/core/singleflight.py
+"""Coalescing of identical concurrent async calls."""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+from app.core.cache import TTLCache
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """Run one call per key at a time and share its result with every waiter.
+
+    While a call for a key is in flight, further callers with the same key
+    await that call instead of starting their own. Successful results are
+    then kept for ``grace_period`` seconds so stragglers arriving just after
+    completion get the same answer; failures are never kept.
+    """
+
+    def __init__(self, grace_period: float, maxsize: int = 10000):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._results = TTLCache(maxsize=maxsize if grace_period > 0 else 0, ttl=grace_period)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return ``fn()``'s result, sharing it with concurrent callers of ``key``."""
+        result = self._results.get(key, _MISSING)
+        if result is not _MISSING:
+            return result
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, fn))
+            task.add_done_callback(_retrieve_exception)
+            self._inflight[key] = task
+        # Shield so one waiter disconnecting does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await fn()
+            self._results.set(key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def forget(self, key: Hashable) -> None:
+        """Drop a held result so the next call goes upstream again."""
+        self._results.pop(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Return in-flight count and grace-window hit/miss counters."""
+        return {"inflight": len(self._inflight), **self._results.stats()}
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    # Avoid "exception was never retrieved" when every waiter went away
+    if not task.cancelled():
+        task.exception()
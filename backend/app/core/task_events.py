@@ -0,0 +1,158 @@
+# app/core/task_events.py
+"""Push notifications of task changes to the owning user's open streams.
+
+Writes publish small events (``{"type": "created", "ids": [...]}``) in
+their own transaction through ``app.core.notify``, so every worker hears
+about a change exactly when it commits. Each worker then fans them out to
+its local subscribers through ``TaskEventBus``.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+import asyncio
+import json
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.notify import notifier
+
+logger = logging.getLogger(__name__)
+
+# Sent to a subscriber whose queue overflowed, or after the broker lost
+# events; the client should refetch instead of applying deltas
+RESYNC = {"type": "resync"}
+
+
+class TaskEventBus:
+    """In-process fan-out of task events to per-connection queues.
+
+    Each open stream owns a bounded queue, so a slow client can never make
+    the bus buffer without limit: when its queue is full the backlog is
+    replaced by a single resync event.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """Register a new stream for ``user_id`` and return its queue."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def deliver(self, user_id: str, event: Dict[str, Any]) -> None:
+        """Queue ``event`` for every local stream of ``user_id``."""
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def broadcast(self, event: Dict[str, Any]) -> None:
+        """Queue ``event`` for every local stream."""
+        for user_id in list(self._subscribers):
+            self.deliver(user_id, event)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._subscribers),
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+        }
+
+
+task_event_bus = TaskEventBus(queue_size=settings.TASK_EVENTS_QUEUE_SIZE)
+
+# Notification channel carrying task events between workers
+TASK_EVENTS_CHANNEL = "task_events"
+
+# NOTIFY payloads must stay below 8000 bytes
+MAX_IDS_PER_NOTIFY = 500
+
+
+def deliver_notification(payload: str) -> None:
+    """Hand a task event from any worker to this worker's streams."""
+    try:
+        event = json.loads(payload)
+        user_id = event.pop("user_id")
+    except (ValueError, KeyError) as e:
+        logger.warning(f"Ignoring malformed task event: {e}")
+        return
+    task_event_bus.deliver(user_id, event)
+
+
+# Events sent while a listening connection was down are lost, so streams resync
+notifier.listen(TASK_EVENTS_CHANNEL, deliver_notification, lambda: task_event_bus.broadcast(RESYNC))
+
+
+async def publish_task_event(db: AsyncSession, user_id: str, event_type: str,
+                             ids: Optional[List[int]] = None, details: Optional[Dict[str, Any]] = None) -> None:
+    """Tell the user's streams that tasks changed once ``db`` commits; call before committing.
+
+    ``details`` are extra fields of the event, e.g. the counts of an import.
+    """
+    event = {"type": event_type, **(details or {})}
+    if ids is None:
+        batches = [None]
+    elif not ids:
+        return
+    else:
+        ids = list(ids)
+        batches = [ids[i:i + MAX_IDS_PER_NOTIFY] for i in range(0, len(ids), MAX_IDS_PER_NOTIFY)]
+    payloads = []
+    for batch in batches:
+        payload = {"user_id": user_id, **event}
+        if batch is not None:
+            payload["ids"] = batch
+        payloads.append(json.dumps(payload))
+    await notifier.notify(db, TASK_EVENTS_CHANNEL, payloads)
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """Render an event as a server-sent event."""
+    data = {key: value for key, value in event.items() if key != "type"}
+    return f"event: {event['type']}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def stream_task_events(user_id: str, expires_at: Optional[float] = None) -> AsyncIterator[str]:
+    """Server-sent events for one connection of ``user_id``.
+
+    Idle connections only wake up for a heartbeat comment every
+    TASK_EVENTS_HEARTBEAT seconds, which also lets proxies and the server
+    notice dead peers. At ``expires_at`` (the expiry of the token that
+    opened the stream) an "expired" event is sent and the stream ends, so
+    the client has to reconnect with a fresh token. The subscription is
+    removed when the stream ends or the client goes away and the response
+    cancels this generator.
+    """
+    queue = task_event_bus.subscribe(user_id)
+    try:
+        yield ": connected\n\n"
+        while True:
+            timeout = settings.TASK_EVENTS_HEARTBEAT
+            if expires_at is not None:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    yield format_event({"type": "expired"})
+                    return
+                timeout = min(timeout, remaining)
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if expires_at is None or time.time() < expires_at:
+                    yield ": heartbeat\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        task_event_bus.unsubscribe(user_id, queue)
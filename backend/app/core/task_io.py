@@ -0,0 +1,290 @@
+# app/core/task_io.py
+"""Streaming export and import of tasks as NDJSON or CSV."""
+
+from typing import Any, AsyncIterator, Dict, Iterable, List, Tuple, Type, Union
+from uuid import uuid4
+import asyncio
+import codecs
+import csv
+import enum
+import io
+import json
+import logging
+
+from sqlalchemy import String, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import settings
+from app.core.task_events import publish_task_event
+from app.core.task_mutations import load_tasks
+from app.models.task import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFileFormat(str, enum.Enum):
+    """Supported export/import file formats"""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self is TaskFileFormat.NDJSON else "text/csv"
+
+
+# Columns written by the export, in CSV column order
+EXPORT_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.status,
+    Task.priority,
+    Task.due_date,
+    Task.created_at,
+    Task.updated_at,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+# Empty CSV cells in these columns are read back as NULL (empty text stays empty)
+NULLABLE_FIELDS = {
+    column.key for column in Task.__table__.columns
+    if column.nullable and not isinstance(column.type, String)
+}
+
+
+def _plain(value: Any) -> Any:
+    """Convert enums and datetimes to their JSON/CSV representation."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _row_dict(row: Row) -> Dict[str, Any]:
+    return {field: _plain(value) for field, value in zip(EXPORT_FIELDS, row)}
+
+
+def encode_ndjson(rows: Iterable[Row]) -> bytes:
+    """Encode rows as newline-delimited JSON."""
+    return "".join(json.dumps(_row_dict(row), ensure_ascii=False) + "\n" for row in rows).encode()
+
+
+def encode_csv(rows: Iterable[Row], header: bool = False) -> bytes:
+    """Encode rows as CSV, optionally preceded by the header line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow(["" if value is None else _plain(value) for value in row])
+    return buffer.getvalue().encode()
+
+
+async def stream_task_export(db: AsyncSession, user_id: str, file_format: TaskFileFormat) -> AsyncIterator[bytes]:
+    """Yield the user's tasks in ``file_format``, one encoded batch at a time.
+
+    Rows come from a server-side cursor (``yield_per``) as plain column tuples,
+    so memory stays flat regardless of how many tasks the user has.
+    """
+    if file_format is TaskFileFormat.CSV:
+        yield encode_csv([], header=True)
+
+    query = (
+        select(*EXPORT_COLUMNS)
+        .where(Task.user_id == user_id)
+        .order_by(Task.id)
+        .execution_options(yield_per=settings.TASK_EXPORT_BATCH_SIZE)
+    )
+    result = await db.stream(query)
+    async for rows in result.partitions():
+        if file_format is TaskFileFormat.CSV:
+            yield encode_csv(rows)
+        else:
+            yield encode_ndjson(rows)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without reading it all first.
+
+    Decoding is incremental, so multi-byte characters split across chunks
+    are handled; a leading BOM is dropped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+class _ChunkReader(io.RawIOBase):
+    """Blocking file view of an async byte stream, for a parser running in a worker thread.
+
+    A read that runs out of data fetches the next chunk on the event loop and
+    waits for it, so the stream is consumed only as fast as it is parsed.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+        self._chunks = chunks
+        self._loop = loop
+        self._pending = memoryview(b"")
+        self._done = False
+
+    async def _next_chunk(self) -> bytes:
+        return await self._chunks.__anext__()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._done:
+            try:
+                self._pending = memoryview(asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result())
+            except StopAsyncIteration:
+                self._done = True
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Union[List[str], ValueError]]:
+    """Yield the rows of a CSV byte stream as ``csv.reader`` parses them.
+
+    csv.reader needs a blocking file, so it reads a TextIOWrapper over the
+    stream in a worker thread and hands rows back up to
+    TASK_IMPORT_BATCH_SIZE at a time, while the event loop keeps receiving
+    the body. Line breaks inside quoted fields are kept exactly as sent; a
+    row that fails to parse is yielded as a ValueError.
+    """
+    stream = _ChunkReader(chunks, asyncio.get_running_loop())
+    reader = csv.reader(io.TextIOWrapper(io.BufferedReader(stream), encoding="utf-8-sig", newline=""), strict=True)
+
+    def read_rows() -> Tuple[List[Union[List[str], ValueError]], bool]:
+        rows: List[Union[List[str], ValueError]] = []
+        while len(rows) < settings.TASK_IMPORT_BATCH_SIZE:
+            try:
+                rows.append(next(reader))
+            except StopIteration:
+                return rows, True
+            except csv.Error as e:
+                rows.append(ValueError(str(e)))
+        return rows, False
+
+    done = False
+    while not done:
+        rows, done = await asyncio.to_thread(read_rows)
+        for row in rows:
+            yield row
+
+
+async def iter_records(chunks: AsyncIterator[bytes], file_format: TaskFileFormat) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield ``(row number, record)`` for each row of an NDJSON or CSV stream.
+
+    A record is a dict of raw field values, or the ValueError raised while
+    parsing that row. CSV rows are keyed by the header line, quoted fields may
+    span lines, and empty cells of nullable columns become None.
+    """
+    row_number = 0
+    if file_format is TaskFileFormat.NDJSON:
+        async for line in iter_lines(chunks):
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Expected a JSON object")
+                yield row_number, record
+            except ValueError as e:
+                yield row_number, e
+        return
+
+    header = None
+    async for values in iter_csv_rows(chunks):
+        if values == []:
+            continue
+        if header is None:
+            header = values if isinstance(values, list) else []
+            continue
+        row_number += 1
+        if isinstance(values, Exception):
+            yield row_number, values
+        elif len(values) != len(header):
+            yield row_number, ValueError(f"Expected {len(header)} fields, got {len(values)}")
+        else:
+            yield row_number, {
+                field: None if value == "" and field in NULLABLE_FIELDS else value
+                for field, value in zip(header, values)
+            }
+
+
+def _describe_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()
+        )
+    return str(error)
+
+
+async def import_tasks(
+    db: AsyncSession,
+    user_id: str,
+    chunks: AsyncIterator[bytes],
+    file_format: TaskFileFormat,
+    schema: Type[BaseModel],
+) -> Dict[str, Any]:
+    """Validate rows against ``schema`` as they arrive and insert them in batches.
+
+    Each batch of TASK_IMPORT_BATCH_SIZE valid rows is written with
+    ``load_tasks`` and committed with a resync event, so a large import never
+    holds more than one batch in memory or in an open transaction. Every
+    commit also sends the user's streams an "import" event with the counts so
+    far ("done" on the last one), so clients can show progress while the body
+    uploads. Invalid rows are skipped and reported (up to
+    TASK_IMPORT_MAX_ERRORS of them).
+    """
+    import_id = uuid4().hex
+    processed = imported = failed = 0
+    errors: List[Dict[str, Any]] = []
+    batch: List[Dict[str, Any]] = []
+
+    async def flush(done: bool = False) -> None:
+        nonlocal imported
+        if batch:
+            imported += await load_tasks(db, user_id, batch)
+            # Too many ids to list; streams should reload
+            await publish_task_event(db, user_id, "resync")
+        await publish_task_event(db, user_id, "import", details={
+            "import_id": import_id, "processed": processed, "imported": imported, "failed": failed, "done": done,
+        })
+        await db.commit()
+        batch.clear()
+        logger.info(f"Task import {import_id} for {user_id}: "
+                    f"{processed} rows processed, {imported} imported, {failed} failed")
+
+    async for row_number, record in iter_records(chunks, file_format):
+        processed += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            batch.append(schema.model_validate(record).model_dump())
+        except ValueError as e:
+            failed += 1
+            if len(errors) < settings.TASK_IMPORT_MAX_ERRORS:
+                errors.append({"row": row_number, "error": _describe_error(e)})
+            continue
+        if len(batch) >= settings.TASK_IMPORT_BATCH_SIZE:
+            await flush()
+    await flush(done=True)
+
+    return {
+        "import_id": import_id, "processed": processed, "imported": imported, "failed": failed, "errors": errors,
+    }
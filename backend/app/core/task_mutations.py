@@ -0,0 +1,171 @@
+# app/core/task_mutations.py
+"""Set-based task writes shared by the single-item and bulk endpoints.
+
+These helpers only execute statements; the caller owns the transaction and
+commits once, so a whole batch succeeds or fails together. Change sequence
+numbers, tombstones for deletes and the per-user task counters are written
+by database triggers within each statement (see app.models.task), so every
+write here is a single statement.
+
+On PostgreSQL each row write also takes its user's change lock (after the
+row lock). A transaction that writes with several statements must lock the
+rows it will update or delete first, with ``lock_tasks``, so that locks are
+always taken rows first and concurrent writers cannot deadlock.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+from datetime import datetime
+import enum
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.task import Task
+
+
+async def insert_tasks(db: AsyncSession, user_id: str, rows: List[Dict[str, Any]]) -> List[int]:
+    """Insert tasks for ``user_id`` in one multi-row INSERT and return their ids in order."""
+    if not rows:
+        return []
+    now = datetime.utcnow()
+    params = [{**row, "user_id": user_id, "created_at": now, "updated_at": now} for row in rows]
+    result = await db.execute(
+        insert(Task).returning(Task.id, sort_by_parameter_order=True),
+        params,
+    )
+    return list(result.scalars())
+
+
+# Columns written by COPY in load_tasks, in record order
+COPY_COLUMNS = (
+    "user_id", "title", "description", "status", "priority", "due_date", "created_at", "updated_at",
+)
+
+
+async def load_tasks(db: AsyncSession, user_id: str, rows: List[Dict[str, Any]]) -> int:
+    """Insert a large batch of tasks for ``user_id`` without returning ids.
+
+    On PostgreSQL the rows are streamed with COPY; other backends get one
+    executemany INSERT. Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    now = datetime.utcnow()
+    params = [{**row, "user_id": user_id, "created_at": now, "updated_at": now} for row in rows]
+    connection = await db.connection()
+    if connection.dialect.driver != "asyncpg":
+        await db.execute(insert(Task), params)
+        return len(params)
+
+    # Enum columns hold member names, as SQLAlchemy's Enum type writes them
+    records = [
+        tuple(
+            value.name if isinstance(value, enum.Enum) else value
+            for value in (row[column] for column in COPY_COLUMNS)
+        )
+        for row in params
+    ]
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        Task.__tablename__, records=records, columns=COPY_COLUMNS
+    )
+    return len(records)
+
+
+async def lock_tasks(db: AsyncSession, user_id: str, task_ids: Iterable[int]) -> Set[int]:
+    """Lock the user's tasks among ``task_ids`` in id order and return the ids found."""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return set()
+    result = await db.execute(
+        select(Task.id).where(Task.user_id == user_id, Task.id.in_(task_ids)).order_by(Task.id).with_for_update()
+    )
+    return set(result.scalars())
+
+
+async def update_tasks(db: AsyncSession, user_id: str, changes: Dict[int, Dict[str, Any]]) -> Set[int]:
+    """Apply partial updates keyed by task id and return the ids that were updated.
+
+    Ids the user does not own are skipped. Ownership is read with one locking
+    SELECT, then all rows are written as a bulk UPDATE by primary key.
+    """
+    if not changes:
+        return set()
+    owned = await lock_tasks(db, user_id, changes)
+
+    now = datetime.utcnow()
+    params = [{**fields, "id": task_id, "updated_at": now} for task_id, fields in changes.items() if task_id in owned]
+    if params:
+        await db.execute(update(Task), params)
+    return owned
+
+
+async def delete_tasks(db: AsyncSession, user_id: str, task_ids: Iterable[int]) -> Set[int]:
+    """Delete the user's tasks among ``task_ids`` in one statement and return the deleted ids."""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return set()
+    statement = (
+        delete(Task)
+        .where(Task.user_id == user_id, Task.id.in_(task_ids))
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.delete_returning:
+        result = await db.execute(statement.returning(Task.id))
+        deleted = list(result.scalars())
+    else:
+        # Older SQLite without RETURNING: find the rows first
+        result = await db.execute(select(Task.id).where(Task.user_id == user_id, Task.id.in_(task_ids)))
+        deleted = list(result.scalars())
+        await db.execute(statement)
+    return set(deleted)
+
+
+async def create_task(db: AsyncSession, user_id: str, fields: Dict[str, Any]) -> Task:
+    """Insert one task with INSERT ... RETURNING and return the stored row."""
+    now = datetime.utcnow()
+    values = {**fields, "user_id": user_id, "created_at": now, "updated_at": now}
+    if db.get_bind().dialect.insert_returning:
+        result = await db.execute(insert(Task).values(**values).returning(Task))
+        return result.scalar_one()
+
+    # Without RETURNING the ORM INSERT still needs no reload: every column the API returns is set here
+    task = Task(**values)
+    db.add(task)
+    await db.flush()
+    return task
+
+
+async def update_task(db: AsyncSession, user_id: str, task_id: int, fields: Dict[str, Any]) -> Optional[Task]:
+    """Update one of the user's tasks with UPDATE ... RETURNING.
+
+    Ownership is part of the WHERE clause, so a missing or foreign task
+    returns None without a separate lookup.
+    """
+    if not fields:
+        result = await db.execute(select(Task).where(Task.id == task_id, Task.user_id == user_id))
+        return result.scalar_one_or_none()
+
+    statement = (
+        update(Task)
+        .where(Task.id == task_id, Task.user_id == user_id)
+        .values(**fields, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        result = await db.execute(statement.returning(Task))
+        return result.scalar_one_or_none()
+
+    # Older SQLite without RETURNING: read the row back after updating it
+    result = await db.execute(statement)
+    if result.rowcount == 0:
+        return None
+    result = await db.execute(
+        select(Task).where(Task.id == task_id).execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+async def delete_task(db: AsyncSession, user_id: str, task_id: int) -> bool:
+    """Delete one of the user's tasks; False if it does not exist or is not theirs."""
+    return task_id in await delete_tasks(db, user_id, [task_id])
@@ -0,0 +1,165 @@
+# app/core/task_queries.py
+"""Filtering, sorting and keyset pagination for task listings."""
+
+from typing import Any, Iterable, List, Optional, Tuple
+from datetime import datetime
+import enum
+
+from sqlalchemy import Select, and_, or_, select, tuple_
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.task import Task, TaskStatus, TaskPriority, TaskSyncState
+
+
+# Columns of a task as the API returns it. Selecting these instead of the
+# entity yields plain rows: no identity map entries, no change tracking, and
+# nothing for the serializer but attribute reads
+TASK_READ_COLUMNS = (
+    Task.id,
+    Task.user_id,
+    Task.title,
+    Task.description,
+    Task.status,
+    Task.priority,
+    Task.due_date,
+    Task.created_at,
+    Task.updated_at,
+)
+
+TASK_FIELDS = tuple(column.key for column in TASK_READ_COLUMNS)
+
+# Fields of list responses without ``fields=``; descriptions are unbounded
+# text the list view does not show, so they are only read when asked for
+TASK_LIST_FIELDS = tuple(name for name in TASK_FIELDS if name != "description")
+
+
+def parse_fields(fields: Optional[str], default: Tuple[str, ...] = TASK_FIELDS) -> Tuple[str, ...]:
+    """Field names from a comma-separated ``fields`` parameter, in column order.
+
+    ``id`` is always included. Raises ValueError naming any unknown field.
+    """
+    if fields is None:
+        return default
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names.difference(TASK_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    names.add("id")
+    return tuple(name for name in TASK_FIELDS if name in names)
+
+
+def read_query(*fields: Iterable[str]) -> Select:
+    """Read-only select of task columns the API returns, as rows.
+
+    With field name sets, only the columns named in any of them are selected.
+    """
+    if not fields:
+        return select(*TASK_READ_COLUMNS)
+    wanted = set().union(*fields)
+    return select(*(column for column in TASK_READ_COLUMNS if column.key in wanted))
+
+
+class TaskSort(str, enum.Enum):
+    """Sort keys accepted by GET /tasks (prefix "-" for descending)"""
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+    UPDATED_AT = "updated_at"
+    UPDATED_AT_DESC = "-updated_at"
+    DUE_DATE = "due_date"
+    DUE_DATE_DESC = "-due_date"
+
+    @property
+    def field(self) -> str:
+        return self.value.lstrip("-")
+
+    @property
+    def column(self):
+        return getattr(Task, self.field)
+
+    @property
+    def descending(self) -> bool:
+        return self.value.startswith("-")
+
+    @property
+    def nullable(self) -> bool:
+        return Task.__table__.c[self.field].nullable
+
+
+def apply_filters(
+    query: Select,
+    user_id: str,
+    status: Optional[List[TaskStatus]] = None,
+    priority: Optional[List[TaskPriority]] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+) -> Select:
+    """Restrict a task query to one user's tasks matching the given filters.
+
+    Status/priority sets with a due-date range are served by the
+    (user_id, status, due_date) and (user_id, priority, due_date) indexes.
+    """
+    query = query.where(Task.user_id == user_id)
+    if status:
+        query = query.where(Task.status.in_(status))
+    if priority:
+        query = query.where(Task.priority.in_(priority))
+    if due_after is not None:
+        query = query.where(Task.due_date >= due_after)
+    if due_before is not None:
+        query = query.where(Task.due_date < due_before)
+    return query
+
+
+def apply_sort(query: Select, sort: TaskSort) -> Select:
+    """Order by the sort key with id as tie-breaker; NULL due dates sort last."""
+    column = sort.column.desc() if sort.descending else sort.column.asc()
+    task_id = Task.id.desc() if sort.descending else Task.id.asc()
+    if sort.nullable:
+        column = column.nulls_last()
+    return query.order_by(column, task_id)
+
+
+def apply_cursor(query: Select, sort: TaskSort, cursor: str) -> Select:
+    """Continue after the row a cursor points at.
+
+    Raises ValueError if the cursor is malformed or was issued for another sort.
+    """
+    try:
+        cursor_sort, value, task_id = decode_cursor(cursor)
+        if cursor_sort != sort.value or not isinstance(task_id, int):
+            raise ValueError("Cursor does not match sort")
+        value = None if value is None else datetime.fromisoformat(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if value is None and not sort.nullable:
+        raise ValueError("Invalid cursor")
+
+    column = sort.column
+    after = (lambda a, b: a < b) if sort.descending else (lambda a, b: a > b)
+    if not sort.nullable:
+        # Row-value comparison so the composite index serves the seek
+        return query.where(after(tuple_(column, Task.id), tuple_(value, task_id)))
+    if value is None:
+        # Already in the trailing NULL block
+        return query.where(and_(column.is_(None), after(Task.id, task_id)))
+    return query.where(or_(
+        after(column, value),
+        and_(column == value, after(Task.id, task_id)),
+        column.is_(None),
+    ))
+
+
+def next_cursor(sort: TaskSort, last: Any) -> str:
+    """Cursor for the page after ``last`` (any object with the task columns)."""
+    value = getattr(last, sort.field)
+    return encode_cursor([sort.value, value.isoformat() if value is not None else None, last.id])
+
+
+def version_query(user_id: str) -> Select:
+    """The user's latest change number, ``TaskSyncState.last_seq``.
+
+    The task triggers raise it within every create, update and delete, so it
+    versions the whole list with a single primary-key lookup. Users who never
+    wrote have no row; callers treat that as 0.
+    """
+    return select(TaskSyncState.last_seq).where(TaskSyncState.user_id == user_id)
@@ -0,0 +1,68 @@
+# app/core/task_search.py
+"""Ranked full-text search over task titles and descriptions.
+
+The search index lives in the database (see ``TASK_SEARCH_DDL`` in
+``app.models.task``): a GIN-indexed tsvector column on PostgreSQL and an FTS5
+table on SQLite. Results are ordered by rank, best first, and paged with
+keyset cursors over (rank, id).
+"""
+
+from typing import Tuple
+import re
+
+from sqlalchemy import Select, and_, func, literal_column, or_, select, table, column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.task import Task
+
+# Words of a query, for building FTS5 MATCH expressions
+SEARCH_TERM = re.compile(r"\w+", re.UNICODE)
+
+search_vector = literal_column("tasks.search_vector", type_=TSVECTOR)
+tasks_fts = table("tasks_fts", column("rowid"))
+
+
+def search_query(dialect: str, user_id: str, q: str) -> Tuple[Select, ColumnElement]:
+    """Select the user's tasks matching ``q`` with their rank, best match first.
+
+    Returns the query and its rank expression (higher is better). On
+    PostgreSQL ``q`` uses web search syntax ("quoted phrases", -exclusions,
+    or); elsewhere every word must match.
+    """
+    if dialect == "postgresql":
+        ts_query = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), q)
+        rank = func.ts_rank_cd(search_vector, ts_query)
+        query = select(Task).where(Task.user_id == user_id, search_vector.op("@@")(ts_query))
+    else:
+        # Quote every word so user input never reaches the FTS5 query syntax
+        match = " ".join(f'"{term}"' for term in SEARCH_TERM.findall(q)) or '""'
+        # bm25() is lower for better matches; titles weigh more than descriptions
+        rank = -func.bm25(literal_column("tasks_fts"), 10.0, 1.0)
+        query = (
+            select(Task)
+            .join(tasks_fts, tasks_fts.c.rowid == Task.id)
+            .where(Task.user_id == user_id, literal_column("tasks_fts").op("MATCH")(match))
+        )
+    query = query.add_columns(rank.label("rank")).order_by(rank.desc(), Task.id.desc())
+    return query, rank
+
+
+def apply_search_cursor(query: Select, rank: ColumnElement, q: str, cursor: str) -> Select:
+    """Continue a search after the row a cursor points at.
+
+    Raises ValueError if the cursor is malformed or was issued for another query.
+    """
+    try:
+        cursor_q, last_rank, task_id = decode_cursor(cursor)
+        if cursor_q != q or not isinstance(last_rank, (int, float)) or not isinstance(task_id, int):
+            raise ValueError("Cursor does not match query")
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    return query.where(or_(rank < last_rank, and_(rank == last_rank, Task.id < task_id)))
+
+
+def next_search_cursor(q: str, rank: float, task_id: int) -> str:
+    """Cursor for the search page after the row with ``rank`` and ``task_id``."""
+    return encode_cursor([q, rank, task_id])
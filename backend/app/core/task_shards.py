@@ -0,0 +1,164 @@
+# app/core/task_shards.py
+"""Moving users' task data between shards (see app.db.shards).
+
+A move copies the user's tasks and tombstones to the target database and
+then deletes them from the source. Task ids are kept unless the target
+already uses them; those tasks get new ids, and their old ids are recorded
+as deleted. The target's triggers count the copied tasks and stamp them with
+fresh change sequence numbers above anything the user's clients have seen,
+as are the copied tombstones, so delta sync picks the moved data up without
+a reset.
+
+Deploy the new DATABASE_SHARD_URLS first, then run the moves. While a user
+moves, their writers wait on both databases (each move holds the user's
+change lock on the source and on the target). Workers still running with
+the old shard list can write to the source after a move; run the rebalance
+again once they are gone to move those stragglers.
+"""
+
+from typing import Dict, List, Optional, Set
+import logging
+
+from sqlalchemy import delete, func, insert, select, text, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.task_sync import advance_sync_state, lock_user_changes, write_tombstones
+from app.db.async_session import SessionFactories
+from app.db.shards import ShardRouter, shard_name
+from app.models.task import Task, TaskCounter, TaskSyncState, TaskTombstone
+
+logger = logging.getLogger(__name__)
+
+# Tables holding per-user task data, all keyed by user_id
+USER_TABLES = (Task, TaskCounter, TaskSyncState, TaskTombstone)
+
+
+async def shard_user_ids(db: AsyncSession) -> Set[str]:
+    """Every user with any task data in ``db``."""
+    result = await db.execute(union(*(select(model.user_id) for model in USER_TABLES)))
+    return set(result.scalars())
+
+
+async def move_user(source: AsyncSession, target: AsyncSession, user_id: str) -> Dict[str, int]:
+    """Move ``user_id``'s task data from ``source`` to ``target`` and commit both.
+
+    Data the user already has on the target is kept and merged with. The
+    user's writers wait on both databases while it runs, on the change locks
+    taken here. The target is
+    committed first, so a failure can leave rows on both databases (a rerun
+    merges them) but never loses them.
+    Returns the number of tasks moved, renumbered and tombstones moved.
+    """
+    await lock_user_changes(source, user_id)
+    await lock_user_changes(target, user_id)
+    state = (await source.execute(
+        select(TaskSyncState.last_seq, TaskSyncState.pruned_seq).where(TaskSyncState.user_id == user_id)
+    )).one_or_none()
+    last_seq, pruned_seq = state if state is not None else (0, 0)
+    # The target's triggers number the copied rows above this
+    await advance_sync_state(target, user_id, last_seq, pruned_seq)
+    if target.get_bind().dialect.name == "postgresql":
+        await _reserve_task_ids(target, await source.scalar(select(func.max(Task.id)).where(Task.user_id == user_id)))
+
+    moved = renumbered = 0
+    replaced: List[int] = []
+    result = await source.stream(
+        select(Task.__table__).where(Task.user_id == user_id).order_by(Task.id)
+        .execution_options(yield_per=settings.TASK_IMPORT_BATCH_SIZE)
+    )
+    async for partition in result.partitions():
+        rows = [dict(row._mapping) for row in partition]
+        taken = set((await target.scalars(select(Task.id).where(Task.id.in_([row["id"] for row in rows])))).all())
+        kept = [row for row in rows if row["id"] not in taken]
+        if kept:
+            await target.execute(insert(Task), kept)
+        for row in rows:
+            if row["id"] in taken:
+                replaced.append(row["id"])
+                await target.execute(insert(Task).values({key: value for key, value in row.items() if key != "id"}))
+        moved += len(rows)
+        renumbered += len(taken)
+
+    tombstones = dict((await source.execute(
+        select(TaskTombstone.task_id, TaskTombstone.deleted_at)
+        .where(TaskTombstone.user_id == user_id).order_by(TaskTombstone.change_seq)
+    )).all())
+    deleted_ids = list(tombstones) + replaced
+    # Moved tombstones keep their deletion time, so pruning is not pushed back
+    await write_tombstones(target, user_id, deleted_ids, deleted_at=tombstones)
+    await target.commit()
+
+    for model in USER_TABLES:
+        await source.execute(delete(model).where(model.user_id == user_id))
+    await source.commit()
+    return {"tasks": moved, "renumbered": renumbered, "tombstones": len(tombstones)}
+
+
+async def _reserve_task_ids(target: AsyncSession, max_id: Optional[int]) -> None:
+    """Move the target's task id sequence past ``max_id`` and every id in use there.
+
+    Copied tasks keep their ids, which the sequence knows nothing about. This
+    runs before anything is inserted, so the renumbered tasks and tasks other
+    users create meanwhile draw ids clear of them. setval is not
+    transactional and the sequence never moves backwards, so a failed move
+    only leaves a gap.
+    """
+    await target.execute(
+        text(
+            "SELECT setval(pg_get_serial_sequence('tasks', 'id'), GREATEST("
+            "nextval(pg_get_serial_sequence('tasks', 'id')), "
+            "(SELECT COALESCE(max(id), 0) FROM tasks), :max_id))"
+        ),
+        {"max_id": max_id or 0},
+    )
+
+
+async def move_user_to_shard(router: ShardRouter, user_id: str, source_url: str) -> Dict:
+    """Move one user's task data from ``source_url`` to the shard the ring assigns them."""
+    target_index = router.shard_for(user_id)
+    target_name = shard_name(router.urls[target_index])
+    if shard_name(source_url) == target_name:
+        raise ValueError(f"User {user_id} already belongs on {target_name}")
+    source = SessionFactories([source_url])
+    try:
+        async with source[0]() as source_db, router.session_factory(target_index)() as target_db:
+            summary = await move_user(source_db, target_db, user_id)
+    finally:
+        await source.dispose()
+    logger.info(f"Moved user {user_id} from {shard_name(source_url)} to {target_name}: {summary}")
+    return {"user_id": user_id, "source": shard_name(source_url), "target": target_name, **summary}
+
+
+async def rebalance(router: ShardRouter, extra_source_urls: Optional[List[str]] = None) -> List[Dict]:
+    """Move every user whose data is not on the shard the ring assigns them.
+
+    ``extra_source_urls`` are databases that are no longer shards (a removed
+    shard, or DATABASE_URL when sharding is first enabled); all their users
+    are moved out. Returns one entry per moved user.
+    """
+    sources = [(shard_name(url), router.session_factory(index), index) for index, url in enumerate(router.urls)]
+    shard_names = {name for name, _, _ in sources}
+    for url in extra_source_urls or []:
+        if shard_name(url) in shard_names:
+            raise ValueError(f"{shard_name(url)} is a shard, not an extra source")
+    extra = SessionFactories(extra_source_urls or [])
+    sources += [(shard_name(url), extra[index], None) for index, url in enumerate(extra.urls)]
+
+    moves = []
+    try:
+        for name, source_factory, index in sources:
+            async with source_factory() as db:
+                user_ids = sorted(await shard_user_ids(db))
+            for user_id in user_ids:
+                target_index = router.shard_for(user_id)
+                if target_index == index:
+                    continue
+                async with source_factory() as source, router.session_factory(target_index)() as target:
+                    summary = await move_user(source, target, user_id)
+                target_name = shard_name(router.urls[target_index])
+                logger.info(f"Moved user {user_id} from {name} to {target_name}: {summary}")
+                moves.append({"user_id": user_id, "source": name, "target": target_name, **summary})
+    finally:
+        await extra.dispose()
+    return moves
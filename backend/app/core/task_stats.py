@@ -0,0 +1,74 @@
+# app/core/task_stats.py
+"""Per-user task counters behind GET /tasks/stats.
+
+``task_counters`` holds one row per (user, status, priority). Database
+triggers (see TASK_COUNTER_DDL in app.models.task) apply every write's net
+change within the writing statement, so reading the stats costs a few rows
+regardless of how many tasks a user has. :func:`rebuild_counters` recomputes
+them from ``tasks`` if they ever drift.
+"""
+
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.task import Task, TaskCounter, TaskPriority, TaskStatus
+
+# Statuses that count towards "overdue" once the due date has passed
+OPEN_STATUSES = (TaskStatus.TODO, TaskStatus.IN_PROGRESS)
+
+
+async def read_stats(db: AsyncSession, user_id: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Task totals for a user by status and priority, plus open tasks past their due date.
+
+    Totals come from the counters. The overdue count depends on the current
+    time, so it is counted from the (user_id, status, due_date) index, which
+    only visits the overdue rows.
+    """
+    by_status = {status.value: 0 for status in TaskStatus}
+    by_priority = {priority.value: 0 for priority in TaskPriority}
+    result = await db.execute(
+        select(TaskCounter.status, TaskCounter.priority, TaskCounter.count).where(TaskCounter.user_id == user_id)
+    )
+    for status, priority, count in result:
+        by_status[status.value] += count
+        by_priority[priority.value] += count
+
+    overdue = await db.scalar(
+        select(func.count()).select_from(Task).where(
+            Task.user_id == user_id,
+            Task.status.in_(OPEN_STATUSES),
+            Task.due_date < (now or datetime.utcnow()),
+        )
+    )
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_priority": by_priority,
+        "overdue": overdue,
+    }
+
+
+async def rebuild_counters(db: AsyncSession, user_id: Optional[str] = None) -> int:
+    """Recompute counters from ``tasks`` for one user, or everyone; returns rows written.
+
+    The caller commits. Writes that commit while a rebuild runs may be missed,
+    so run it when the affected users are quiet.
+    """
+    clear = delete(TaskCounter)
+    counts = (
+        select(Task.user_id, Task.status, Task.priority, func.count())
+        .group_by(Task.user_id, Task.status, Task.priority)
+    )
+    if user_id is not None:
+        clear = clear.where(TaskCounter.user_id == user_id)
+        counts = counts.where(Task.user_id == user_id)
+    await db.execute(clear)
+    result = await db.execute(
+        insert(TaskCounter).from_select(
+            [TaskCounter.user_id, TaskCounter.status, TaskCounter.priority, TaskCounter.count], counts
+        )
+    )
+    return result.rowcount
@@ -0,0 +1,174 @@
+# app/core/task_sync.py
+"""Delta sync: per-user change sequence numbers and tombstones.
+
+Every task write stamps the rows it touches with fresh change numbers and
+every delete leaves a ``TaskTombstone``; database triggers do both within
+the writing statement (see TASK_CHANGE_DDL in app.models.task), and keep
+``TaskSyncState.last_seq`` at the user's highest number. A client that has
+synced up to sequence N asks for rows and tombstones above N, so the cost of
+a sync follows the number of changes, not the number of tasks.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime
+import heapq
+
+from sqlalchemy import delete, exists, func, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.task import Task, TaskSyncState, TaskTombstone
+
+
+class SyncTokenExpired(Exception):
+    """The tombstones a client would need have been pruned; it must resync from scratch."""
+
+
+def _dialect_insert(db: AsyncSession):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+async def lock_user_changes(db: AsyncSession, user_id: str) -> None:
+    """Make ``user_id``'s writers wait until the caller commits.
+
+    Takes the advisory lock the task triggers take on PostgreSQL. SQLite
+    runs one writer at a time anyway.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtextextended('task_changes ' || :user_id, 0))"),
+            {"user_id": user_id},
+        )
+
+
+async def _allocate_change_seqs(db: AsyncSession, user_id: str, count: int) -> List[int]:
+    """Reserve ``count`` change numbers for rows written outside the task triggers."""
+    if db.get_bind().dialect.name == "postgresql":
+        result = await db.execute(
+            text("SELECT nextval('task_change_seq') FROM generate_series(1, :count)"), {"count": count}
+        )
+        seqs = list(result.scalars())
+        await advance_sync_state(db, user_id, max(seqs), 0)
+        return seqs
+    statement = _dialect_insert(db)(TaskSyncState).values(user_id=user_id, last_seq=count, pruned_seq=0)
+    statement = statement.on_conflict_do_update(
+        index_elements=[TaskSyncState.user_id],
+        set_={"last_seq": TaskSyncState.last_seq + count},
+    )
+    await db.execute(statement)
+    last_seq = await db.scalar(select(TaskSyncState.last_seq).where(TaskSyncState.user_id == user_id))
+    return list(range(last_seq - count + 1, last_seq + 1))
+
+
+async def advance_sync_state(db: AsyncSession, user_id: str, last_seq: int, pruned_seq: int) -> None:
+    """Raise the user's sequence and pruned point to at least the given values.
+
+    Used when a user's data arrives from another database, so that numbers
+    handed out here stay above every sync point their clients hold. On
+    PostgreSQL the shared change sequence is moved past ``last_seq`` too;
+    setval is not transactional, so a failed caller only leaves a gap.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        await db.execute(
+            text("SELECT setval('task_change_seq', GREATEST(nextval('task_change_seq'), :last_seq))"),
+            {"last_seq": last_seq},
+        )
+    greatest = func.greatest if dialect == "postgresql" else func.max
+    statement = _dialect_insert(db)(TaskSyncState).values(user_id=user_id, last_seq=last_seq, pruned_seq=pruned_seq)
+    statement = statement.on_conflict_do_update(
+        index_elements=[TaskSyncState.user_id],
+        set_={
+            "last_seq": greatest(TaskSyncState.last_seq, statement.excluded.last_seq),
+            "pruned_seq": greatest(TaskSyncState.pruned_seq, statement.excluded.pruned_seq),
+        },
+    )
+    await db.execute(statement)
+
+
+async def write_tombstones(
+    db: AsyncSession, user_id: str, task_ids: Iterable[int], deleted_at: Optional[Dict[int, datetime]] = None,
+) -> None:
+    """Record tasks as deleted without deleting rows, with fresh change numbers.
+
+    Used for tombstones copied from another database; ``deleted_at`` keeps
+    their original deletion time, so their retention window does not
+    restart. Others get now.
+    """
+    task_ids = sorted(task_ids)
+    if not task_ids:
+        return
+    seqs = await _allocate_change_seqs(db, user_id, len(task_ids))
+    now = datetime.utcnow()
+    deleted_at = deleted_at or {}
+    statement = _dialect_insert(db)(TaskTombstone)
+    statement = statement.on_conflict_do_update(
+        index_elements=[TaskTombstone.user_id, TaskTombstone.task_id],
+        set_={"change_seq": statement.excluded.change_seq, "deleted_at": statement.excluded.deleted_at},
+    )
+    await db.execute(statement, [
+        {"task_id": task_id, "user_id": user_id, "change_seq": seq, "deleted_at": deleted_at.get(task_id, now)}
+        for task_id, seq in zip(task_ids, seqs)
+    ])
+
+
+async def read_changes(db: AsyncSession, user_id: str, since: int, limit: int) -> Dict[str, Any]:
+    """Tasks written and deleted after sequence ``since``, oldest first, at most ``limit`` of them.
+
+    Returns the changed tasks, the deleted task ids, the sequence number to
+    pass as ``since`` next time, and whether more changes are waiting.
+    ``since`` 0 starts a full sync and skips tombstones. Raises
+    SyncTokenExpired if tombstones after ``since`` have been pruned.
+    """
+    state = (await db.execute(
+        select(TaskSyncState.last_seq, TaskSyncState.pruned_seq).where(TaskSyncState.user_id == user_id)
+    )).one_or_none()
+    last_seq, pruned_seq = state if state is not None else (0, 0)
+    if 0 < since < pruned_seq:
+        raise SyncTokenExpired()
+
+    result = await db.execute(
+        select(Task).where(Task.user_id == user_id, Task.change_seq > since).order_by(Task.change_seq).limit(limit + 1)
+    )
+    entries: List[Any] = [(task.change_seq, task) for task in result.scalars()]
+    if since > 0:
+        result = await db.execute(
+            select(TaskTombstone.change_seq, TaskTombstone.task_id)
+            .where(TaskTombstone.user_id == user_id, TaskTombstone.change_seq > since)
+            .order_by(TaskTombstone.change_seq)
+            .limit(limit + 1)
+        )
+        entries = list(heapq.merge(entries, result.all(), key=lambda entry: entry[0]))
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    return {
+        "changes": [item for _, item in entries if isinstance(item, Task)],
+        "deleted": [item for _, item in entries if not isinstance(item, Task)],
+        # With nothing left, jump to the head so later polls skip the gap
+        "next_since": entries[-1][0] if has_more else max([since, last_seq] + [seq for seq, _ in entries]),
+        "has_more": has_more,
+    }
+
+
+async def prune_tombstones(db: AsyncSession, older_than: datetime) -> int:
+    """Delete tombstones of tasks deleted before ``older_than``; returns how many.
+
+    Each affected user's ``pruned_seq`` moves up to the newest pruned
+    tombstone (sequence numbers grow with time, so it never moves back) and
+    clients that have not synced since then must resync from scratch.
+    The caller commits.
+    """
+    pruned = (
+        select(func.max(TaskTombstone.change_seq))
+        .where(TaskTombstone.user_id == TaskSyncState.user_id, TaskTombstone.deleted_at < older_than)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(TaskSyncState)
+        .where(exists().where(TaskTombstone.user_id == TaskSyncState.user_id, TaskTombstone.deleted_at < older_than))
+        .values(pruned_seq=pruned)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(delete(TaskTombstone).where(TaskTombstone.deleted_at < older_than))
+    return result.rowcount
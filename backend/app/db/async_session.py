@@ -0,0 +1,114 @@
+# app/db/async_session.py
+"""Async database session management.
+
+Request handlers use these sessions so queries await the driver instead of
+blocking the event loop. Alembic and other tooling keep using the sync
+engine in ``app.db.session``.
+"""
+
+from typing import AsyncGenerator, List, Optional
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.db.pool_metrics import InstrumentedAsyncQueuePool, instrument_engine, pool_options
+
+# Async driver to use for each sync database backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Lazy initialization of engine and session
+_async_engine = None
+_AsyncSessionLocal = None
+
+def get_async_database_url(url: str) -> str:
+    """Swap the driver in a database URL for its async counterpart."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def create_async_engine_for(url: str, name: Optional[str] = None) -> AsyncEngine:
+    """Create an async engine with the same pool policy as the sync engine.
+
+    With a ``name`` its pool is instrumented and published under that name.
+    """
+    if url.startswith("sqlite"):
+        # SQLite connections are cheap and must not outlive the event loop
+        # that opened them, so don't pool them
+        engine = create_async_engine(get_async_database_url(url), poolclass=NullPool)
+    else:
+        engine = create_async_engine(
+            get_async_database_url(url), poolclass=InstrumentedAsyncQueuePool, **pool_options()
+        )
+    return instrument_engine(engine, name) if name else engine
+
+class SessionFactories:
+    """Async session factories for a list of extra databases (replicas, shards).
+
+    Each database's engine is created on first use and pooled like the main
+    one; with a ``name`` its pool metrics are published as name0, name1...
+    """
+
+    def __init__(self, urls: List[str], name: Optional[str] = None):
+        self.urls = list(urls)
+        self.name = name
+        self._engines: List[Optional[AsyncEngine]] = [None] * len(self.urls)
+        self._factories: List[Optional[async_sessionmaker]] = [None] * len(self.urls)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def __getitem__(self, index: int) -> async_sessionmaker:
+        if self._factories[index] is None:
+            self._engines[index] = create_async_engine_for(
+                self.urls[index], f"{self.name}{index}" if self.name else None
+            )
+            self._factories[index] = async_sessionmaker(
+                self._engines[index], autoflush=False, expire_on_commit=False
+            )
+        return self._factories[index]
+
+    async def dispose(self) -> None:
+        """Close pooled connections of every engine created so far."""
+        for engine in self._engines:
+            if engine is not None:
+                await engine.dispose()
+        self._engines = [None] * len(self.urls)
+        self._factories = [None] * len(self.urls)
+
+def get_async_engine() -> AsyncEngine:
+    """Get or create the async database engine."""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine_for(settings.DATABASE_URL, "primary")
+    return _async_engine
+
+def get_async_session_local() -> async_sessionmaker:
+    """Get or create the async session factory."""
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        # Keep loaded attributes after commit so responses can be built without a reload
+        _AsyncSessionLocal = async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+    return _AsyncSessionLocal
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to get an async database session.
+    Ensures the session is closed after use.
+    """
+    session_factory = get_async_session_local()
+    async with session_factory() as db:
+        yield db
+
+async def dispose_async_engine() -> None:
+    """Close pooled connections (called from the app lifespan on shutdown)."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _AsyncSessionLocal = None
@@ -6,6 +6,7 @@ from sqlalchemy.orm import sessionmaker, Session
 from typing import Generator
 
 from app.core.config import settings
+from app.db.pool_metrics import InstrumentedQueuePool, instrument_engine, pool_options
 
 # Create engine for CI/CD monitoring database
 _cicd_engine = None
@@ -18,11 +19,8 @@ def get_cicd_engine():
         # Construct URL for CI/CD monitoring database
         cicd_url = f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.CICD_DB_NAME}"
         
-        _cicd_engine = create_engine(
-            cicd_url,
-            pool_pre_ping=True,
-            pool_size=10,
-            max_overflow=20
+        _cicd_engine = instrument_engine(
+            create_engine(cicd_url, poolclass=InstrumentedQueuePool, **pool_options()), "cicd"
         )
     return _cicd_engine
 
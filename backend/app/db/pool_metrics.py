@@ -0,0 +1,153 @@
+# app/db/pool_metrics.py
+"""Connection pool settings and instrumentation.
+
+Every engine is created with the DB_POOL_* settings and registered here
+under a name ("primary", "sync", "replica0", "shard1"...). Pool events count
+connections opened, closed and invalidated, track how many are checked out
+and record each connection's lifetime; the instrumented pool classes also
+time how long each checkout waits for a connection, including the connect
+itself when the pool has to open a new one. GET /metrics publishes it all.
+"""
+
+from typing import Any, Dict, Optional
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import Histogram, MetricsWriter
+
+# Seconds; checkouts should normally land in the first buckets
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONNECTION_LIFETIME_BUCKETS = (1, 10, 60, 300, 900, 1800, 3600, 7200, 21600, 86400)
+
+
+def pool_options() -> Dict[str, Any]:
+    """Queue pool arguments for create_engine from the DB_POOL_* settings."""
+    return {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,  # Verify connections before using them
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+class PoolMetrics:
+    """Counters and histograms for one engine's pool."""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.checkout_wait = Histogram(CHECKOUT_WAIT_BUCKETS)
+        self.connection_lifetime = Histogram(CONNECTION_LIFETIME_BUCKETS)
+        self.checked_out = 0
+        self.checkout_timeouts = 0
+        self.connections_opened = 0
+        self.connections_closed = 0
+        self.invalidations = 0
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        connection_record.info["connected_at"] = time.monotonic()
+        self.connections_opened += 1
+
+    def on_close(self, dbapi_connection, connection_record) -> None:
+        self.connections_closed += 1
+        connected_at = connection_record.info.pop("connected_at", None)
+        if connected_at is not None:
+            self.connection_lifetime.observe(time.monotonic() - connected_at)
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checked_out += 1
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        self.checked_out -= 1
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        self.invalidations += 1
+
+    def collect(self, writer: MetricsWriter) -> None:
+        labels = {"pool": self.name}
+        pool = self.engine.pool
+        if isinstance(pool, QueuePool):
+            writer.gauge("db_pool_size", "Connections the pool keeps open", pool.size(), labels)
+            writer.gauge("db_pool_overflow", "Connections open beyond the pool size", max(pool.overflow(), 0), labels)
+        writer.gauge("db_pool_checked_out", "Connections currently checked out", self.checked_out, labels)
+        writer.histogram("db_pool_checkout_wait_seconds", "Time spent waiting to check out a connection",
+                         self.checkout_wait, labels)
+        writer.counter("db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT",
+                       self.checkout_timeouts, labels)
+        writer.counter("db_pool_connections_opened_total", "Database connections opened",
+                       self.connections_opened, labels)
+        writer.counter("db_pool_connections_closed_total", "Database connections closed",
+                       self.connections_closed, labels)
+        writer.counter("db_pool_invalidations_total", "Connections invalidated after errors",
+                       self.invalidations, labels)
+        writer.histogram("db_pool_connection_lifetime_seconds", "Age of database connections when closed",
+                         self.connection_lifetime, labels)
+
+
+class _TimedCheckout:
+    """Pool mixin timing how long checkouts wait for a connection."""
+
+    _metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self._metrics is not None:
+                self._metrics.checkout_timeouts += 1
+            raise
+        finally:
+            if self._metrics is not None:
+                self._metrics.checkout_wait.observe(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep recording into the same metrics
+        pool = super().recreate()
+        pool._metrics = self._metrics
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool recording checkout waits"""
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """Queue pool for async engines recording checkout waits"""
+
+
+# Metrics of every instrumented engine by name, for GET /metrics
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def instrument_engine(engine, name: str):
+    """Record pool metrics for ``engine`` (sync or async) under ``name`` and return it.
+
+    An engine created again under the same name (after a dispose) keeps
+    adding to the same counters.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metrics = pool_metrics.get(name)
+    if metrics is None:
+        metrics = pool_metrics[name] = PoolMetrics(name, sync_engine)
+    else:
+        metrics.engine = sync_engine
+        metrics.checked_out = 0
+    if isinstance(sync_engine.pool, _TimedCheckout):
+        sync_engine.pool._metrics = metrics
+    event.listen(sync_engine, "connect", metrics.on_connect)
+    event.listen(sync_engine, "close", metrics.on_close)
+    event.listen(sync_engine, "checkout", metrics.on_checkout)
+    event.listen(sync_engine, "checkin", metrics.on_checkin)
+    event.listen(sync_engine, "invalidate", metrics.on_invalidate)
+    return engine
+
+
+def collect_pool_metrics(writer: MetricsWriter) -> None:
+    for metrics in pool_metrics.values():
+        metrics.collect(writer)
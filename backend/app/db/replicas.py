@@ -0,0 +1,193 @@
+# app/db/replicas.py
+"""Read-replica routing for read-only request handlers.
+
+Handlers that only read (task list and get, token list) take their session
+from ``read_db(<their auth dependency>)``, which hands out sessions on the
+replicas in DATABASE_REPLICA_URLS round robin. Everything else keeps using the
+primary.
+
+Replicas lag behind the primary, so a user who has just written reads from
+the primary for READ_REPLICA_STICKY_SECONDS afterwards and sees their own
+changes. Write handlers take ``write_db(...)`` (task handlers go
+through ``app.db.shards``, which uses ``track_writes``) to arm this. The
+window travels with the client in a short-lived cookie, so it holds whichever
+worker or pod serves the next read; the worker that took the write also
+remembers it for clients that do not keep cookies.
+
+A replica that refuses connections is left out for READ_REPLICA_RETRY_SECONDS
+and its reads go elsewhere, falling back to the primary when none is left.
+"""
+
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional, Union
+import logging
+import math
+import time
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import User
+from app.db.async_session import SessionFactories, get_async_db
+
+logger = logging.getLogger(__name__)
+
+# Cookie holding the Unix time until which the client's reads go to the primary
+STICKY_COOKIE = "read_primary_until"
+
+
+class ReplicaRouter:
+    """Picks the database for a user's read: a healthy replica, or the primary."""
+
+    def __init__(self, urls: List[str], sticky_seconds: float, retry_seconds: float, max_users: int = 100000):
+        self.urls = list(urls)
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._session_factories = SessionFactories(self.urls, name="replica")
+        self._down_until = [0.0] * len(self.urls)
+        self._next = 0
+        self._recent_writers = TTLCache(maxsize=max_users, ttl=sticky_seconds)
+
+    def mark_written(self, user_id: str) -> None:
+        """Send ``user_id``'s reads to the primary until the replicas have caught up."""
+        if self.urls:
+            self._recent_writers.set(user_id, True)
+
+    def pick(self, user_id: str) -> Optional[int]:
+        """Index of the replica to read from next, or None for the primary."""
+        if not self.urls or user_id in self._recent_writers:
+            return None
+        now = time.monotonic()
+        for _ in range(len(self.urls)):
+            index = self._next
+            self._next = (index + 1) % len(self.urls)
+            if self._down_until[index] <= now:
+                return index
+        return None
+
+    def mark_down(self, index: int, error: Exception) -> None:
+        """Stop using a replica for a while after it failed."""
+        self._down_until[index] = time.monotonic() + self.retry_seconds
+        url = make_url(self.urls[index]).render_as_string(hide_password=True)
+        logger.warning(f"Read replica {url} unavailable, retrying in {self.retry_seconds}s: {error}")
+
+    def session_factory(self, index: int) -> async_sessionmaker:
+        """Session factory for a replica; its engine is created on first use."""
+        return self._session_factories[index]
+
+    def stats(self) -> Dict[str, int]:
+        now = time.monotonic()
+        return {
+            "replicas": len(self.urls),
+            "down": sum(1 for until in self._down_until if until > now),
+            "sticky_users": len(self._recent_writers),
+        }
+
+    async def dispose(self) -> None:
+        """Close pooled replica connections (called from the app lifespan on shutdown)."""
+        await self._session_factories.dispose()
+
+
+replica_router = ReplicaRouter(
+    settings.DATABASE_REPLICA_URLS,
+    sticky_seconds=settings.READ_REPLICA_STICKY_SECONDS,
+    retry_seconds=settings.READ_REPLICA_RETRY_SECONDS,
+)
+
+
+def wrote_recently(request: Request) -> bool:
+    """Whether the client's cookie says it wrote within the last READ_REPLICA_STICKY_SECONDS."""
+    try:
+        until = float(request.cookies.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+    now = time.time()
+    # A window longer than the setting is ignored, so a forged cookie cannot pin reads to the primary
+    return now < until <= now + replica_router.sticky_seconds
+
+
+@asynccontextmanager
+async def read_session(
+    primary: AsyncSession, user_id: str, request: Optional[Request] = None
+) -> AsyncIterator[AsyncSession]:
+    """A replica session for ``user_id``'s reads when one is up and they have not written recently, else ``primary``."""
+    sticky = request is not None and wrote_recently(request)
+    while not sticky and (index := replica_router.pick(user_id)) is not None:
+        async with replica_router.session_factory(index)() as db:
+            try:
+                # Connect now so a dead replica is skipped before the handler runs
+                await db.connection()
+            except (OSError, DBAPIError) as e:
+                replica_router.mark_down(index, e)
+                continue
+            yield db
+            return
+    yield primary
+
+
+def track_writes(db: AsyncSession, user_id: str, response: Optional[Response] = None) -> AsyncSession:
+    """Keep ``user_id``'s reads on the primary for a while once ``db`` commits.
+
+    With a ``response``, the window is also sent to the client as a cookie.
+    """
+    def on_commit(session) -> None:
+        replica_router.mark_written(user_id)
+        if response is not None and replica_router.urls:
+            response.set_cookie(
+                STICKY_COOKIE,
+                f"{time.time() + replica_router.sticky_seconds:.3f}",
+                max_age=math.ceil(replica_router.sticky_seconds),
+                path=settings.API_V1_STR,
+                httponly=True,
+                samesite="lax",
+            )
+
+    event.listen(db.sync_session, "after_commit", on_commit)
+    return db
+
+
+def principal_id(user: Union[User, Dict[str, Any]]) -> str:
+    """User id of an authenticated principal: a Keycloak ``User`` or a dual-auth user dict."""
+    return user["sub"] if isinstance(user, dict) else user.sub
+
+
+@lru_cache(maxsize=None)
+def read_db(auth: Callable) -> Callable:
+    """Dependency for read-only handlers authenticated with ``auth``.
+
+    Yields a replica session when one is up and the user ``auth`` resolves
+    has not written recently, otherwise the primary session. ``auth`` is the
+    handler's own auth dependency, so it runs once per request.
+    """
+    async def get_async_read_db(
+        request: Request,
+        primary: AsyncSession = Depends(get_async_db),
+        current_user=Depends(auth),
+    ) -> AsyncGenerator[AsyncSession, None]:
+        async with read_session(primary, principal_id(current_user), request) as db:
+            yield db
+
+    return get_async_read_db
+
+
+@lru_cache(maxsize=None)
+def write_db(auth: Callable) -> Callable:
+    """Dependency for handlers that write, authenticated with ``auth``.
+
+    Returns the primary session, which keeps the user's reads on the primary
+    for a while once it commits.
+    """
+    async def get_async_write_db(
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        current_user=Depends(auth),
+    ) -> AsyncSession:
+        return track_writes(db, principal_id(current_user), response)
+
+    return get_async_write_db
@@ -8,6 +8,7 @@ from typing import Generator
 import os
 
 from app.core.config import settings
+from app.db.pool_metrics import InstrumentedQueuePool, instrument_engine, pool_options
 
 # Create base class for models
 Base = declarative_base()
@@ -27,12 +28,8 @@ def get_engine():
                 connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
             )
         else:
-            _engine = create_engine(
-                settings.DATABASE_URL,
-                pool_pre_ping=True,  # Verify connections before using them
-                pool_size=10,
-                max_overflow=20
-            )
+            _engine = create_engine(settings.DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options())
+        instrument_engine(_engine, "sync")
     return _engine
 
 def get_session_local():
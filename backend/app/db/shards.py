@@ -0,0 +1,141 @@
+# app/db/shards.py
+"""User-sharded databases for task data.
+
+Every task table row belongs to one user, so each user's tasks, counters,
+sync state and tombstones can live together on one of the databases in
+DATABASE_SHARD_URLS. A consistent-hash ring picks the shard from the user
+id; adding or removing a shard only moves the users whose ring position
+changes, and ``app.core.task_shards`` (``python -m app.cli rebalance-shards``)
+moves their rows. API tokens and everything else stay on DATABASE_URL.
+
+Each shard needs the full schema: run the migrations against every shard.
+With no shards configured, task data lives on DATABASE_URL as before.
+"""
+
+from functools import lru_cache
+from typing import AsyncGenerator, Callable, List
+import bisect
+import hashlib
+
+from fastapi import Depends, Request, Response
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.db.async_session import SessionFactories, get_async_db, get_async_session_local
+from app.db.replicas import principal_id, read_session, track_writes
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+def shard_name(url: str) -> str:
+    """Stable name of a shard on the ring: its host, port and database, without credentials."""
+    parsed = make_url(url)
+    if not parsed.host:
+        # SQLite: the file path
+        return parsed.database or ""
+    return f"{parsed.host}:{parsed.port or ''}/{parsed.database or ''}"
+
+
+class HashRing:
+    """Consistent hashing of keys onto named nodes.
+
+    Each node is placed at ``vnodes`` points on a 64-bit ring and a key
+    belongs to the first point at or after its own hash, so nodes get even
+    shares of keys and adding a node only takes keys from the others.
+    """
+
+    def __init__(self, nodes: List[str], vnodes: int):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def get(self, key: str) -> str:
+        index = bisect.bisect_left(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+class ShardRouter:
+    """Maps user ids to the shard holding their task data."""
+
+    def __init__(self, urls: List[str], vnodes: int):
+        self.urls = list(urls)
+        names = [shard_name(url) for url in self.urls]
+        if len(set(names)) != len(names):
+            raise ValueError("DATABASE_SHARD_URLS must name distinct databases")
+        self._index = {name: index for index, name in enumerate(names)}
+        self._ring = HashRing(names, vnodes) if names else None
+        self._session_factories = SessionFactories(self.urls, name="shard")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.urls)
+
+    def shard_for(self, user_id: str) -> int:
+        """Index of the shard that ``user_id``'s task data belongs on."""
+        return self._index[self._ring.get(user_id)]
+
+    def session_factory(self, index: int) -> async_sessionmaker:
+        """Session factory for a shard; its engine is created on first use."""
+        return self._session_factories[index]
+
+    def session_factories(self) -> List[async_sessionmaker]:
+        """Session factories covering all task data: every shard, or the main database."""
+        if not self.enabled:
+            return [get_async_session_local()]
+        return [self._session_factories[index] for index in range(len(self.urls))]
+
+    async def dispose(self) -> None:
+        """Close pooled shard connections (called from the app lifespan on shutdown)."""
+        await self._session_factories.dispose()
+
+
+shard_router = ShardRouter(settings.DATABASE_SHARD_URLS, vnodes=settings.DATABASE_SHARD_VNODES)
+
+
+@lru_cache(maxsize=None)
+def task_db(auth: Callable) -> Callable:
+    """Dependency for task handlers authenticated with ``auth``.
+
+    Yields a session on the shard of the user ``auth`` resolves, or the
+    primary session (with read-your-writes tracking) when unsharded. The
+    primary session opens no connection unless it is used.
+    """
+    async def get_async_task_db(
+        response: Response,
+        primary: AsyncSession = Depends(get_async_db),
+        current_user=Depends(auth),
+    ) -> AsyncGenerator[AsyncSession, None]:
+        user_id = principal_id(current_user)
+        if not shard_router.enabled:
+            yield track_writes(primary, user_id, response)
+            return
+        async with shard_router.session_factory(shard_router.shard_for(user_id))() as db:
+            yield db
+
+    return get_async_task_db
+
+
+@lru_cache(maxsize=None)
+def task_read_db(auth: Callable) -> Callable:
+    """Dependency for read-only task handlers authenticated with ``auth``.
+
+    Yields a session on the user's shard, or a read replica session (see
+    app.db.replicas) when unsharded.
+    """
+    async def get_async_task_read_db(
+        request: Request,
+        primary: AsyncSession = Depends(get_async_db),
+        current_user=Depends(auth),
+    ) -> AsyncGenerator[AsyncSession, None]:
+        user_id = principal_id(current_user)
+        if not shard_router.enabled:
+            async with read_session(primary, user_id, request) as db:
+                yield db
+            return
+        async with shard_router.session_factory(shard_router.shard_for(user_id))() as db:
+            yield db
+
+    return get_async_task_read_db
@@ -1,5 +1,5 @@
 """Database models for the application"""
 # Import models to ensure they're registered with SQLAlchemy
-from app.models.task import Task
+from app.models.task import Task, TaskCounter, TaskSyncState, TaskTombstone
 
-__all__ = ["Task"]
\ No newline at end of file
+__all__ = ["Task", "TaskCounter", "TaskSyncState", "TaskTombstone"]
\ No newline at end of file
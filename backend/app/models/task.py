@@ -1,5 +1,5 @@
 """Task model for database persistence"""
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Enum, DateTime, Text, Index, DDL, event
 from sqlalchemy.sql import func
 from app.db.session import Base
 from datetime import datetime
@@ -33,6 +33,290 @@ class Task(Base):
     due_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Position of the last write in the owner's change sequence (see TaskSyncState)
+    change_seq = Column(BigInteger, nullable=False, server_default="0")
+    
+    __table_args__ = (
+        # Keyset pagination of a user's tasks for each sort key
+        Index("ix_tasks_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_tasks_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        Index("ix_tasks_user_id_due_date_id", "user_id", "due_date", "id"),
+        # Status/priority filters combined with due-date ranges
+        Index("ix_tasks_user_id_status_due_date", "user_id", "status", "due_date"),
+        Index("ix_tasks_user_id_priority_due_date", "user_id", "priority", "due_date"),
+        # Delta sync: a user's tasks changed after a sequence number
+        Index("ix_tasks_user_id_change_seq", "user_id", "change_seq"),
+    )
+    
+    def __repr__(self):
+        return f"<Task {self.id}: {self.title}>"
+
+
+class TaskCounter(Base):
+    """Number of a user's tasks per status and priority.
+
+    Kept in step with ``tasks`` by database triggers (TASK_COUNTER_DDL), in
+    the writing statement itself, so GET /tasks/stats reads a handful of rows.
+    """
+    __tablename__ = "task_counters"
+    
+    user_id = Column(String, primary_key=True)
+    status = Column(Enum(TaskStatus), primary_key=True)
+    priority = Column(Enum(TaskPriority), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
     
     def __repr__(self):
-        return f"<Task {self.id}: {self.title}>"
\ No newline at end of file
+        return f"<TaskCounter {self.user_id} {self.status.value}/{self.priority.value}: {self.count}>"
+
+
+class TaskSyncState(Base):
+    """Per-user change sequence for delta sync.
+
+    ``last_seq`` is the highest change number the user's tasks and tombstones
+    carry; the triggers in TASK_CHANGE_DDL raise it with every write.
+    Tombstones up to ``pruned_seq`` have been deleted; clients that last
+    synced before it must start over.
+    """
+    __tablename__ = "task_sync_state"
+    
+    user_id = Column(String, primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, default=0)
+    pruned_seq = Column(BigInteger, nullable=False, default=0)
+
+
+class TaskTombstone(Base):
+    """Record of a deleted task, so syncing clients learn about the deletion"""
+    __tablename__ = "task_tombstones"
+    
+    user_id = Column(String, primary_key=True)
+    task_id = Column(Integer, primary_key=True)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_task_tombstones_user_id_change_seq", "user_id", "change_seq"),
+        Index("ix_task_tombstones_deleted_at", "deleted_at"),
+    )
+
+
+# Full-text search over title and description is maintained by the database
+# itself, outside the mapped columns (queried by app.core.task_search):
+# PostgreSQL keeps a generated tsvector column in a (user_id, search_vector)
+# GIN index; SQLite keeps an FTS5 external-content table in sync through
+# triggers. Migrations 0004_task_search and 0009_task_search_user_index
+# create the same objects on existing databases.
+TASK_SEARCH_DDL = {
+    "postgresql": [
+        """
+        ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+        ) STORED
+        """,
+        # btree_gin lets the user_id equality share the GIN index with the
+        # match, so other users' matches are ruled out inside the index
+        "CREATE EXTENSION IF NOT EXISTS btree_gin",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_user_id_search_vector ON tasks USING gin (user_id, search_vector)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+        """,
+    ],
+}
+
+# Task counters are maintained by the database too, so every write path
+# (including COPY and bulk statements) updates them within the statement
+# that changes ``tasks``. PostgreSQL applies each statement's net change per
+# (user, status, priority) from its transition tables, locking counter rows in
+# key order; SQLite adjusts them row by row. Migration 0007_task_counter_triggers
+# creates the same objects on existing databases.
+TASK_COUNTER_DDL = {
+    "postgresql": [
+        """
+        CREATE OR REPLACE FUNCTION task_counters_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO task_counters (user_id, status, priority, count)
+                SELECT user_id, status, priority, count(*) FROM new_rows
+                GROUP BY user_id, status, priority ORDER BY user_id, status, priority
+                ON CONFLICT (user_id, status, priority) DO UPDATE SET count = task_counters.count + excluded.count;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO task_counters (user_id, status, priority, count)
+                SELECT user_id, status, priority, -count(*) FROM old_rows
+                GROUP BY user_id, status, priority ORDER BY user_id, status, priority
+                ON CONFLICT (user_id, status, priority) DO UPDATE SET count = task_counters.count + excluded.count;
+            ELSE
+                INSERT INTO task_counters (user_id, status, priority, count)
+                SELECT user_id, status, priority, sum(delta) FROM (
+                    SELECT user_id, status, priority, -1 AS delta FROM old_rows
+                    UNION ALL
+                    SELECT user_id, status, priority, 1 FROM new_rows
+                ) AS moved
+                GROUP BY user_id, status, priority HAVING sum(delta) <> 0 ORDER BY user_id, status, priority
+                ON CONFLICT (user_id, status, priority) DO UPDATE SET count = task_counters.count + excluded.count;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """,
+        """
+        CREATE TRIGGER tasks_counters_insert AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_counters_apply()
+        """,
+        """
+        CREATE TRIGGER tasks_counters_update AFTER UPDATE ON tasks
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_counters_apply()
+        """,
+        """
+        CREATE TRIGGER tasks_counters_delete AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION task_counters_apply()
+        """,
+    ],
+    "sqlite": [
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_counters_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_counters (user_id, status, priority, count) VALUES (new.user_id, new.status, new.priority, 1)
+            ON CONFLICT (user_id, status, priority) DO UPDATE SET count = count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_counters_delete AFTER DELETE ON tasks BEGIN
+            UPDATE task_counters SET count = count - 1
+            WHERE user_id = old.user_id AND status = old.status AND priority = old.priority;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_counters_update AFTER UPDATE OF status, priority ON tasks
+        WHEN new.status IS NOT old.status OR new.priority IS NOT old.priority BEGIN
+            UPDATE task_counters SET count = count - 1
+            WHERE user_id = old.user_id AND status = old.status AND priority = old.priority;
+            INSERT INTO task_counters (user_id, status, priority, count) VALUES (new.user_id, new.status, new.priority, 1)
+            ON CONFLICT (user_id, status, priority) DO UPDATE SET count = count + 1;
+        END
+        """,
+    ],
+}
+
+# Change numbers and tombstones for delta sync are written by the database
+# as well, so a write is one statement. PostgreSQL draws the numbers from the
+# task_change_seq sequence; each row write first takes a transaction-level
+# advisory lock on its user, so one user's writers take numbers one
+# transaction at a time and commit them in order (other users never wait).
+# Statement triggers then record deletes as tombstones and raise the user's
+# last_seq. SQLite (one writer at a time) numbers rows from last_seq itself.
+# Migration 0008_task_change_triggers creates the same objects on existing
+# databases.
+TASK_CHANGE_DDL = {
+    "postgresql": [
+        "CREATE SEQUENCE IF NOT EXISTS task_change_seq",
+        """
+        CREATE OR REPLACE FUNCTION task_change_stamp() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtextextended('task_changes ' || NEW.user_id, 0));
+            NEW.change_seq := nextval('task_change_seq');
+            RETURN NEW;
+        END
+        $$
+        """,
+        """
+        CREATE OR REPLACE FUNCTION task_change_record() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_advisory_xact_lock(hashtextextended('task_changes ' || user_id, 0))
+                FROM (SELECT DISTINCT user_id FROM old_rows ORDER BY user_id) AS users;
+                WITH stamped AS (
+                    INSERT INTO task_tombstones (user_id, task_id, change_seq, deleted_at)
+                    SELECT user_id, id, nextval('task_change_seq'), now() AT TIME ZONE 'utc'
+                    FROM (SELECT user_id, id FROM old_rows ORDER BY id) AS deleted
+                    ON CONFLICT (user_id, task_id)
+                    DO UPDATE SET change_seq = excluded.change_seq, deleted_at = excluded.deleted_at
+                    RETURNING user_id, change_seq
+                )
+                INSERT INTO task_sync_state (user_id, last_seq, pruned_seq)
+                SELECT user_id, max(change_seq), 0 FROM stamped GROUP BY user_id ORDER BY user_id
+                ON CONFLICT (user_id) DO UPDATE SET last_seq = GREATEST(task_sync_state.last_seq, excluded.last_seq);
+            ELSE
+                INSERT INTO task_sync_state (user_id, last_seq, pruned_seq)
+                SELECT user_id, max(change_seq), 0 FROM new_rows GROUP BY user_id ORDER BY user_id
+                ON CONFLICT (user_id) DO UPDATE SET last_seq = GREATEST(task_sync_state.last_seq, excluded.last_seq);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """,
+        """
+        CREATE TRIGGER tasks_change_stamp BEFORE INSERT OR UPDATE ON tasks
+        FOR EACH ROW EXECUTE FUNCTION task_change_stamp()
+        """,
+        """
+        CREATE TRIGGER tasks_change_insert AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_change_record()
+        """,
+        """
+        CREATE TRIGGER tasks_change_update AFTER UPDATE ON tasks
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION task_change_record()
+        """,
+        """
+        CREATE TRIGGER tasks_change_delete AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION task_change_record()
+        """,
+    ],
+    "sqlite": [
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_change_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_sync_state (user_id, last_seq, pruned_seq) VALUES (new.user_id, 1, 0)
+            ON CONFLICT (user_id) DO UPDATE SET last_seq = last_seq + 1;
+            UPDATE tasks SET change_seq = (SELECT last_seq FROM task_sync_state WHERE user_id = new.user_id)
+            WHERE id = new.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_change_update AFTER UPDATE ON tasks
+        WHEN new.change_seq IS old.change_seq BEGIN
+            INSERT INTO task_sync_state (user_id, last_seq, pruned_seq) VALUES (new.user_id, 1, 0)
+            ON CONFLICT (user_id) DO UPDATE SET last_seq = last_seq + 1;
+            UPDATE tasks SET change_seq = (SELECT last_seq FROM task_sync_state WHERE user_id = new.user_id)
+            WHERE id = new.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tasks_change_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_sync_state (user_id, last_seq, pruned_seq) VALUES (old.user_id, 1, 0)
+            ON CONFLICT (user_id) DO UPDATE SET last_seq = last_seq + 1;
+            INSERT INTO task_tombstones (user_id, task_id, change_seq, deleted_at)
+            VALUES (old.user_id, old.id, (SELECT last_seq FROM task_sync_state WHERE user_id = old.user_id),
+                    datetime('now'))
+            ON CONFLICT (user_id, task_id) DO UPDATE SET change_seq = excluded.change_seq, deleted_at = excluded.deleted_at;
+        END
+        """,
+    ],
+}
+
+for ddl in (TASK_SEARCH_DDL, TASK_COUNTER_DDL, TASK_CHANGE_DDL):
+    for dialect, statements in ddl.items():
+        for statement in statements:
+            event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+event.listen(Task.__table__, "before_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,89 @@
+# benchmarks/bench_serialization.py
+"""Measure CPU spent turning a page of task rows into a JSON response body.
+
+Compares FastAPI's response-model path (validate every row against the Task
+schema, then encode) with the FAST_JSON_RESPONSES path (compiled attribute
+serializer, then orjson or json).
+
+Run from the backend directory with the usual settings in the environment:
+
+    python -m benchmarks.bench_serialization [rows] [repeats]
+"""
+
+from datetime import datetime, timedelta
+import asyncio
+import sys
+import time
+
+from fastapi.routing import serialize_response
+
+from app.api.tasks import router, serialize_task
+from app.core import fast_json
+from app.models.task import Task, TaskPriority, TaskStatus
+
+
+def build_rows(count: int):
+    """Detached Task rows shaped like a real page."""
+    now = datetime.utcnow()
+    return [
+        Task(
+            id=i,
+            user_id="bench-user",
+            title=f"Task {i}",
+            description="Write the quarterly report and send it to the team" if i % 3 else "",
+            status=list(TaskStatus)[i % 3],
+            priority=list(TaskPriority)[i % 3],
+            due_date=now + timedelta(days=i % 30) if i % 2 else None,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def list_tasks_field():
+    for route in router.routes:
+        if getattr(route, "name", None) == "list_tasks":
+            return route.response_field
+    raise RuntimeError("list_tasks route not found")
+
+
+async def validated(rows, field) -> bytes:
+    return await serialize_response(field=field, response_content=rows, is_coroutine=True, dump_json=True)
+
+
+def fast(rows) -> bytes:
+    return fast_json.dumps([serialize_task(row) for row in rows])
+
+
+def best_of(repeats: int, run) -> float:
+    """Lowest CPU seconds over ``repeats`` runs."""
+    timings = []
+    for _ in range(repeats):
+        start = time.process_time()
+        run()
+        timings.append(time.process_time() - start)
+    return min(timings)
+
+
+def main(count: int, repeats: int) -> None:
+    rows = build_rows(count)
+    field = list_tasks_field()
+    loop = asyncio.new_event_loop()
+
+    assert loop.run_until_complete(validated(rows, field)) is not None
+    before = best_of(repeats, lambda: loop.run_until_complete(validated(rows, field)))
+    after = best_of(repeats, lambda: fast(rows))
+    encoder = "orjson" if fast_json.orjson is not None else "json"
+
+    print(f"rows:              {count}")
+    print(f"response model:    {before * 1e3:10.1f} ms")
+    print(f"fast ({encoder + '):':7} {after * 1e3:10.1f} ms")
+    print(f"speedup:           {before / after:10.1f}x")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
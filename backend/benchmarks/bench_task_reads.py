@@ -0,0 +1,116 @@
+# benchmarks/bench_task_reads.py
+"""Measure CPU and memory of reading task pages as ORM entities vs plain rows.
+
+Loads a user with many tasks into a scratch SQLite database, then reads the
+whole set page by page (TASK_MAX_PAGE_SIZE rows each, like GET /tasks) and
+serializes every page the way the fast response path does. "entities" is the
+old select(Task) path; "rows" is read_query(), which skips the identity map.
+
+Run from the backend directory with the usual settings in the environment:
+
+    python -m benchmarks.bench_task_reads [tasks] [repeats]
+"""
+
+from datetime import datetime, timedelta
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.tasks import serialize_task
+from app.core import fast_json
+from app.core.config import settings
+from app.core.task_queries import TaskSort, apply_cursor, apply_filters, apply_sort, next_cursor, read_query
+from app.db.async_session import create_async_engine_for
+from app.db.session import Base
+from app.models.task import Task, TaskPriority, TaskStatus
+
+USER_ID = "bench-user"
+
+
+async def load_tasks(session_factory, count: int) -> None:
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        await db.execute(insert(Task), [
+            {
+                "user_id": USER_ID,
+                "title": f"Task {i}",
+                "description": "Write the quarterly report and send it to the team" if i % 3 else "",
+                "status": list(TaskStatus)[i % 3],
+                "priority": list(TaskPriority)[i % 3],
+                "due_date": now + timedelta(days=i % 30) if i % 2 else None,
+                "created_at": now + timedelta(seconds=i),
+                "updated_at": now + timedelta(seconds=i),
+            }
+            for i in range(count)
+        ])
+        await db.commit()
+
+
+async def read_pages(session_factory, base_query, scalars: bool) -> int:
+    """Read and serialize every page; one session per page, like one request each."""
+    sort = TaskSort.CREATED_AT
+    query = apply_sort(apply_filters(base_query, USER_ID), sort)
+    page_size = settings.TASK_MAX_PAGE_SIZE
+    cursor = None
+    total = 0
+    while True:
+        async with session_factory() as db:
+            page_query = apply_cursor(query, sort, cursor) if cursor else query
+            result = await db.execute(page_query.limit(page_size))
+            tasks = result.scalars().all() if scalars else result.all()
+            fast_json.dumps([serialize_task(task) for task in tasks])
+        total += len(tasks)
+        if len(tasks) < page_size:
+            return total
+        cursor = next_cursor(sort, tasks[-1])
+
+
+async def measure(session_factory, base_query, scalars: bool, repeats: int):
+    """Return (best CPU seconds for the whole set, peak traced bytes of one page)."""
+    timings = []
+    for _ in range(repeats):
+        start = time.process_time()
+        assert await read_pages(session_factory, base_query, scalars) > 0
+        timings.append(time.process_time() - start)
+
+    async with session_factory() as db:
+        query = apply_sort(apply_filters(base_query, USER_ID), TaskSort.CREATED_AT)
+        tracemalloc.start()
+        result = await db.execute(query.limit(settings.TASK_MAX_PAGE_SIZE))
+        tasks = result.scalars().all() if scalars else result.all()
+        fast_json.dumps([serialize_task(task) for task in tasks])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return min(timings), peak
+
+
+async def main(count: int, repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine_for(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        await load_tasks(session_factory, count)
+
+        entities = await measure(session_factory, select(Task), scalars=True, repeats=repeats)
+        rows = await measure(session_factory, read_query(), scalars=False, repeats=repeats)
+        await engine.dispose()
+
+    page = settings.TASK_MAX_PAGE_SIZE
+    print(f"tasks:             {count} (pages of {page})")
+    for name, (cpu, peak) in (("entities", entities), ("rows", rows)):
+        print(f"{name + ':':18} {cpu / count * 1e6:8.2f} us/row  {peak / 1024:8.0f} KiB peak/page")
+    print(f"speedup:           {entities[0] / rows[0]:8.2f}x     {entities[1] / rows[1]:8.2f}x less memory")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+    ))
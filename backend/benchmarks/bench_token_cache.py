@@ -0,0 +1,72 @@
+# benchmarks/bench_token_cache.py
+"""Measure auth CPU per request with and without the verified-token cache.
+
+Run from the backend directory with the usual settings in the environment:
+
+    python -m benchmarks.bench_token_cache [iterations]
+"""
+
+import asyncio
+import sys
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.core import security
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+def build_token():
+    """Sign a realistic access token and load its key into the JWKS store."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_key = jwk.construct(private_pem, algorithm="RS256").public_key()
+    security.jwks_store._keys = {"bench": public_key}
+    security.jwks_store._fetched_at = time.monotonic()
+
+    claims = {
+        "sub": "bench-user",
+        "preferred_username": "bench",
+        "email": "bench@example.com",
+        "name": "Bench User",
+        "realm_access": {"roles": ["user", "admin"]},
+        "iss": f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}",
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": "bench"})
+
+
+async def measure(token: str, iterations: int, cached: bool) -> float:
+    """Return CPU microseconds per get_current_user call."""
+    security.token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAX_ENTRIES if cached else 0)
+    start = time.process_time()
+    for _ in range(iterations):
+        await security.get_current_user(token)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+async def main(iterations: int) -> None:
+    token = build_token()
+    # Keep debug logging out of the measurement
+    security.logger.setLevel("WARNING")
+
+    uncached = await measure(token, iterations, cached=False)
+    cached = await measure(token, iterations, cached=True)
+    stats = security.token_cache.stats()
+
+    print(f"iterations:        {iterations}")
+    print(f"uncached:          {uncached:10.1f} us/request")
+    print(f"cached:            {cached:10.1f} us/request")
+    print(f"speedup:           {uncached / cached:10.1f}x")
+    print(f"cache hits/misses: {stats['hits']}/{stats['misses']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
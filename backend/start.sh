@@ -22,4 +22,9 @@ else
 fi
 
 echo "🚀 Starting application..."
-exec uvicorn app:app --host 0.0.0.0 --port 8000
\ No newline at end of file
+# X-Forwarded-For is only trusted from FORWARDED_ALLOW_IPS (default: none
+# but localhost). Set it to the ingress/proxy address or CIDR so
+# request.client is the real caller, e.g. for API token throttling; never to
+# a range other in-cluster callers can send from.
+exec uvicorn app:app --host 0.0.0.0 --port 8000 \
+    --proxy-headers --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-127.0.0.1}"
\ No newline at end of file
@@ -7,10 +7,12 @@ from typing import Generator, AsyncGenerator
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool, StaticPool
 
 from app import app
 from app.db.session import Base, get_db
+from app.db.async_session import get_async_database_url, get_async_db
 from app.core.config import settings
 
 # Use the real PostgreSQL database for testing
@@ -56,15 +58,31 @@ def test_db() -> Generator[Session, None, None]:
 
 
 @pytest.fixture(scope="function")
-def client(test_db: Session) -> Generator[TestClient, None, None]:
-    """Create a test client with overridden database dependency."""
+def test_async_engine(test_db: Session) -> AsyncEngine:
+    """Async engine for the same test database, used by the request handlers.
+    
+    Connections are not pooled because each TestClient runs its own event loop.
+    """
+    return create_async_engine(get_async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+
+
+@pytest.fixture(scope="function")
+def client(test_db: Session, test_async_engine: AsyncEngine) -> Generator[TestClient, None, None]:
+    """Create a test client with overridden database dependencies."""
     def override_get_db():
         try:
             yield test_db
         finally:
             pass
     
+    TestingAsyncSessionLocal = async_sessionmaker(test_async_engine, autoflush=False, expire_on_commit=False)
+    
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     with TestClient(app) as test_client:
         yield test_client
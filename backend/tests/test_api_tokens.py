@@ -0,0 +1,207 @@
+# tests/test_api_tokens.py
+"""Test API token authentication."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+
+@pytest.fixture
+def token_owner(client: TestClient, mock_user):
+    """Authenticate token management calls as the mock user."""
+    from app.core.security import get_current_user
+
+    async def override_get_current_user():
+        return mock_user
+
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    yield mock_user
+    del client.app.dependency_overrides[get_current_user]
+
+
+@pytest.fixture
+def api_token(client: TestClient, token_owner):
+    """Create an API token and return the creation response."""
+    response = client.post("/api/v1/tokens/", json={"name": "ci-bot"},
+                           headers={"Authorization": "Bearer mock_token"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def count_token_lookups(test_async_engine):
+    """Count SELECTs against api_tokens issued by the request handlers."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "api_tokens" in statement:
+            statements.append(statement)
+
+    event.listen(test_async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def test_api_token_verification_is_cached(client: TestClient, api_token, test_async_engine):
+    """Repeat API-token requests do not look the token up again."""
+    headers = {"Authorization": f"Bearer {api_token['token']}"}
+    lookups = count_token_lookups(test_async_engine)
+
+    for _ in range(5):
+        response = client.get("/api/v1/tokens/verify", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["auth_method"] == "api_token"
+        assert response.json()["token_name"] == "ci-bot"
+
+    assert len(lookups) == 1
+
+
+def test_revoked_api_token_stops_working_immediately(client: TestClient, api_token):
+    """Revoking a token evicts it from the verification cache."""
+    headers = {"Authorization": f"Bearer {api_token['token']}"}
+    assert client.get("/api/v1/tokens/verify", headers=headers).status_code == 200
+
+    response = client.delete(f"/api/v1/tokens/{api_token['id']}",
+                             headers={"Authorization": "Bearer mock_token"})
+    assert response.status_code == 200
+
+    assert client.get("/api/v1/tokens/verify", headers=headers).status_code == 401
+
+
+def test_revocation_is_broadcast_to_other_workers(client: TestClient, api_token, monkeypatch):
+    """Revoking a token notifies every worker on commit, and a notification evicts the cached token."""
+    from app.core import api_tokens
+    from app.core.notify import PostgresNotifier
+
+    sent = []
+    monkeypatch.setitem(api_tokens.notifier._listeners, api_tokens.REVOCATION_CHANNEL, [(sent.append, None)])
+    headers = {"Authorization": f"Bearer {api_token['token']}"}
+    assert client.get("/api/v1/tokens/verify", headers=headers).status_code == 200
+    token_hash = api_tokens.hash_token(api_token["token"])
+    cached = api_tokens.api_token_cache.get(token_hash)
+    client.delete(f"/api/v1/tokens/{api_token['id']}", headers={"Authorization": "Bearer mock_token"})
+    assert sent == [token_hash]
+
+    # Another worker, still holding the token, hears the revocation over LISTEN
+    other_worker = PostgresNotifier(["postgresql://user:secret@db:5432/app"])
+    other_worker.listen(api_tokens.REVOCATION_CHANNEL, api_tokens.api_token_cache.pop)
+    api_tokens.api_token_cache.set(token_hash, cached)
+    other_worker._on_notification(None, 1, api_tokens.REVOCATION_CHANNEL, token_hash)
+    assert client.get("/api/v1/tokens/verify", headers=headers).status_code == 401
+
+
+def test_last_used_is_written_behind(client: TestClient, api_token, test_db):
+    """Verification records last_used in memory and flushes it in bulk."""
+    import asyncio
+    from datetime import timedelta
+    from app.core.api_tokens import APIToken, last_used_buffer
+
+    headers = {"Authorization": f"Bearer {api_token['token']}"}
+    assert client.get("/api/v1/tokens/verify", headers=headers).status_code == 200
+
+    db_token = test_db.query(APIToken).filter(APIToken.id == api_token["id"]).one()
+    assert db_token.last_used is None
+    assert last_used_buffer.pending(api_token["id"]) is not None
+
+    # Listing tokens already reflects the pending timestamp
+    listed = client.get("/api/v1/tokens/", headers={"Authorization": "Bearer mock_token"}).json()
+    assert next(t for t in listed if t["id"] == api_token["id"])["last_used"] is not None
+
+    assert asyncio.run(last_used_buffer.flush()) == 1
+    test_db.expire_all()
+    assert db_token.last_used is not None
+    assert last_used_buffer.pending(api_token["id"]) is None
+
+    # A worker flushing an older timestamp late does not move last_used backwards
+    written = db_token.last_used
+    last_used_buffer.record(api_token["id"], written - timedelta(hours=1))
+    assert asyncio.run(last_used_buffer.flush()) == 1
+    test_db.expire_all()
+    assert db_token.last_used == written
+
+
+def test_unknown_api_token_is_negative_cached(client: TestClient, test_async_engine, monkeypatch):
+    """A well-formed but unknown token is looked up once, malformed ones never."""
+    from app.core import api_tokens
+    from app.core.api_tokens import generate_api_token
+
+    monkeypatch.setattr(api_tokens, "api_token_failures", api_tokens.FailureTracker(max_failures=10, window=60))
+    lookups = count_token_lookups(test_async_engine)
+    unknown = {"Authorization": f"Bearer {generate_api_token()}"}
+    for _ in range(3):
+        assert client.get("/api/v1/tokens/verify", headers=unknown).status_code == 401
+    assert client.get("/api/v1/tokens/verify",
+                      headers={"Authorization": "Bearer tk_not_a_real_token"}).status_code == 401
+
+    assert len(lookups) == 1
+
+
+def test_repeated_bad_api_tokens_are_throttled(client: TestClient, monkeypatch):
+    """Clients that keep presenting bad tokens are short-circuited with 429."""
+    from app.core import api_tokens
+
+    monkeypatch.setattr(api_tokens, "api_token_failures", api_tokens.FailureTracker(max_failures=3, window=60))
+    for _ in range(3):
+        response = client.get("/api/v1/tokens/verify", headers={"Authorization": "Bearer tk_bogus"})
+        assert response.status_code == 401
+
+    response = client.get("/api/v1/tokens/verify", headers={"Authorization": "Bearer tk_bogus"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def test_valid_api_token_works_while_its_address_is_blocked(client: TestClient, api_token, monkeypatch):
+    """Bad tokens from a shared address do not lock out a valid token sent from it."""
+    from app.core import api_tokens
+
+    monkeypatch.setattr(api_tokens, "api_token_failures", api_tokens.FailureTracker(max_failures=3, window=60))
+    headers = {"Authorization": f"Bearer {api_token['token']}"}
+    assert client.get("/api/v1/tokens/verify", headers=headers).status_code == 200
+    for _ in range(3):
+        client.get("/api/v1/tokens/verify", headers={"Authorization": "Bearer tk_scan"})
+    assert client.get("/api/v1/tokens/verify", headers={"Authorization": "Bearer tk_scan"}).status_code == 429
+
+    response = client.get("/api/v1/tokens/verify", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["token_name"] == "ci-bot"
+
+
+def test_token_list_fast_json_matches(client: TestClient, api_token, monkeypatch):
+    """The fast JSON path lists tokens exactly like the validated path."""
+    from app.core.config import settings
+
+    headers = {"Authorization": "Bearer mock_token"}
+    validated = client.get("/api/v1/tokens/", headers=headers)
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    fast = client.get("/api/v1/tokens/", headers=headers)
+
+    assert fast.status_code == 200
+    assert fast.headers["Content-Type"] == "application/json"
+    assert fast.json() == validated.json()
+    assert api_token["id"] in [token["id"] for token in fast.json()]
+
+
+def test_routed_sessions_work_with_api_token_auth(client: TestClient, api_token):
+    """Routed read and write sessions follow the route's own auth, so API tokens are accepted."""
+    from fastapi import APIRouter, Depends
+    from app.core.api_tokens import get_current_user_dual_auth
+    from app.db.replicas import read_db, write_db
+
+    router = APIRouter()
+
+    @router.get("/routed-session-check")
+    async def routed(
+        current_user: dict = Depends(get_current_user_dual_auth),
+        reader=Depends(read_db(get_current_user_dual_auth)),
+        writer=Depends(write_db(get_current_user_dual_auth)),
+    ):
+        return {"sub": current_user["sub"], "same_session": reader is writer}
+
+    client.app.include_router(router)
+    try:
+        response = client.get("/routed-session-check", headers={"Authorization": f"Bearer {api_token['token']}"})
+        assert response.status_code == 200
+        # No replicas configured: both are the one primary session of the request
+        assert response.json() == {"sub": "test-user-id", "same_session": True}
+    finally:
+        client.app.router.routes = [
+            route for route in client.app.router.routes if getattr(route, "path", None) != "/routed-session-check"
+        ]
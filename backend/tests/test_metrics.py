@@ -0,0 +1,68 @@
+# tests/test_metrics.py
+"""Test connection pool instrumentation and the /metrics endpoint."""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+
+from app.core.config import settings
+from app.db.pool_metrics import InstrumentedQueuePool, instrument_engine, pool_metrics
+
+
+def test_pool_metrics_record_waits_timeouts_and_lifetimes(tmp_path):
+    """Test checkouts, timeouts and connection lifetimes are recorded for a full pool"""
+    engine = instrument_engine(create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1,
+    ), "test-pool")
+    metrics = pool_metrics["test-pool"]
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        assert metrics.checked_out == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    assert metrics.checked_out == 0
+    assert metrics.checkout_timeouts == 1
+    assert metrics.checkout_wait.count == 2
+    assert metrics.checkout_wait.sum >= 0.1
+
+    engine.dispose()
+    assert metrics.connections_opened == 1
+    assert metrics.connections_closed == 1
+    assert metrics.connection_lifetime.count == 1
+
+    # The pool dispose() swapped in keeps recording into the same metrics
+    with engine.connect():
+        pass
+    assert metrics.checkout_wait.count == 3
+    engine.dispose()
+    del pool_metrics["test-pool"]
+
+
+def test_metrics_endpoint(client: TestClient, tmp_path, monkeypatch):
+    """Test /metrics serves pool and cache metrics in the Prometheus text format to scrapers with the token"""
+    engine = instrument_engine(create_engine(
+        f"sqlite:///{tmp_path / 'scraped.db'}", poolclass=InstrumentedQueuePool, pool_size=3,
+    ), "scraped")
+    with engine.connect():
+        pass
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 404
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer guess"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert body.count("# TYPE db_pool_checkout_wait_seconds histogram") == 1
+    assert 'db_pool_size{pool="scraped"} 3' in body
+    assert 'db_pool_checkout_wait_seconds_bucket{pool="scraped",le="+Inf"} 1' in body
+    assert 'db_pool_connections_opened_total{pool="scraped"} 1' in body
+    assert 'cache_hits_total{cache="jwt"}' in body
+    assert "task_event_stream_connections 0" in body
+    engine.dispose()
+    del pool_metrics["scraped"]
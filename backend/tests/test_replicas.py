@@ -0,0 +1,120 @@
+# tests/test_replicas.py
+"""Test read-replica routing, with SQLite files standing in for the replicas."""
+
+from datetime import datetime
+import time
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+
+from app.db import replicas
+from app.db.replicas import ReplicaRouter
+from app.db.session import Base
+from app.models.task import Task
+
+USER_ID = f"replica-user-{uuid4().hex}"
+
+
+@pytest.fixture
+def replica_urls(tmp_path):
+    """Two replica databases, each holding one task the primary does not have."""
+    urls = []
+    for index in range(2):
+        url = f"sqlite:///{tmp_path / f'replica{index}.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        now = datetime.utcnow()
+        with engine.begin() as connection:
+            connection.execute(insert(Task).values(
+                user_id=USER_ID, title=f"On replica {index}", description="",
+                created_at=now, updated_at=now,
+            ))
+        engine.dispose()
+        urls.append(url)
+    return urls
+
+
+@pytest.fixture
+def replica_user(client: TestClient):
+    from app.core.security import get_current_user, User
+
+    user = User(sub=USER_ID, preferred_username="replica")
+
+    async def override_get_current_user():
+        return user
+
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    yield user
+    del client.app.dependency_overrides[get_current_user]
+
+
+def use_router(monkeypatch, urls, sticky_seconds=60.0):
+    router = ReplicaRouter(urls, sticky_seconds=sticky_seconds, retry_seconds=60.0)
+    monkeypatch.setattr(replicas, "replica_router", router)
+    return router
+
+
+def titles(client: TestClient, path="/api/v1/tasks"):
+    response = client.get(path, headers={"Authorization": "Bearer mock_token"})
+    assert response.status_code == 200
+    return [task["title"] for task in response.json()]
+
+
+def test_reads_rotate_over_replicas_and_writes_stick_to_primary(client, replica_user, replica_urls, monkeypatch):
+    """Test reads go round robin over the replicas until the user writes"""
+    router = use_router(monkeypatch, replica_urls)
+    headers = {"Authorization": "Bearer mock_token"}
+
+    assert titles(client) == ["On replica 0"]
+    assert titles(client) == ["On replica 1"]
+    assert titles(client) == ["On replica 0"]
+
+    task_id = client.post("/api/v1/tasks", json={"title": "On primary", "description": ""},
+                          headers=headers).json()["id"]
+    assert router.stats()["sticky_users"] == 1
+    # The write is visible right away because the user's reads now go to the primary
+    assert titles(client) == ["On primary"]
+    assert client.get(f"/api/v1/tasks/{task_id}", headers=headers).status_code == 200
+    assert client.get("/api/v1/tokens/", headers=headers).status_code == 200
+
+    # Other users are not affected
+    assert router.pick("someone-else") is not None
+
+    # Once the stickiness expires, reads go back to the replicas
+    router = use_router(monkeypatch, replica_urls, sticky_seconds=0)
+    client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert titles(client) in (["On replica 0"], ["On replica 1"])
+
+
+def test_unreachable_replicas_fall_back(client, replica_user, replica_urls, tmp_path, monkeypatch):
+    """Test a replica that cannot be reached is skipped, and the primary serves when none is left"""
+    unreachable = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    router = use_router(monkeypatch, [unreachable, replica_urls[0]])
+
+    assert titles(client) == ["On replica 0"]
+    assert titles(client) == ["On replica 0"]
+    assert router.stats() == {"replicas": 2, "down": 1, "sticky_users": 0}
+
+    router = use_router(monkeypatch, [unreachable])
+    assert titles(client) == []
+    assert router.pick(USER_ID) is None
+
+
+def test_read_your_writes_follows_the_client_across_workers(client, replica_user, replica_urls, monkeypatch):
+    """Test the stickiness cookie keeps reads on the primary on a worker that did not see the write"""
+    use_router(monkeypatch, replica_urls)
+    headers = {"Authorization": "Bearer mock_token"}
+    response = client.post("/api/v1/tasks", json={"title": "On primary", "description": ""}, headers=headers)
+    assert replicas.STICKY_COOKIE in response.cookies
+
+    # Another worker or pod: no memory of the write, only the client's cookie
+    other_worker = use_router(monkeypatch, replica_urls)
+    assert titles(client) == ["On primary"]
+    assert other_worker.stats()["sticky_users"] == 0
+
+    # A cookie claiming a longer window than READ_REPLICA_STICKY_SECONDS is ignored
+    client.cookies.clear()
+    client.cookies.set(replicas.STICKY_COOKIE, str(time.time() + 3600), path="/api/v1")
+    assert titles(client) == ["On replica 0"]
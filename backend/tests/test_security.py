@@ -0,0 +1,271 @@
+# tests/test_security.py
+"""Test Keycloak token verification."""
+
+import asyncio
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+
+from app.core.config import settings
+from app.core.security import JWKSKeyStore
+
+
+def make_signing_key(kid: str):
+    """Generate an RSA key pair and return (private PEM, public JWK dict)."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_jwk = jwk.construct(private_pem, algorithm="RS256").public_key().to_dict()
+    public_jwk.update({"kid": kid, "use": "sig"})
+    return private_pem, public_jwk
+
+
+def make_token(private_pem: str, kid: str, expires_in: int = 300, **claims) -> str:
+    """Sign a Keycloak-shaped access token."""
+    payload = {
+        "sub": "test-user-id",
+        "preferred_username": "testuser",
+        "iss": f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}",
+        "exp": int(time.time()) + expires_in,
+        **claims,
+    }
+    return jwt.encode(payload, private_pem, algorithm="RS256", headers={"kid": kid})
+
+
+def make_store(jwks_keys, **kwargs):
+    """Build a key store whose fetches are served from ``jwks_keys`` and counted."""
+    options = {"cache_ttl": 3600, "refresh_interval": 300, "min_refetch_interval": 30}
+    options.update(kwargs)
+    store = JWKSKeyStore(jwks_url="https://auth.test.com/certs", **options)
+    store.fetch_count = 0
+
+    async def fake_fetch():
+        store.fetch_count += 1
+        store._last_attempt = time.monotonic()
+        await asyncio.sleep(0.01)
+        store._keys = {k["kid"]: jwk.construct(k, algorithm="RS256") for k in jwks_keys}
+        store._fetched_at = time.monotonic()
+
+    store._fetch = fake_fetch
+    return store
+
+
+def test_jwks_concurrent_callers_share_one_fetch():
+    """Concurrent lookups on a cold cache trigger a single JWKS fetch."""
+    _, public_jwk = make_signing_key("key-1")
+    store = make_store([public_jwk])
+
+    async def run():
+        return await asyncio.gather(*(store.get_key("key-1") for _ in range(50)))
+
+    keys = asyncio.run(run())
+    assert store.fetch_count == 1
+    assert all(key is keys[0] for key in keys)
+
+
+def test_jwks_unknown_kid_refetch_is_rate_limited():
+    """An unknown kid refetches once, then is rejected without hitting Keycloak."""
+    _, public_jwk = make_signing_key("key-1")
+    store = make_store([public_jwk], min_refetch_interval=60)
+
+    async def run():
+        await store.get_key("key-1")
+        # Pretend the initial fetch happened long enough ago to allow a refetch
+        store._last_attempt -= 120
+        for _ in range(5):
+            with pytest.raises(HTTPException) as exc_info:
+                await store.get_key("rotated-key")
+            assert exc_info.value.status_code == 401
+
+    asyncio.run(run())
+    assert store.fetch_count == 2
+
+
+def test_jwks_outage_fails_fast_on_a_cold_cache():
+    """While Keycloak is down, requests without keys refetch once per interval and get 503 meanwhile."""
+    store = make_store([], min_refetch_interval=60)
+
+    async def failing_fetch():
+        store.fetch_count += 1
+        store._last_attempt = time.monotonic()
+        raise HTTPException(status_code=503, detail="down")
+
+    store._fetch = failing_fetch
+
+    async def run():
+        for _ in range(5):
+            with pytest.raises(HTTPException) as exc_info:
+                await store.get_key("key-1")
+            assert exc_info.value.status_code == 503
+
+    asyncio.run(run())
+    assert store.fetch_count == 1
+
+
+def test_jwks_picks_up_rotated_key():
+    """A token signed with a newly rotated key verifies after one refetch."""
+    _, old_jwk = make_signing_key("old")
+    _, new_jwk = make_signing_key("new")
+    jwks_keys = [old_jwk]
+    store = make_store(jwks_keys, min_refetch_interval=0)
+
+    async def run():
+        await store.get_key("old")
+        jwks_keys.append(new_jwk)
+        return await store.get_key("new")
+
+    assert asyncio.run(run()) is not None
+    assert store.fetch_count == 2
+
+
+def test_jwks_refresh_survives_malformed_responses(monkeypatch):
+    """Unexpected JWKS bodies fail the fetch and the background refresh keeps retrying."""
+    import httpx
+    from app.core import keycloak_client
+
+    _, public_jwk = make_signing_key("good")
+    bodies = [["not", "a", "dict"], {"keys": [{"kid": "broken", "kty": "RSA"}, "junk", public_jwk]}]
+
+    def handler(request):
+        return httpx.Response(200, json=bodies.pop(0) if len(bodies) > 1 else bodies[0])
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(keycloak_client, "_keycloak_client", client)
+        store = JWKSKeyStore(jwks_url="https://auth.test.com/certs", cache_ttl=3600,
+                             refresh_interval=300, min_refetch_interval=0.01)
+        store.start()
+        for _ in range(100):
+            if store._keys:
+                break
+            await asyncio.sleep(0.01)
+        await store.stop()
+        await keycloak_client.close_keycloak_client()
+        return store
+
+    store = asyncio.run(run())
+    assert list(store._keys) == ["good"]
+
+
+def test_verify_token_with_jwks(monkeypatch):
+    """verify_token accepts a token signed by a key from the JWKS."""
+    from app.core import security
+
+    private_pem, public_jwk = make_signing_key("key-1")
+    monkeypatch.setattr(security, "jwks_store", make_store([public_jwk]))
+
+    payload = asyncio.run(security.verify_token(make_token(private_pem, "key-1")))
+    assert payload["preferred_username"] == "testuser"
+
+    other_pem, _ = make_signing_key("key-1")
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(security.verify_token(make_token(other_pem, "key-1")))
+    assert exc_info.value.status_code == 401
+
+
+def test_authenticate_token_caches_verified_user(monkeypatch):
+    """Repeat presentations of a token are served from the cache."""
+    from app.core import security
+
+    private_pem, public_jwk = make_signing_key("key-1")
+    monkeypatch.setattr(security, "jwks_store", make_store([public_jwk]))
+    monkeypatch.setattr(security, "token_cache", security.TTLCache(maxsize=16))
+
+    calls = []
+    verify_token = security.verify_token
+
+    async def counting_verify_token(token):
+        calls.append(token)
+        return await verify_token(token)
+
+    monkeypatch.setattr(security, "verify_token", counting_verify_token)
+    token = make_token(private_pem, "key-1")
+
+    async def run():
+        return [await security.authenticate_token(token) for _ in range(10)]
+
+    users = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(user is users[0] for user in users)
+    assert security.token_cache.stats()["hits"] == 9
+    assert security.token_cache.stats()["misses"] == 1
+
+
+def test_token_cache_entries_expire_at_exp():
+    """Entries are never served past the expiry they were stored with."""
+    from app.core.cache import TTLCache
+
+    cache = TTLCache(maxsize=2)
+    cache.set("expired", "user", expires_at=time.time() - 1)
+    cache.set("a", 1, expires_at=time.time() + 60)
+    cache.set("b", 2, expires_at=time.time() + 60)
+    cache.get("a")
+    cache.set("c", 3, expires_at=time.time() + 60)
+
+    assert cache.get("expired") is None
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache  # least recently used entry was evicted
+
+
+def test_keycloak_calls_reuse_shared_client(monkeypatch):
+    """Code exchange and refresh go through the one pooled Keycloak client."""
+    import httpx
+    from app.core import keycloak_client, security
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"access_token": "new", "refresh_token": "next"})
+
+    async def run():
+        client = httpx.AsyncClient(
+            base_url=f"{settings.KEYCLOAK_URL}/realms/{settings.KEYCLOAK_REALM}",
+            transport=httpx.MockTransport(handler),
+        )
+        monkeypatch.setattr(keycloak_client, "_keycloak_client", client)
+        await security.exchange_code_for_token("code", "https://app.test/callback")
+        await security.refresh_token_with_keycloak("refresh")
+        assert keycloak_client.get_keycloak_client() is client
+        await keycloak_client.close_keycloak_client()
+
+    asyncio.run(run())
+    token_path = f"/realms/{settings.KEYCLOAK_REALM}/protocol/openid-connect/token"
+    assert [r.url.path for r in requests] == [token_path] * 2
+    assert b"grant_type=refresh_token" in requests[1].content
+
+
+def test_concurrent_refreshes_share_one_keycloak_call(monkeypatch):
+    """Identical in-flight refreshes are served by a single upstream request."""
+    import httpx
+    from app.core import keycloak_client, security
+    from app.core.singleflight import SingleFlight
+
+    monkeypatch.setattr(security, "keycloak_token_calls", SingleFlight(grace_period=5))
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"access_token": f"access-{len(calls)}"})
+
+    async def run():
+        client = httpx.AsyncClient(base_url="https://auth.test.com", transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(keycloak_client, "_keycloak_client", client)
+        results = await asyncio.gather(*(security.refresh_token_with_keycloak("same") for _ in range(5)))
+        # Stragglers inside the grace window get the same response
+        results.append(await security.refresh_token_with_keycloak("same"))
+        await security.refresh_token_with_keycloak("other")
+        await keycloak_client.close_keycloak_client()
+        return results
+
+    results = asyncio.run(run())
+    assert len(calls) == 2
+    assert {r["access_token"] for r in results} == {"access-1"}
@@ -0,0 +1,169 @@
+# tests/test_shards.py
+"""Test user-sharded task storage, with SQLite files standing in for the shards."""
+
+from collections import Counter
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+
+from app.core.task_shards import move_user_to_shard, rebalance
+from app.db import shards
+from app.db.session import Base
+from app.db.shards import HashRing, ShardRouter
+from app.models.task import Task, TaskTombstone
+
+
+@pytest.fixture
+def shard_urls(tmp_path):
+    """Three empty shard databases."""
+    urls = []
+    for index in range(3):
+        url = f"sqlite:///{tmp_path / f'shard{index}.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+        urls.append(url)
+    return urls
+
+
+@pytest.fixture
+def as_user(client: TestClient):
+    """Authenticate requests as the user id passed to the returned function."""
+    from app.core.security import get_current_user, User
+
+    user = User(sub="nobody", preferred_username="sharded")
+
+    async def override_get_current_user():
+        return user
+
+    def switch(user_id):
+        user.sub = user_id
+        return {"Authorization": "Bearer mock_token"}
+
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    yield switch
+    del client.app.dependency_overrides[get_current_user]
+
+
+def use_router(monkeypatch, urls):
+    router = ShardRouter(urls, vnodes=100)
+    monkeypatch.setattr(shards, "shard_router", router)
+    return router
+
+
+def user_on(router, index, prefix="shard-user"):
+    """A user id the ring puts on shard ``index``."""
+    return next(f"{prefix}-{i}" for i in range(1000) if router.shard_for(f"{prefix}-{i}") == index)
+
+
+def task_titles(url, user_id):
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        titles = connection.execute(select(Task.title).where(Task.user_id == user_id).order_by(Task.id)).scalars().all()
+    engine.dispose()
+    return titles
+
+
+def tombstone_times(url, user_id):
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(TaskTombstone.task_id, TaskTombstone.deleted_at).where(TaskTombstone.user_id == user_id)
+        ).all()
+    engine.dispose()
+    return dict(rows)
+
+
+def test_ring_spreads_users_and_moves_few_on_growth():
+    """Test users spread evenly and adding a node only moves users onto it"""
+    users = [f"user-{i}" for i in range(3000)]
+    ring = HashRing(["a", "b", "c"], vnodes=100)
+    before = {user: ring.get(user) for user in users}
+    assert all(600 < count < 1400 for count in Counter(before.values()).values())
+
+    grown = HashRing(["a", "b", "c", "d"], vnodes=100)
+    moved = [user for user in users if grown.get(user) != before[user]]
+    assert all(grown.get(user) == "d" for user in moved)
+    assert 400 < len(moved) < 1200
+
+    with pytest.raises(ValueError):
+        ShardRouter(["sqlite:////tmp/a.db", "sqlite:////tmp/a.db"], vnodes=10)
+
+
+def test_task_requests_use_the_users_shard(client, as_user, shard_urls, monkeypatch):
+    """Test task reads and writes go to the shard of the current user only"""
+    router = use_router(monkeypatch, shard_urls[:2])
+    first, second = user_on(router, 0), user_on(router, 1)
+
+    headers = as_user(first)
+    task_id = client.post("/api/v1/tasks", json={"title": "First's", "description": ""}, headers=headers).json()["id"]
+    assert client.get(f"/api/v1/tasks/{task_id}", headers=headers).status_code == 200
+    headers = as_user(second)
+    client.post("/api/v1/tasks/bulk", json={"create": [{"title": "Second's", "description": ""}]}, headers=headers)
+    assert [task["title"] for task in client.get("/api/v1/tasks", headers=headers).json()] == ["Second's"]
+    assert client.get("/api/v1/tasks/stats", headers=headers).json()["total"] == 1
+
+    assert task_titles(shard_urls[0], first) == ["First's"]
+    assert task_titles(shard_urls[1], first) == []
+    assert task_titles(shard_urls[1], second) == ["Second's"]
+    assert task_titles(shard_urls[0], second) == []
+
+
+def test_rebalance_moves_users_to_new_shards(client, as_user, shard_urls, monkeypatch):
+    """Test adding a shard moves affected users' data, renumbering ids taken on the target"""
+    router = use_router(monkeypatch, shard_urls[:2])
+    grown = ShardRouter(shard_urls, vnodes=100)
+    # A user the third shard takes over, and one that stays put
+    mover, squatter = user_on(grown, 2, "mover"), user_on(grown, 2, "squatter")
+    stayer = next(f"stayer-{i}" for i in range(1000) if grown.shard_for(f"stayer-{i}") == router.shard_for(f"stayer-{i}"))
+    old_shard = shard_urls[router.shard_for(mover)]
+
+    headers = as_user(mover)
+    ids = [item["id"] for item in client.post("/api/v1/tasks/bulk", json={"create": [
+        {"title": f"Move {i}", "description": "", "priority": "high"} for i in range(3)
+    ]}, headers=headers).json()["create"]]
+    client.delete(f"/api/v1/tasks/{ids[2]}", headers=headers)
+    since = client.get("/api/v1/tasks/changes", headers=headers).json()["next_since"]
+    client.put(f"/api/v1/tasks/{ids[0]}", json={"status": "done"}, headers=headers)
+    headers = as_user(stayer)
+    client.post("/api/v1/tasks", json={"title": "Stay", "description": ""}, headers=headers)
+
+    # Someone else already has the mover's first task id on the new shard
+    engine = create_engine(shard_urls[2])
+    with engine.begin() as connection:
+        connection.execute(insert(Task).values(id=ids[0], user_id=squatter, title="Taken", description=""))
+    engine.dispose()
+
+    deleted_at = tombstone_times(old_shard, mover)
+    moves = asyncio.run(rebalance(grown))
+    assert [(move["user_id"], move["tasks"], move["renumbered"]) for move in moves] == [(mover, 2, 1)]
+    assert task_titles(old_shard, mover) == []
+    assert task_titles(shard_urls[2], mover) == ["Move 1", "Move 0"]
+    # Moved tombstones keep their deletion time; the renumbered task's old id is deleted now
+    moved_times = tombstone_times(shard_urls[2], mover)
+    assert moved_times[ids[2]] == deleted_at[ids[2]]
+    assert moved_times[ids[0]] > deleted_at[ids[2]]
+    assert task_titles(shard_urls[router.shard_for(stayer)], stayer) == ["Stay"]
+
+    monkeypatch.setattr(shards, "shard_router", grown)
+    headers = as_user(mover)
+    tasks = client.get("/api/v1/tasks", headers=headers).json()
+    assert sorted(task["title"] for task in tasks) == ["Move 0", "Move 1"]
+    new_id = next(task["id"] for task in tasks if task["title"] == "Move 0")
+    assert new_id != ids[0]
+    stats = client.get("/api/v1/tasks/stats", headers=headers).json()
+    assert stats["total"] == 2 and stats["by_priority"]["high"] == 2 and stats["by_status"]["done"] == 1
+
+    # A client that synced before the move sees the moved tasks, the renumbering and old deletions
+    changes = client.get("/api/v1/tasks/changes", params={"since": since}, headers=headers).json()
+    assert sorted(task["id"] for task in changes["changes"]) == sorted([ids[1], new_id])
+    assert sorted(changes["deleted"]) == sorted([ids[0], ids[2]])
+    assert client.post("/api/v1/tasks", json={"title": "After", "description": ""}, headers=headers).status_code == 200
+
+    assert asyncio.run(rebalance(grown)) == []
+    with pytest.raises(ValueError):
+        asyncio.run(move_user_to_shard(grown, mover, shard_urls[2]))
+    with pytest.raises(ValueError):
+        asyncio.run(rebalance(grown, [shard_urls[0]]))
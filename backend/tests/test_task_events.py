@@ -0,0 +1,156 @@
+# tests/test_task_events.py
+"""Test the task change feed."""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.core import task_events
+from app.core.notify import PostgresNotifier
+from app.core.task_events import TaskEventBus, RESYNC
+from tests.test_security import make_signing_key, make_store, make_token
+
+
+def test_bus_fans_out_per_user():
+    """Test events reach every stream of their user and nobody else's"""
+    bus = TaskEventBus(queue_size=10)
+    first, second = bus.subscribe("alice"), bus.subscribe("alice")
+    other = bus.subscribe("bob")
+
+    bus.deliver("alice", {"type": "created", "ids": [1]})
+    assert first.get_nowait() == second.get_nowait() == {"type": "created", "ids": [1]}
+    assert other.empty()
+    assert bus.stats() == {"users": 2, "connections": 3}
+
+    bus.unsubscribe("alice", first)
+    bus.unsubscribe("alice", second)
+    assert bus.stats() == {"users": 1, "connections": 1}
+
+
+def test_bus_replaces_backlog_of_slow_streams_with_resync():
+    """Test a full queue is collapsed into one resync event instead of growing"""
+    bus = TaskEventBus(queue_size=3)
+    queue = bus.subscribe("alice")
+    for task_id in range(5):
+        bus.deliver("alice", {"type": "updated", "ids": [task_id]})
+
+    events = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert events == [RESYNC, {"type": "updated", "ids": [4]}]
+
+
+def test_stream_sends_events_and_heartbeats(monkeypatch):
+    """Test the SSE generator formats events, keeps idle streams alive and unsubscribes"""
+    bus = TaskEventBus(queue_size=10)
+    monkeypatch.setattr(task_events, "task_event_bus", bus)
+    monkeypatch.setattr(task_events.settings, "TASK_EVENTS_HEARTBEAT", 0.01)
+
+    async def run():
+        stream = task_events.stream_task_events("alice")
+        assert await stream.__anext__() == ": connected\n\n"
+        assert bus.stats()["connections"] == 1
+        assert await stream.__anext__() == ": heartbeat\n\n"
+        bus.deliver("alice", {"type": "deleted", "ids": [7]})
+        assert await stream.__anext__() == 'event: deleted\ndata: {"ids":[7]}\n\n'
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert bus.stats()["connections"] == 0
+
+
+def test_task_writes_publish_events(client: TestClient, mock_user, monkeypatch):
+    """Test committed writes publish created/updated/deleted events for their owner"""
+    from app.core.security import get_current_user
+
+    published = []
+
+    def record(payload):
+        event = json.loads(payload)
+        published.append((event.pop("user_id"), event))
+
+    monkeypatch.setitem(task_events.notifier._listeners, task_events.TASK_EVENTS_CHANNEL, [(record, None)])
+
+    async def override_get_current_user():
+        return mock_user
+
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+
+    task_id = client.post("/api/v1/tasks", json={"title": "Live", "description": ""}, headers=headers).json()["id"]
+    client.put(f"/api/v1/tasks/{task_id}", json={"status": "done"}, headers=headers)
+    client.put("/api/v1/tasks/999999999", json={"status": "done"}, headers=headers)
+    bulk = client.post("/api/v1/tasks/bulk", json={"create": [{"title": "More", "description": ""}],
+                                                    "delete": [task_id]}, headers=headers).json()
+    imported = client.post("/api/v1/tasks/import", content=b'{"title": "Imported", "description": ""}\n',
+                           headers=headers).json()
+
+    user = mock_user.sub
+    assert published == [
+        (user, {"type": "created", "ids": [task_id]}),
+        (user, {"type": "updated", "ids": [task_id]}),
+        (user, {"type": "created", "ids": [bulk["create"][0]["id"]]}),
+        (user, {"type": "deleted", "ids": [task_id]}),
+        (user, {"type": "resync"}),
+        (user, {"type": "import", "import_id": imported["import_id"], "processed": 1, "imported": 1, "failed": 0,
+                "done": True}),
+    ]
+
+    del client.app.dependency_overrides[get_current_user]
+
+
+def test_events_ride_the_writer_transaction(monkeypatch):
+    """Test events are split under the NOTIFY size limit, sent on the writer's session and delivered from LISTEN"""
+    bus = TaskEventBus(queue_size=10)
+    notifier = PostgresNotifier(["postgresql://user:secret@db:5432/app"])
+    notifier.listen(task_events.TASK_EVENTS_CHANNEL, task_events.deliver_notification)
+    monkeypatch.setattr(task_events, "task_event_bus", bus)
+    monkeypatch.setattr(task_events, "notifier", notifier)
+
+    class FakeSession:
+        def __init__(self):
+            self.payloads = []
+
+        async def execute(self, statement, params):
+            self.payloads.extend(params["payloads"])
+
+        async def commit(self):
+            # Loop the notifications back like LISTEN would after the commit
+            for payload in self.payloads:
+                notifier._on_notification(None, 1, task_events.TASK_EVENTS_CHANNEL, payload)
+
+    queue = bus.subscribe("alice")
+    db = FakeSession()
+
+    async def run():
+        await task_events.publish_task_event(db, "alice", "created",
+                                             list(range(task_events.MAX_IDS_PER_NOTIFY + 1)))
+        await task_events.publish_task_event(db, "alice", "deleted", [])
+        await task_events.publish_task_event(db, "alice", "resync")
+        assert queue.empty()
+        await db.commit()
+
+    asyncio.run(run())
+    assert len(db.payloads) == 3
+    assert all(len(payload) < 8000 for payload in db.payloads)
+    assert json.loads(db.payloads[0])["user_id"] == "alice"
+
+    events = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert [len(event.get("ids", [])) for event in events] == [task_events.MAX_IDS_PER_NOTIFY, 1, 0]
+    assert events[-1] == RESYNC
+
+
+def test_stream_accepts_query_token_and_ends_at_expiry(client: TestClient, monkeypatch):
+    """Test EventSource-style clients can pass the token as a query parameter, and the stream closes when it expires"""
+    from app.core import security
+
+    private_pem, public_jwk = make_signing_key("key-1")
+    monkeypatch.setattr(security, "jwks_store", make_store([public_jwk]))
+    monkeypatch.setattr(security, "token_cache", security.TTLCache(maxsize=16))
+    token = make_token(private_pem, "key-1", expires_in=1)
+
+    assert client.get("/api/v1/tasks/stream").status_code == 401
+
+    response = client.get(f"/api/v1/tasks/stream?access_token={token}")
+    assert response.status_code == 200
+    assert response.text.startswith(": connected\n\n")
+    assert response.text.endswith("event: expired\ndata: {}\n\n")
@@ -4,6 +4,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from datetime import datetime
+from uuid import uuid4
 
 
 def test_tasks_list_unauthenticated(client: TestClient):
@@ -285,4 +286,714 @@ def test_task_invalid_priority(client: TestClient, mock_user):
     
     assert response.status_code == 422  # Validation error
     
-    del client.app.dependency_overrides[get_current_user]
\ No newline at end of file
+    del client.app.dependency_overrides[get_current_user]
+
+def test_tasks_list_keyset_pagination(client: TestClient, mock_user):
+    """Test GET /api/v1/tasks pages through tasks with an opaque cursor"""
+    from app.core.security import get_current_user
+    
+    async def override_get_current_user():
+        return mock_user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    created_ids = []
+    for i in range(5):
+        response = client.post("/api/v1/tasks",
+                               json={"title": f"Paged task {i}", "description": "Paging"},
+                               headers=headers)
+        assert response.status_code == 200
+        created_ids.append(response.json()["id"])
+    
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/api/v1/tasks", params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(task["id"] for task in page)
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        assert 'rel="next"' in response.headers["Link"]
+        params = {"limit": 2, "cursor": next_cursor}
+    
+    assert len(seen) == len(set(seen))
+    assert set(created_ids) <= set(seen)
+    assert seen[-5:] == created_ids
+    
+    response = client.get("/api/v1/tasks", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+def test_tasks_list_filter_and_sort(client: TestClient):
+    """Test GET /api/v1/tasks with status/priority/due-date filters and due_date sort"""
+    from app.core.security import get_current_user, User
+    
+    user = User(sub=f"filter-user-{uuid4().hex}", preferred_username="filteruser")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    tasks = [
+        {"title": "A", "description": "", "status": "todo", "priority": "high", "due_date": "2024-03-01T00:00:00"},
+        {"title": "B", "description": "", "status": "done", "priority": "high", "due_date": "2024-01-01T00:00:00"},
+        {"title": "C", "description": "", "status": "todo", "priority": "low", "due_date": None},
+        {"title": "D", "description": "", "status": "in_progress", "priority": "medium", "due_date": "2024-02-01T00:00:00"},
+        {"title": "E", "description": "", "status": "todo", "priority": "low", "due_date": None},
+    ]
+    for task in tasks:
+        assert client.post("/api/v1/tasks", json=task, headers=headers).status_code == 200
+    
+    def titles(params):
+        collected = []
+        while True:
+            response = client.get("/api/v1/tasks", params=params, headers=headers)
+            assert response.status_code == 200
+            collected.extend(t["title"] for t in response.json())
+            if "X-Next-Cursor" not in response.headers:
+                return collected
+            params = {**params, "cursor": response.headers["X-Next-Cursor"]}
+    
+    assert titles({"status": ["todo", "in_progress"]}) == ["A", "C", "D", "E"]
+    assert titles({"priority": "high", "status": "todo"}) == ["A"]
+    assert titles({"due_after": "2024-01-15T00:00:00", "due_before": "2024-03-01T00:00:00"}) == ["D"]
+    # Due dates ascending with undated tasks last, paged across the NULL boundary
+    assert titles({"sort": "due_date", "limit": 2}) == ["B", "D", "A", "C", "E"]
+    assert titles({"sort": "-due_date", "limit": 2}) == ["A", "D", "B", "E", "C"]
+    
+    # Cursors are tied to the sort they were issued for
+    first = client.get("/api/v1/tasks", params={"sort": "due_date", "limit": 1}, headers=headers)
+    response = client.get("/api/v1/tasks", params={"sort": "created_at", "cursor": first.headers["X-Next-Cursor"]},
+                          headers=headers)
+    assert response.status_code == 400
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+def test_tasks_bulk(client: TestClient, mock_user):
+    """Test POST /api/v1/tasks/bulk creates, updates and deletes in one request"""
+    from app.core.security import get_current_user
+    
+    async def override_get_current_user():
+        return mock_user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    response = client.post("/api/v1/tasks/bulk", json={
+        "create": [
+            {"title": "Bulk 1", "description": "First"},
+            {"title": "Bulk 2", "description": "Second", "priority": "high"},
+            {"title": "Bulk 3", "description": "Third"},
+        ]
+    }, headers=headers)
+    assert response.status_code == 200
+    created = response.json()["create"]
+    assert [item["status"] for item in created] == ["created"] * 3
+    ids = [item["id"] for item in created]
+    
+    response = client.post("/api/v1/tasks/bulk", json={
+        "update": [
+            {"id": ids[0], "status": "done"},
+            {"id": 999999999, "title": "Missing"},
+        ],
+        "delete": [ids[1], 999999999],
+    }, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [(item["index"], item["status"]) for item in data["update"]] == [(0, "updated"), (1, "not_found")]
+    assert [(item["id"], item["status"]) for item in data["delete"]] == [(ids[1], "deleted"), (999999999, "not_found")]
+    
+    updated = client.get(f"/api/v1/tasks/{ids[0]}", headers=headers).json()
+    assert updated["status"] == "done"
+    assert updated["title"] == "Bulk 1"
+    assert client.get(f"/api/v1/tasks/{ids[1]}", headers=headers).status_code == 404
+    assert client.get(f"/api/v1/tasks/{ids[2]}", headers=headers).status_code == 200
+    
+    # Duplicate ids are rejected before anything is written
+    response = client.post("/api/v1/tasks/bulk", json={"delete": [ids[2], ids[2]]}, headers=headers)
+    assert response.status_code == 422
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_task_mutations_round_trips(client: TestClient, mock_user, test_async_engine, returning):
+    """Test task writes use one statement each with RETURNING, and still work without it"""
+    from sqlalchemy import event
+    from app.core.security import get_current_user
+    
+    async def override_get_current_user():
+        return mock_user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    # Connect once so the dialect has detected RETURNING support, then override it
+    assert client.get("/api/v1/tasks", params={"limit": 1}, headers=headers).status_code == 200
+    dialect = test_async_engine.sync_engine.dialect
+    dialect.insert_returning = dialect.update_returning = dialect.delete_returning = returning
+    
+    statements = []
+    
+    @event.listens_for(test_async_engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()[:3]).upper())
+    
+    task_id = client.post("/api/v1/tasks", json={"title": "Round trips", "description": "x"},
+                          headers=headers).json()["id"]
+    # Moving a task between counters is handled by the database, without a prior read
+    response = client.put(f"/api/v1/tasks/{task_id}", json={"priority": "high"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["priority"] == "high"
+    assert response.json()["title"] == "Round trips"
+    assert client.put("/api/v1/tasks/999999999", json={"title": "x"}, headers=headers).status_code == 404
+    assert client.delete(f"/api/v1/tasks/{task_id}", headers=headers).status_code == 200
+    assert client.delete(f"/api/v1/tasks/{task_id}", headers=headers).status_code == 404
+    
+    # Change numbers, tombstones and counters are written by triggers within each statement
+    if returning:
+        assert statements == [
+            "INSERT INTO TASKS", "UPDATE TASKS SET", "UPDATE TASKS SET", "DELETE FROM TASKS", "DELETE FROM TASKS",
+        ]
+    else:
+        assert statements == [
+            "INSERT INTO TASKS",
+            "UPDATE TASKS SET", "SELECT TASKS.ID, TASKS.USER_ID,",
+            "UPDATE TASKS SET",
+            "SELECT TASKS.ID FROM", "DELETE FROM TASKS",
+            "SELECT TASKS.ID FROM", "DELETE FROM TASKS",
+        ]
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+def test_task_reads_skip_orm_entities(client: TestClient, test_async_engine):
+    """Test task list/get read only the returned columns, as rows outside the identity map"""
+    import asyncio
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.api.tasks import Task as TaskSchema
+    from app.core.security import get_current_user, User
+    from app.core.task_queries import apply_filters, read_query
+    
+    user = User(sub=f"read-rows-user-{uuid4().hex}", preferred_username="readrows")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    created = client.post("/api/v1/tasks", json={"title": "Rows", "description": "Plain",
+                                                  "due_date": "2030-01-01T00:00:00"}, headers=headers).json()
+    
+    statements = []
+    
+    @event.listens_for(test_async_engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT tasks.id"):
+            statements.append(statement)
+    
+    fields = {"fields": ",".join(created)}
+    assert client.get("/api/v1/tasks", params=fields, headers=headers).json() == [created]
+    assert client.get(f"/api/v1/tasks/{created['id']}", headers=headers).json() == created
+    event.remove(test_async_engine.sync_engine, "before_cursor_execute", record)
+    assert len(statements) == 2
+    assert not any("change_seq" in statement for statement in statements)
+    
+    async def read_rows():
+        async with async_sessionmaker(test_async_engine)() as db:
+            rows = (await db.execute(apply_filters(read_query(), user.sub))).all()
+            return rows, len(db.identity_map)
+    
+    rows, tracked = asyncio.run(read_rows())
+    assert tracked == 0
+    assert [TaskSchema.model_validate(row).model_dump(mode="json") for row in rows] == [created]
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_tasks_sparse_fieldsets(client: TestClient, test_async_engine, monkeypatch, fast):
+    """Test fields= limits columns and response shape, and lists leave out description by default"""
+    from sqlalchemy import event
+    from app.core.config import settings
+    from app.core.security import get_current_user, User
+    
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", fast)
+    user = User(sub=f"fields-user-{fast}-{uuid4().hex}", preferred_username="fields")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    created = [
+        client.post("/api/v1/tasks", json={"title": f"Sparse {i}", "description": "Long text " * 50},
+                    headers=headers).json()
+        for i in range(3)
+    ]
+    
+    statements = []
+    
+    @event.listens_for(test_async_engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT tasks."):
+            statements.append(statement)
+    
+    # Lists skip description unless asked for
+    response = client.get("/api/v1/tasks", headers=headers)
+    assert response.json() == [{k: v for k, v in task.items() if k != "description"} for task in created]
+    assert "tasks.description" not in statements[-1]
+    
+    # Only the requested fields (plus id) are selected and returned; pages still follow
+    response = client.get("/api/v1/tasks", params={"fields": "title, status", "limit": 2}, headers=headers)
+    assert response.json() == [{"id": task["id"], "title": task["title"], "status": "todo"} for task in created[:2]]
+    assert "tasks.due_date" not in statements[-1] and "tasks.description" not in statements[-1]
+    response = client.get("/api/v1/tasks", params={"fields": "title,status", "limit": 2,
+                                                   "cursor": response.headers["X-Next-Cursor"]}, headers=headers)
+    assert response.json() == [{"id": created[2]["id"], "title": "Sparse 2", "status": "todo"}]
+    
+    response = client.get("/api/v1/tasks", params={"fields": "description"}, headers=headers)
+    assert response.json()[0] == {"id": created[0]["id"], "description": created[0]["description"]}
+    
+    # Gets return everything by default, and each field set has its own ETag
+    task_id = created[0]["id"]
+    assert client.get(f"/api/v1/tasks/{task_id}", headers=headers).json() == created[0]
+    full = client.get(f"/api/v1/tasks/{task_id}", headers=headers).headers["ETag"]
+    response = client.get(f"/api/v1/tasks/{task_id}", params={"fields": "due_date"}, headers=headers)
+    assert response.json() == {"id": task_id, "due_date": None}
+    assert response.headers["ETag"] != full
+    assert client.get(f"/api/v1/tasks/{task_id}", params={"fields": "due_date"},
+                      headers={**headers, "If-None-Match": full}).status_code == 200
+    assert client.get(f"/api/v1/tasks/{task_id}", params={"fields": "due_date"},
+                      headers={**headers, "If-None-Match": response.headers["ETag"]}).status_code == 304
+    event.remove(test_async_engine.sync_engine, "before_cursor_execute", record)
+    
+    response = client.get("/api/v1/tasks", params={"fields": "title,secret"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: secret"
+    assert client.get(f"/api/v1/tasks/{task_id}", params={"fields": "change_seq"}, headers=headers).status_code == 400
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+@pytest.mark.parametrize("file_format", ["ndjson", "csv"])
+def test_tasks_export(client: TestClient, file_format):
+    """Test GET /api/v1/tasks/export streams every task of the user"""
+    import csv
+    import io
+    import json
+    from app.core.config import settings
+    from app.core.security import get_current_user, User
+    
+    user = User(sub=f"export-user-{file_format}-{uuid4().hex}", preferred_username="exportuser")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    titles = [f"Export {i}" for i in range(5)]
+    client.post("/api/v1/tasks/bulk", json={
+        "create": [{"title": title, "description": "Line one\nline, \"two\"", "priority": "high"} for title in titles]
+    }, headers=headers)
+    
+    # Smaller batches than tasks, so the export spans several cursor fetches
+    original_batch_size = settings.TASK_EXPORT_BATCH_SIZE
+    settings.TASK_EXPORT_BATCH_SIZE = 2
+    try:
+        response = client.get("/api/v1/tasks/export", params={"format": file_format}, headers=headers)
+    finally:
+        settings.TASK_EXPORT_BATCH_SIZE = original_batch_size
+    assert response.status_code == 200
+    assert f'filename="tasks.{file_format}"' in response.headers["Content-Disposition"]
+    
+    if file_format == "ndjson":
+        assert response.headers["Content-Type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+    else:
+        assert response.headers["Content-Type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["title"] for row in rows] == titles
+    assert rows[0]["description"] == "Line one\nline, \"two\""
+    assert rows[0]["priority"] == "high"
+    assert rows[0]["status"] == "todo"
+    assert datetime.fromisoformat(rows[0]["created_at"])
+    
+    assert client.get("/api/v1/tasks/export", params={"format": "xml"}, headers=headers).status_code == 422
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+def test_tasks_import(client: TestClient):
+    """Test POST /api/v1/tasks/import validates rows and writes them in batches"""
+    import json
+    from app.core.config import settings
+    from app.core.security import get_current_user, User
+    from app.core.task_events import task_event_bus
+    
+    user = User(sub=f"import-user-{uuid4().hex}", preferred_username="importuser")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    lines = [json.dumps({"title": f"Imported {i}", "description": "From NDJSON"}) for i in range(5)]
+    lines.insert(2, json.dumps({"title": "Bad", "description": "x", "status": "unknown"}))
+    lines.insert(4, "{not json")
+    body = "\n".join(lines) + "\n"
+    
+    original_batch_size = settings.TASK_IMPORT_BATCH_SIZE
+    settings.TASK_IMPORT_BATCH_SIZE = 2
+    queue = task_event_bus.subscribe(user.sub)
+    try:
+        response = client.post("/api/v1/tasks/import", content=body.encode(), headers=headers)
+    finally:
+        settings.TASK_IMPORT_BATCH_SIZE = original_batch_size
+        task_event_bus.unsubscribe(user.sub, queue)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["processed"], data["imported"], data["failed"]) == (7, 5, 2)
+    assert [error["row"] for error in data["errors"]] == [3, 5]
+    assert data["errors"][0]["error"].startswith("status:")
+    
+    # Every committed batch reports progress to the user's streams
+    progress = [event for event in (queue.get_nowait() for _ in range(queue.qsize())) if event["type"] == "import"]
+    assert {event["import_id"] for event in progress} == {data["import_id"]}
+    assert [(event["processed"], event["imported"], event["done"]) for event in progress] == [
+        (2, 2, False), (6, 4, False), (7, 5, True)
+    ]
+    
+    # A CSV export of those tasks imports back unchanged
+    exported = client.get("/api/v1/tasks/export", params={"format": "csv"}, headers=headers).text
+    response = client.post("/api/v1/tasks/import", params={"format": "csv"}, content=exported.encode(),
+                           headers=headers)
+    data = response.json()
+    assert data.pop("import_id")
+    assert data == {"processed": 5, "imported": 5, "failed": 0, "errors": []}
+    tasks = client.get("/api/v1/tasks", headers=headers).json()
+    assert [task["title"] for task in tasks] == [f"Imported {i}" for i in range(5)] * 2
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+def test_task_import_parses_incrementally():
+    """Test rows are parsed from arbitrarily split chunks"""
+    import asyncio
+    from app.core.task_io import TaskFileFormat, iter_records
+    
+    body = (
+        'title,description,due_date\r\n"Café","multi\r\nline, ""quoted""",\r\n'
+        'Monitor,12" screen,2024-01-01T00:00:00\r\n"open'
+    ).encode()
+    
+    async def chunks():
+        for i in range(0, len(body), 3):
+            yield body[i:i + 3]
+    
+    async def collect():
+        return [item async for item in iter_records(chunks(), TaskFileFormat.CSV)]
+    
+    records = asyncio.run(collect())
+    assert records[0] == (1, {"title": "Café", "description": 'multi\r\nline, "quoted"', "due_date": None})
+    # A quote inside an unquoted field is just a character
+    assert records[1] == (2, {"title": "Monitor", "description": '12" screen', "due_date": "2024-01-01T00:00:00"})
+    assert records[2][0] == 3
+    assert isinstance(records[2][1], ValueError)
+
+
+def test_tasks_conditional_get(client: TestClient):
+    """Test task reads return ETags and 304 for a matching If-None-Match"""
+    from app.core.security import get_current_user, User
+    
+    user = User(sub=f"etag-user-{uuid4().hex}", preferred_username="etaguser")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    task_id = client.post("/api/v1/tasks", json={"title": "Polled", "description": "x"}, headers=headers).json()["id"]
+    
+    response = client.get("/api/v1/tasks", headers=headers)
+    list_etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    response = client.get("/api/v1/tasks", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == list_etag
+    # Weak and list forms match too; other query parameters are another representation
+    assert client.get("/api/v1/tasks", headers={**headers, "If-None-Match": f'"other", W/{list_etag}'}).status_code == 304
+    assert client.get("/api/v1/tasks", params={"limit": 1}, headers={**headers, "If-None-Match": list_etag}).status_code == 200
+    
+    task_etag = client.get(f"/api/v1/tasks/{task_id}", headers=headers).headers["ETag"]
+    assert task_etag != list_etag
+    assert client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": task_etag}).status_code == 304
+    
+    # Any write changes both ETags
+    client.put(f"/api/v1/tasks/{task_id}", json={"status": "done"}, headers=headers)
+    response = client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": task_etag})
+    assert response.status_code == 200
+    assert response.json()["status"] == "done"
+    assert response.headers["ETag"] != task_etag
+    assert client.get("/api/v1/tasks", headers={**headers, "If-None-Match": list_etag}).status_code == 200
+    
+    response = client.get("/api/v1/tasks", headers=headers)
+    list_etag = response.headers["ETag"]
+    client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert client.get("/api/v1/tasks", headers={**headers, "If-None-Match": list_etag}).status_code == 200
+    assert client.get(f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": task_etag}).status_code == 404
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+def test_tasks_search(client: TestClient):
+    """Test GET /api/v1/tasks/search ranks matches and pages through them"""
+    from app.core.security import get_current_user, User
+    
+    user = User(sub=f"search-user-{uuid4().hex}", preferred_username="searchuser")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    client.post("/api/v1/tasks/bulk", json={"create": [
+        {"title": "Quarterly report", "description": "Draft the numbers"},
+        {"title": "Email Ana", "description": "Ask about the quarterly report deadline"},
+        {"title": "Groceries", "description": "Milk, eggs"},
+        {"title": "Report bug", "description": "Crash on save"},
+    ]}, headers=headers)
+    task_id = client.post("/api/v1/tasks", json={"title": "Old title", "description": "nothing"},
+                          headers=headers).json()["id"]
+    
+    def search(q, **params):
+        response = client.get("/api/v1/tasks/search", params={"q": q, **params}, headers=headers)
+        assert response.status_code == 200
+        return response
+    
+    # Title matches rank above description matches
+    assert [t["title"] for t in search("report").json()][0] in ("Quarterly report", "Report bug")
+    assert [t["title"] for t in search("report").json()][-1] == "Email Ana"
+    assert [t["title"] for t in search("quarterly report").json()] == ["Quarterly report", "Email Ana"]
+    assert search('"groceries*').json()[0]["title"] == "Groceries"
+    assert search("nomatch").json() == []
+    assert search("!!!").json() == []
+    
+    # Paging follows the ranked order
+    titles = []
+    response = search("report", limit=1)
+    while True:
+        titles.extend(t["title"] for t in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        response = search("report", limit=1, cursor=response.headers["X-Next-Cursor"])
+    assert titles == [t["title"] for t in search("report").json()]
+    assert client.get("/api/v1/tasks/search", params={"q": "other", "cursor": search("report", limit=1).headers["X-Next-Cursor"]},
+                      headers=headers).status_code == 400
+    
+    # The index follows updates and deletes
+    client.put(f"/api/v1/tasks/{task_id}", json={"title": "Renamed report"}, headers=headers)
+    assert "Renamed report" in [t["title"] for t in search("renamed").json()]
+    client.delete(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert search("renamed").json() == []
+    
+    # Other users' tasks are never returned
+    user.sub = "other-search-user"
+    assert search("report").json() == []
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+def test_tasks_stats(client: TestClient, test_async_engine):
+    """Test GET /api/v1/tasks/stats follows every kind of write and can be rebuilt"""
+    import asyncio
+    from sqlalchemy import update
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.core.security import get_current_user, User
+    from app.core.task_stats import rebuild_counters
+    from app.models.task import TaskCounter
+    
+    user = User(sub=f"stats-user-{uuid4().hex}", preferred_username="statsuser")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    def stats():
+        response = client.get("/api/v1/tasks/stats", headers=headers)
+        assert response.status_code == 200
+        return response.json()
+    
+    assert stats() == {
+        "total": 0,
+        "by_status": {"todo": 0, "in_progress": 0, "done": 0},
+        "by_priority": {"low": 0, "medium": 0, "high": 0},
+        "overdue": 0,
+    }
+    
+    first = client.post("/api/v1/tasks", json={"title": "Late", "description": "",
+                                                 "due_date": "2000-01-01T00:00:00"}, headers=headers).json()["id"]
+    ids = [item["id"] for item in client.post("/api/v1/tasks/bulk", json={"create": [
+        {"title": "B1", "description": "", "priority": "high"},
+        {"title": "B2", "description": "", "status": "done", "due_date": "2000-01-01T00:00:00"},
+    ]}, headers=headers).json()["create"]]
+    client.post("/api/v1/tasks/import", content=b'{"title": "I1", "description": "", "priority": "low"}\n',
+                headers=headers)
+    data = stats()
+    assert data["total"] == 4
+    assert data["by_status"] == {"todo": 3, "in_progress": 0, "done": 1}
+    assert data["by_priority"] == {"low": 1, "medium": 2, "high": 1}
+    assert data["overdue"] == 1
+    
+    client.put(f"/api/v1/tasks/{first}", json={"status": "done"}, headers=headers)
+    client.put(f"/api/v1/tasks/{ids[0]}", json={"title": "Same counters"}, headers=headers)
+    client.post("/api/v1/tasks/bulk", json={"update": [{"id": ids[0], "status": "in_progress", "priority": "low"}],
+                                             "delete": [ids[1]]}, headers=headers)
+    data = stats()
+    assert data["total"] == 3
+    assert data["by_status"] == {"todo": 1, "in_progress": 1, "done": 1}
+    assert data["by_priority"] == {"low": 2, "medium": 1, "high": 0}
+    assert data["overdue"] == 0
+    
+    client.delete(f"/api/v1/tasks/{first}", headers=headers)
+    expected = stats()
+    assert expected["total"] == 2
+    
+    # Drifted counters are repaired from the tasks table
+    async def drift_and_rebuild():
+        session_factory = async_sessionmaker(test_async_engine)
+        async with session_factory() as db:
+            await db.execute(update(TaskCounter).where(TaskCounter.user_id == user.sub).values(count=42))
+            await db.commit()
+        async with session_factory() as db:
+            await rebuild_counters(db, user.sub)
+            await db.commit()
+    
+    asyncio.run(drift_and_rebuild())
+    assert stats() == expected
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+def test_tasks_delta_sync(client: TestClient, test_async_engine):
+    """Test GET /api/v1/tasks/changes returns only what changed since a sync point"""
+    import asyncio
+    from datetime import timedelta
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from app.core.security import get_current_user, User
+    from app.core.task_sync import prune_tombstones
+    
+    user = User(sub=f"sync-user-{uuid4().hex}", preferred_username="syncuser")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    def changes(since, **params):
+        response = client.get("/api/v1/tasks/changes", params={"since": since, **params}, headers=headers)
+        assert response.status_code == 200
+        return response.json()
+    
+    empty = changes(0)
+    assert empty == {"changes": [], "deleted": [], "next_since": 0, "has_more": False}
+    
+    ids = [item["id"] for item in client.post("/api/v1/tasks/bulk", json={"create": [
+        {"title": f"Sync {i}", "description": ""} for i in range(3)
+    ]}, headers=headers).json()["create"]]
+    
+    # A full sync in pages of two
+    first = changes(0, limit=2)
+    assert [t["title"] for t in first["changes"]] == ["Sync 0", "Sync 1"]
+    assert first["has_more"]
+    second = changes(first["next_since"], limit=2)
+    assert [t["title"] for t in second["changes"]] == ["Sync 2"]
+    assert not second["has_more"]
+    synced = second["next_since"]
+    assert changes(synced) == {"changes": [], "deleted": [], "next_since": synced, "has_more": False}
+    
+    # Only the churn comes back, in the order it happened
+    client.put(f"/api/v1/tasks/{ids[0]}", json={"status": "done"}, headers=headers)
+    client.delete(f"/api/v1/tasks/{ids[1]}", headers=headers)
+    client.post("/api/v1/tasks/bulk", json={"update": [{"id": ids[2], "title": "Renamed"}]}, headers=headers)
+    delta = changes(synced)
+    assert [(t["id"], t["title"], t["status"]) for t in delta["changes"]] == [
+        (ids[0], "Sync 0", "done"), (ids[2], "Renamed", "todo")
+    ]
+    assert delta["deleted"] == [ids[1]]
+    assert delta["next_since"] > synced
+    
+    # Pruned tombstones force clients that are too far behind to start over
+    async def prune():
+        async with async_sessionmaker(test_async_engine)() as db:
+            await prune_tombstones(db, datetime.utcnow() + timedelta(seconds=1))
+            await db.commit()
+    
+    asyncio.run(prune())
+    response = client.get("/api/v1/tasks/changes", params={"since": synced}, headers=headers)
+    assert response.status_code == 410
+    assert changes(delta["next_since"])["changes"] == []
+    assert [t["id"] for t in changes(0)["changes"]] == [ids[0], ids[2]]
+    
+    del client.app.dependency_overrides[get_current_user]
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_tasks_list_fast_json_matches(client: TestClient, monkeypatch, use_orjson):
+    """Test the fast JSON path returns the same body and headers as the validated path"""
+    from app.core import fast_json
+    from app.core.config import settings
+    from app.core.security import get_current_user, User
+    
+    if not use_orjson:
+        monkeypatch.setattr(fast_json, "orjson", None)
+    elif fast_json.orjson is None:
+        pytest.skip("orjson is not installed")
+    
+    user = User(sub=f"fast-json-user-{use_orjson}-{uuid4().hex}", preferred_username="fastuser")
+    
+    async def override_get_current_user():
+        return user
+    
+    client.app.dependency_overrides[get_current_user] = override_get_current_user
+    headers = {"Authorization": "Bearer mock_token"}
+    
+    client.post("/api/v1/tasks/bulk", json={"create": [
+        {"title": "Fast ü", "description": "Quotes \" and \\ slashes", "priority": "high",
+         "due_date": "2024-05-01T12:30:00.123456"},
+        {"title": "Second", "description": ""},
+        {"title": "Third", "description": "third"},
+    ]}, headers=headers)
+    
+    for path, params in (("/api/v1/tasks", {"limit": 2}), ("/api/v1/tasks/search", {"q": "fast"})):
+        monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", False)
+        validated = client.get(path, params=params, headers=headers)
+        monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+        fast = client.get(path, params=params, headers=headers)
+        
+        assert fast.status_code == 200
+        assert fast.json() == validated.json()
+        for header in ("X-Next-Cursor", "Link", "ETag"):
+            assert fast.headers.get(header) == validated.headers.get(header)
+    
+    del client.app.dependency_overrides[get_current_user]
@@ -75,7 +75,9 @@ describe('Home.vue', () => {
     
     await flushPromises()
     
-    expect(api.get).toHaveBeenCalledWith('/tasks')
+    expect(api.get).toHaveBeenCalledWith('/tasks', {
+      params: { fields: 'title,description,status,priority,due_date,created_at' }
+    })
     expect(wrapper.findAll('.card').length).toBe(2)
     expect(wrapper.text()).toContain('Complete project')
     expect(wrapper.text()).toContain('Review code')
@@ -91,6 +93,42 @@ describe('Home.vue', () => {
     expect(cards[0].findAll('button')[1].text()).toContain('common.delete')
   })
 
+  it('loads the next page only when asked to', async () => {
+    api.get
+      .mockResolvedValueOnce({
+        data: [{ id: 1, title: 'First page', status: 'todo', priority: 'low', created_at: '2024-01-01' }],
+        headers: { 'x-next-cursor': 'abc' }
+      })
+      .mockResolvedValueOnce({
+        data: [{ id: 2, title: 'Second page', status: 'todo', priority: 'low', created_at: '2024-01-02' }],
+        headers: {}
+      })
+
+    const wrapper = mount(Home, {
+      global: {
+        mocks: {
+          $t: (key) => key
+        }
+      }
+    })
+
+    await flushPromises()
+
+    expect(api.get).toHaveBeenCalledTimes(1)
+    expect(wrapper.findAll('.card').length).toBe(1)
+
+    await wrapper.find('button.load-more').trigger('click')
+    await flushPromises()
+
+    expect(api.get).toHaveBeenNthCalledWith(2, '/tasks', {
+      params: { fields: 'title,description,status,priority,due_date,created_at', cursor: 'abc' }
+    })
+    expect(wrapper.findAll('.card').length).toBe(2)
+    expect(wrapper.text()).toContain('Second page')
+    // Last page: nothing more to load
+    expect(wrapper.find('button.load-more').exists()).toBe(false)
+  })
+
   it('shows empty state when no tasks', async () => {
     api.get.mockResolvedValue({ data: [] })
     